@@ -0,0 +1,61 @@
+#!/usr/bin/python
+# coding=utf-8
+"""
+Created on Mon Oct 19 09:48:12 2026
+
+Overhead of the sampling: the old psutil based `sys_info()` against `Sampler`
+with the metric sets. Prints the CPU time per sample and the CPU usage of the
+agent when sampling at a fixed rate (10 Hz by default).
+
+Usage: python bench_sampler.py [rate_hz] [seconds]
+
+@author: ikespand@GitHub
+"""
+
+import shutil
+import sys
+import time
+import psutil
+from sampler import Sampler
+
+
+def psutil_sys_info():
+    """`sys_info()` as it was, with psutil."""
+    disc_usage = shutil.disk_usage("/")
+    info = {}
+    info["ram_usage"] = psutil.virtual_memory()[2]
+    info["cpu_usage"] = psutil.cpu_percent()
+    info["disk_usage"] = disc_usage[1]/disc_usage[0]*100
+    return info
+
+
+def cpu_per_sample(func, n=200):
+    st = time.process_time()
+    for _ in range(n):
+        func()
+    return (time.process_time() - st) / n
+
+
+def cpu_usage(func, rate, seconds):
+    """CPU usage in % of a core when calling `func` at `rate` Hz."""
+    interval = 1/rate
+    st, st_cpu = time.monotonic(), time.process_time()
+    next_tick = st
+    while next_tick < st + seconds:
+        func()
+        next_tick += interval
+        time.sleep(max(0.0, next_tick - time.monotonic()))
+    return 100*(time.process_time() - st_cpu) / (time.monotonic() - st)
+
+
+if __name__ == "__main__":
+    rate = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    samplers = {"psutil sys_info": psutil_sys_info}
+    for metrics in (("system",), ("system", "cpu", "net", "disk"),
+                    ("system", "cpu", "net", "disk", "procs")):
+        sampler = Sampler(metrics)
+        samplers["Sampler " + "+".join(metrics)] = sampler.sample
+    for name, func in samplers.items():
+        print("{:<40s} {:>7.1f} us/sample {:>6.2f} % CPU at {:g} Hz".format(
+            name, 1e6*cpu_per_sample(func), cpu_usage(func, rate, seconds), rate))
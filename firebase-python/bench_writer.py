@@ -0,0 +1,101 @@
+#!/usr/bin/python
+# coding=utf-8
+"""
+Created on Sun Oct 18 22:14:03 2026
+
+Benchmark of the writes against a local stub of the realtime database REST
+endpoint, so nothing is sent to Firebase. Compares one `set()` per sample (the
+old behaviour) with the buffered multi-path `update()` and prints the
+samples/sec, the requests per sample and the bytes per sample.
+
+Usage: python bench_writer.py [n_samples]
+
+@author: ikespand@GitHub
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import sys
+import tempfile
+import threading
+import time
+from custom_firebase import SystemDataFirebaseRt, sys_info
+
+# %%
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Accepts PUT/PATCH of `*.json` like the database and counts them."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    counts = {"requests": 0, "bytes": 0}
+    lock = threading.Lock()
+
+    def _write(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.lock:
+            self.counts["requests"] += 1
+            self.counts["bytes"] += len(self.requestline) + len(str(self.headers)) + len(body)
+        # The database echoes the written data
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_PUT = _write
+    do_PATCH = _write
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:{}".format(server.server_port)
+
+
+def write_credentials(database_url):
+    fd, fname = tempfile.mkstemp(suffix=".txt", prefix="credential_")
+    with os.fdopen(fd, "w") as f:
+        for key, val in (("apiKey", "STUB"), ("authDomain", "stub.firebaseapp.com"),
+                         ("databaseURL", database_url), ("storageBucket", "stub.appspot.com")):
+            f.write('{}: "{}"\n'.format(key, val))
+    return fname
+
+
+def bench(cred_fname, n, buffer_samples):
+    fb = SystemDataFirebaseRt(cred_fname, buffer_samples=buffer_samples)
+    # Same data for every sample, only the writes are timed
+    data = sys_info()
+    StubHandler.counts.update(requests=0, bytes=0)
+    st = time.time()
+    for i in range(n):
+        if fb.writer is not None:
+            # The timestamps have a resolution of a second
+            fb.writer.add("bench/{:08d}".format(i), data)
+        else:
+            fb.db.child("bench").child("{:08d}".format(i)).set(data)
+    fb.close()
+    elapsed = time.time() - st
+    return {"samples/s": n / elapsed,
+            "requests/sample": StubHandler.counts["requests"] / n,
+            "bytes/sample": StubHandler.counts["bytes"] / n}
+
+# %%
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    server, database_url = start_stub_server()
+    cred_fname = write_credentials(database_url)
+    try:
+        results = {"set() per sample": bench(cred_fname, n, 0),
+                   "buffered, 10 samples": bench(cred_fname, n, 10),
+                   "buffered, 100 samples": bench(cred_fname, n, 100)}
+    finally:
+        os.remove(cred_fname)
+        server.shutdown()
+    for name, r in results.items():
+        print("{:<24s} {:>8.0f} samples/s {:>6.3f} requests/sample {:>6.0f} bytes/sample"
+              .format(name, r["samples/s"], r["requests/sample"], r["bytes/sample"]))
@@ -0,0 +1,176 @@
+#!/usr/bin/python
+# coding=utf-8
+"""
+Created on Sun Oct 18 21:52:36 2026
+
+Buffered writer for the Firebase realtime database. Samples are collected
+locally and sent as one multi-path `update()` (a single PATCH with keys like
+"device/timestamp") once `max_samples` are buffered or the oldest sample is
+`max_delay` seconds old. If the backend is unreachable the samples stay
+buffered, up to `max_pending`, and the write is retried with backoff.
+
+@author: ikespand@GitHub
+"""
+
+from collections import OrderedDict
+import json
+import threading
+import time
+
+
+class BufferedFirebaseWriter():
+    """
+    Background writer of a pyrebase `Database`. Give it its own instance
+    (`firebase.database()`), pyrebase keeps the path of a query in the object.
+    """
+    def __init__(self, db, max_samples=100, max_delay=10.0, max_pending=100000,
+                 max_batch=1000, max_backoff=300.0):
+        """
+        Parameters
+        ----------
+        db : pyrebase.pyrebase.Database
+            Database to write to.
+        max_samples : int, optional
+            Buffered samples which trigger a write. The default is 100.
+        max_delay : float, optional
+            Seconds a sample waits at most before a write. The default is 10.0.
+        max_pending : int, optional
+            Samples kept while the backend is unreachable, the oldest ones are
+            dropped beyond. The default is 100000.
+        max_batch : int, optional
+            Samples per request. The default is 1000.
+        max_backoff : float, optional
+            Upper bound of the wait between retries. The default is 300.0.
+
+        """
+        self.db = db
+        self.max_samples = max_samples
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.max_backoff = max_backoff
+        self.stats = {"requests": 0, "samples": 0, "bytes": 0, "failures": 0,
+                      "dropped": 0}
+        self._buffer = OrderedDict()  # path -> data, oldest first
+        self._oldest = None  # time.monotonic() of the oldest buffered sample
+        self._retry_at = 0.0
+        self._backoff = 1.0
+        self._flush_requested = False
+        self._in_flight = 0
+        self._closing = False
+        self._cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def add(self, path, data):
+        """
+        Buffer a sample.
+
+        Parameters
+        ----------
+        path : str
+            Location of the sample, e.g. "<device>/<timestamp>".
+        data : dict
+            Sample.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._cond:
+            self._buffer[path] = data
+            self._buffer.move_to_end(path)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                # The writer waits without a timeout while the buffer is empty
+                self._cond.notify()
+            self._drop_overflow()
+            if len(self._buffer) >= self.max_samples:
+                self._cond.notify()
+        return None
+
+    def _drop_overflow(self):
+        while len(self._buffer) > self.max_pending:
+            self._buffer.popitem(last=False)
+            self.stats["dropped"] += 1
+
+    def _due(self):
+        """Seconds until the next write is due, None if nothing is buffered."""
+        if not self._buffer:
+            return None
+        now = time.monotonic()
+        if now < self._retry_at and not self._closing:
+            return self._retry_at - now
+        if self._closing or self._flush_requested or len(self._buffer) >= self.max_samples:
+            return 0.0
+        return max(0.0, self._oldest + self.max_delay - now)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                due = self._due()
+                while due is None or due > 0:
+                    if due is None and self._closing:
+                        return
+                    self._cond.wait(due)
+                    due = self._due()
+                batch = OrderedDict()
+                while self._buffer and len(batch) < self.max_batch:
+                    path, data = self._buffer.popitem(last=False)
+                    batch[path] = data
+                self._oldest = time.monotonic() if self._buffer else None
+                self._in_flight = len(batch)
+            self._send(batch)
+            with self._cond:
+                self._in_flight = 0
+                if not self._buffer:
+                    self._flush_requested = False
+                self._cond.notify_all()
+
+    def _send(self, batch):
+        body_size = len(json.dumps(batch))
+        try:
+            # A PATCH on the root with "a/b" keys is a multi-path update
+            self.db.update(batch)
+        except Exception as err:
+            print("Writing {} samples failed with error: {}".format(len(batch), err))
+            with self._cond:
+                self.stats["failures"] += 1
+                # Back in front of the newer samples, unless they were resent meanwhile
+                for path in batch:
+                    if path in self._buffer:
+                        batch[path] = self._buffer.pop(path)
+                self._buffer = OrderedDict(list(batch.items()) + list(self._buffer.items()))
+                self._oldest = self._oldest or time.monotonic()
+                self._drop_overflow()
+                if self._closing:
+                    # One attempt only on close, the rest is lost
+                    self.stats["dropped"] += len(self._buffer)
+                    self._buffer.clear()
+                self._retry_at = time.monotonic() + self._backoff
+                self._backoff = min(2*self._backoff, self.max_backoff)
+            return False
+        with self._cond:
+            self.stats["requests"] += 1
+            self.stats["samples"] += len(batch)
+            self.stats["bytes"] += body_size
+            self._backoff = 1.0
+            self._retry_at = 0.0
+        return True
+
+    def flush(self, timeout=None):
+        """Write the buffered samples now and wait until the buffer is empty.
+        Returns False on timeout, e.g. while the backend is unreachable."""
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._buffer and not self._in_flight,
+                                       timeout)
+
+    def close(self, timeout=30.0):
+        """Flush (one attempt) and stop the writer thread."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self.thread.join(timeout)
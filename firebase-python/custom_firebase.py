@@ -10,11 +10,16 @@ Related to:
 """
 
 import pyrebase
-import psutil
 import platform
 import time
-import shutil
 import datetime
+from buffered_writer import BufferedFirebaseWriter
+from query import MetricsQuery, sample_key
+from rollup import Rollup, bucket_path
+from sampler import Sampler
+from spool import SampleSpool, SpoolUploader
+
+_sampler = None
 
 def additional_sys_info():
     """
@@ -49,35 +54,122 @@ def get_device_name():
     #dn = ("").join([i.replace('-','') for i in dn])
     return dn
     
-def sys_info():
+def sys_info(sampler=None):
     """
     A dictionary which contains some additional metrics. 
 
+    Parameters
+    ----------
+    sampler : Sampler, optional
+        Sampler of the metrics, e.g. with more metric sets. The default is
+        None, i.e. RAM, CPU and disk usage in %.
+
     Returns
     -------
-    info : TYPE
-        DESCRIPTION.
+    info : dict
+        Nested dict of the metrics. The CPU usage is since the last call.
 
     """
-    disc_usage = shutil.disk_usage("/")                  
-    info = {}
-    info["ram_usage"] = psutil.virtual_memory()[2]
-    info["cpu_usage"] = psutil.cpu_percent()
-    info["disk_usage"] = disc_usage[1]/disc_usage[0]*100
-    # Firebase doesn't support list and during the addition will convert to key-value pair
-    info["sample_list"] = [1, 2, 3, 4, 5, 6]
+    global _sampler
+    if sampler is None:
+        if _sampler is None:
+            _sampler = Sampler(("system",))
+        sampler = _sampler
+    info = sampler.to_dict(sampler.sample())
     return info 
 
 
+def collect(fb, interval=2.0, n_samples=None, sampler=None, rollup=None):
+    """
+    Take samples at a fixed cadence. The deadlines don't drift with the time
+    spent on sampling and writing, missed ticks (e.g. a stalled write without
+    spool) are skipped instead of caught up. With a rollup only the finished
+    buckets are written, the open ones when the collection ends.
+
+    Parameters
+    ----------
+    fb : SystemDataFirebaseRt
+        Where the samples go, ideally with a spool.
+    interval : float, optional
+        Seconds between the samples. The default is 2.0.
+    n_samples : int, optional
+        Samples to take, None runs forever. The default is None.
+    sampler : Sampler, optional
+        Sampler of the metrics. The default is None, see `sys_info()`.
+    rollup : Rollup, optional
+        Rollup of the rows of `sampler`. The default is None (raw samples).
+
+    Returns
+    -------
+    late : int
+        Skipped ticks.
+
+    """
+    ctr, late = 0, 0
+    next_tick = time.monotonic()
+    try:
+        while n_samples is None or ctr < n_samples:
+            if rollup is None:
+                fb.add_data_to_firebase(sys_info(sampler))
+            else:
+                for bucket in rollup.add(sampler.sample()):
+                    fb.add_rollup(*bucket)
+            ctr += 1
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                skipped = int(-delay // interval) + 1
+                late += skipped
+                next_tick += skipped*interval
+                delay = next_tick - time.monotonic()
+            if n_samples is None or ctr < n_samples:
+                time.sleep(max(0.0, delay))
+    finally:
+        # Also on Ctrl+C, the open buckets would be lost
+        if rollup is not None:
+            for bucket in rollup.flush():
+                fb.add_rollup(*bucket)
+    return late
+
+
 class SystemDataFirebaseRt():
     """
     A class to wrap the functionality of pyrebase for specific purpose of sending
     data to the Firebase' realtime database. 
     """
-    def __init__(self, cred_txt_fname):
+    def __init__(self, cred_txt_fname, buffer_samples=0, flush_interval=10.0,
+                 spool_fname=None):
+        """
+        Parameters
+        ----------
+        cred_txt_fname : str
+            File with the credentials.
+        buffer_samples : int, optional
+            If > 0, samples are buffered and written together as one multi-path
+            update once this many are collected. The default is 0 (no buffer).
+        flush_interval : float, optional
+            Seconds a buffered sample waits at most. The default is 10.0.
+        spool_fname : str, optional
+            If given, samples are stored in this local spool first and sent in
+            order by a background thread, nothing is lost while the backend is
+            unreachable. The default is None.
+
+        """
         self.cred_txt_fname = cred_txt_fname
         self.fb = self.initialize_firebase()
         self.db = self.fb.database()
+        self.writer = None
+        self.spool = None
+        if spool_fname is not None:
+            self.spool = SampleSpool(spool_fname)
+            self.writer = SpoolUploader(self.spool, self.fb.database(),
+                                        max_samples=max(buffer_samples, 1),
+                                        max_delay=flush_interval)
+        elif buffer_samples > 0:
+            # Own database object, pyrebase's isn't thread-safe
+            self.writer = BufferedFirebaseWriter(self.fb.database(),
+                                                 max_samples=buffer_samples,
+                                                 max_delay=flush_interval)
     
      
     def read_cred(self)->dict:
@@ -121,13 +213,12 @@ class SystemDataFirebaseRt():
         
         Returns
         -------
-        str/list
-            DESCRIPTION.
+        str
+            UTC with microseconds, e.g. "20261019T103100123456Z". It sorts by
+            time, so samples can be read by range, see `query.sample_key()`.
     
         """
-        ts = time.time()
-        return datetime.datetime.fromtimestamp(ts).strftime('%d%m%YT%H%M%S')
-        #return datetime.datetime.fromtimestamp(ts).strftime('%d-%m-%Y-%H-%M-%S').split("-")
+        return sample_key(time.time())
     
     def add_data_to_firebase(self, data):    
         """
@@ -136,6 +227,7 @@ class SystemDataFirebaseRt():
         But, following can be better:
             SystemName > YY > MM > DD > HH > MM > SS > Data
             This could allow the ease in access?
+        The rollups use such a layout, see `add_rollup()`.
 
         Parameters
         ----------
@@ -145,43 +237,127 @@ class SystemDataFirebaseRt():
         Returns
         -------
         resp : TYPE
-            DESCRIPTION.
+            Response of the write, None if the sample is buffered.
 
         """
         # data = sys_info()
         #resp = self.db.push(data)
-        resp = self.db.child(get_device_name()).child(self.get_timestamp()).set(data)
+        return self.write("{}/{}".format(get_device_name(), self.get_timestamp()), data)
+
+    def add_rollup(self, resolution, start, stats):
+        """
+        Write a bucket of a `Rollup`, see `rollup.py` for the schema:
+            rollups > SystemName > Resolution > YYYY-MM-DD > HH:MM:SS > Stats
+
+        Parameters
+        ----------
+        resolution : int
+            Length of the bucket in seconds.
+        start : float
+            Start of the bucket (epoch).
+        stats : dict
+            Stats of the bucket.
+
+        Returns
+        -------
+        resp : dict
+            Response of the write, None if the bucket is buffered.
+
+        """
+        return self.write(bucket_path(get_device_name(), resolution, start), stats)
+
+    def write(self, path, data):
+        """Write `data` at `path`, through the spool or buffer if enabled."""
+        if self.spool is not None:
+            self.spool.append(path, data)
+            self.writer.notify()
+            return None
+        if self.writer is not None:
+            self.writer.add(path, data)
+            return None
+        resp = self.db.child(path).set(data)
         return resp
+
+    def flush(self, timeout=None):
+        """Write the buffered samples now, returns False on timeout."""
+        if self.writer is None:
+            return True
+        return self.writer.flush(timeout)
+
+    def close(self):
+        """Write the buffered samples (one attempt) and stop the writer."""
+        if self.writer is not None:
+            self.writer.close()
+        if self.spool is not None and not self.writer.thread.is_alive():
+            self.spool.close()
     
-    def get_all_data(self):
+    def query(self, cache_fname=None, page_size=500):
         """
-        Crude way to get all data from the FB.
+        Paged reads of the rollups and samples, e.g. for a dashboard. This
+        replaces the crude download of the whole database.
+
+        Parameters
+        ----------
+        cache_fname : str, optional
+            SQLite file caching the final buckets, None disables the cache.
+            The default is None.
+        page_size : int, optional
+            Items per request. The default is 500.
 
         Returns
         -------
-        None.
+        MetricsQuery
+            Query API, see `query.py`.
+
+        """
+        return MetricsQuery(self.fb.database(), cache_fname=cache_fname, page_size=page_size)
+
+    def get_all_data(self, device=None):
+        """
+        All raw samples of a device, read page by page. Prefer `query()` with
+        a time range, this loads every sample into memory.
+
+        Parameters
+        ----------
+        device : str, optional
+            Device name. The default is None (this device).
+
+        Returns
+        -------
+        dict
+            Sample key -> sample, ordered by time, see `query.sample_key()`.
 
         """
-        val = self.db.child().get()
-        # print(val.val())
-        return val.val()
+        query = self.query()
+        try:
+            return dict(query.samples(device or get_device_name()))
+        finally:
+            query.close()
 # %%
 
 if __name__ == "__main__":
     # Keep the credential in a `credential.txt` file within this folder.
-    fb = SystemDataFirebaseRt(cred_txt_fname = r"credential.txt")
-    ctr = 0
-    res = []
-    while ctr < 3:
-        print("Instance: ", ctr)
-        data = sys_info()
-        res.append(fb.add_data_to_firebase(data))
-        time.sleep(2)
-        ctr+=1
+    # Samples are spooled locally and uploaded in the background
+    fb = SystemDataFirebaseRt(cred_txt_fname = r"credential.txt", buffer_samples=10,
+                              spool_fname="spool.sqlite")
+    late = collect(fb, interval=2.0, n_samples=3)
+    print("Skipped ticks: ", late)
+    # Sampling at 10 Hz for a minute, only the rollups are uploaded
+    sampler = Sampler(("system", "cpu", "net", "disk"))
+    # The open buckets are continued by the next run, see `Rollup.flush()`
+    late = collect(fb, interval=0.1, n_samples=600, sampler=sampler,
+                   rollup=Rollup(sampler, state_fname="rollup_state.json"))
+    print("Skipped ticks: ", late)
+    fb.flush(timeout=30)
     print("Done!")
     
-    # Retrive the data from the list
-    first_sample_list =  list(fb.get_all_data()["DESKTOP-M3PCI07"].items())[0][1]["sample_list"]
-    _ = [print(l) for l in first_sample_list]
+    # Retrive the first sample of the last hour and its rollups, page by page
+    query = fb.query(cache_fname="query_cache.sqlite")
+    key, first_sample = next(query.samples(get_device_name(), time.time() - 3600))
+    _ = [print(k, v) for k, v in first_sample.items()]
+    for start, stats in query.buckets(get_device_name(), 60, time.time() - 3600):
+        print(datetime.datetime.fromtimestamp(start), stats["cpu_usage"])
+    query.close()
+    fb.close()
 
 
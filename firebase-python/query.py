@@ -0,0 +1,237 @@
+#!/usr/bin/python
+# coding=utf-8
+"""
+Created on Mon Oct 19 11:42:08 2026
+
+Paged, range-bounded reads of the metrics, instead of downloading the whole
+database. Keys are listed shallow, and the buckets of a time range are
+streamed day partition by day partition with orderBy="$key", startAt/endAt
+and limitToFirst, so the memory is bounded by a page. Days which are over
+(plus `settle` seconds for late uploads from spooled agents) don't change any
+more, their buckets are kept in a local SQLite cache and read from there.
+Raw samples are keyed by `sample_key()`, which sorts by time, so they are
+range-bounded the same way.
+
+@author: ikespand@GitHub
+"""
+
+import datetime
+import json
+import re
+import sqlite3
+import time
+from rollup import RESOLUTIONS, bucket_path, bucket_start
+from sampler import firebase_key
+
+
+# Keys of `sample_key()`, other keys (e.g. of older agents) are skipped
+_SAMPLE_KEY = re.compile(r"\d{8}T\d{12}Z")
+
+
+def _epoch(t):
+    return t.timestamp() if isinstance(t, datetime.datetime) else float(t)
+
+
+def sample_key(t):
+    """Key of a raw sample taken at `t` (epoch), UTC with microseconds, e.g.
+    "20261019T103100123456Z". Keys of the same width sort by time."""
+    return datetime.datetime.fromtimestamp(t, datetime.timezone.utc).strftime(
+        "%Y%m%dT%H%M%S%fZ")
+
+
+def _day_and_key(t):
+    day, key = datetime.datetime.fromtimestamp(t, datetime.timezone.utc).strftime(
+        "%Y-%m-%d %H:%M:%S").split()
+    return day, key
+
+
+class MetricsQuery():
+    """
+    Reads of the database. Give it its own instance (`firebase.database()`),
+    pyrebase keeps the path of a query in the object.
+    """
+    def __init__(self, db, cache_fname=None, page_size=500, settle=86400.0):
+        """
+        Parameters
+        ----------
+        db : pyrebase.pyrebase.Database
+            Database to read from.
+        cache_fname : str, optional
+            SQLite file of the cache, None disables it. The default is None.
+        page_size : int, optional
+            Buckets/samples per request. The default is 500.
+        settle : float, optional
+            Seconds after the end of a day from which on its buckets are
+            considered final and cached. The default is 86400.0.
+
+        """
+        self.db = db
+        self.page_size = page_size
+        self.settle = settle
+        self.stats = {"requests": 0, "cached_days": 0}
+        self.cache = None
+        if cache_fname is not None:
+            self.cache = sqlite3.connect(cache_fname)
+            self.cache.execute("PRAGMA journal_mode=WAL")
+            with self.cache:
+                self.cache.execute("""CREATE TABLE IF NOT EXISTS buckets (
+                                          path TEXT NOT NULL,
+                                          key TEXT NOT NULL,
+                                          data TEXT NOT NULL,
+                                          PRIMARY KEY (path, key))""")
+                # Days whose buckets are all in the cache
+                self.cache.execute("""CREATE TABLE IF NOT EXISTS complete_days (
+                                          path TEXT PRIMARY KEY)""")
+
+    def _shallow(self, path):
+        self.stats["requests"] += 1
+        keys = self.db.child(path).shallow().get().val()
+        return sorted(keys or [])
+
+    def _pages(self, path, start_key=None, end_key=None):
+        """(key, value) of the children of `path` ordered by key, with the
+        keys within [start_key, end_key], in pages of `page_size`."""
+        last = None
+        while True:
+            query = self.db.child(path).order_by_key()
+            start = last if last is not None else start_key
+            if start is not None:
+                query = query.start_at(start)
+            if end_key is not None:
+                query = query.end_at(end_key)
+            # The next page starts at the last key of the previous one
+            limit = self.page_size + (last is not None)
+            self.stats["requests"] += 1
+            page = list((query.limit_to_first(limit).get().val() or {}).items())
+            if last is not None:
+                page = page[1:]
+            yield from page
+            if len(page) < self.page_size:
+                return
+            last = page[-1][0]
+
+    def devices(self):
+        """Devices with rollups."""
+        return self._shallow("rollups")
+
+    def days(self, device, resolution):
+        """Days (YYYY-MM-DD) with buckets of a device and resolution."""
+        return self._shallow("rollups/{}/{}".format(firebase_key(device),
+                                                    RESOLUTIONS[resolution]))
+
+    def _is_final(self, day):
+        end = bucket_start(day, "00:00:00") + 86400
+        return end + self.settle <= time.time()
+
+    def _cached(self, day_path):
+        return self.cache is not None and self.cache.execute(
+            "SELECT 1 FROM complete_days WHERE path = ?", (day_path,)).fetchone() is not None
+
+    def _read_day(self, day_path, start_key, end_key, final):
+        """Buckets of a day partition, from the cache if possible."""
+        if self._cached(day_path):
+            self.stats["cached_days"] += 1
+            rows = self.cache.execute("""SELECT key, data FROM buckets WHERE path = ?
+                                         AND key BETWEEN ? AND ? ORDER BY key""",
+                                      (day_path, start_key, end_key))
+            for key, data in rows:
+                yield key, json.loads(data)
+            return
+        cache = self.cache if final else None
+        rows = []
+        for key, data in self._pages(day_path, start_key, end_key):
+            if cache is not None:
+                rows.append((day_path, key, json.dumps(data)))
+                if len(rows) >= self.page_size:
+                    self._insert(rows)
+                    rows = []
+            yield key, data
+        if cache is not None:
+            self._insert(rows)
+            if (start_key, end_key) == ("00:00:00", "23:59:59"):
+                # Read completely, also if the day is empty
+                with cache:
+                    cache.execute("INSERT OR IGNORE INTO complete_days VALUES (?)", (day_path,))
+
+    def _insert(self, rows):
+        with self.cache:
+            self.cache.executemany("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", rows)
+
+    def buckets(self, device, resolution, start, end=None):
+        """
+        Stream the buckets of a device which start within [start, end].
+
+        Parameters
+        ----------
+        device : str
+            Device name.
+        resolution : int
+            Bucket length in seconds, see `rollup.RESOLUTIONS`.
+        start : float or datetime
+            Start of the range (epoch or aware datetime).
+        end : float or datetime, optional
+            End of the range. The default is None (now).
+
+        Yields
+        ------
+        start : float
+            Start of the bucket (epoch).
+        stats : dict
+            Stats of the bucket.
+
+        """
+        start, end = _epoch(start), _epoch(time.time() if end is None else end)
+        first_day, first_key = _day_and_key(start)
+        last_day, last_key = _day_and_key(end)
+        root = bucket_path(device, resolution, start).rsplit("/", 2)[0]
+        days = None
+        t = bucket_start(first_day, "00:00:00")
+        while t <= end:
+            day = _day_and_key(t)[0]
+            t += 86400
+            day_path = "{}/{}".format(root, day)
+            if not self._cached(day_path):
+                # Skip the days without data, with one listing of the days
+                if days is None:
+                    days = set(self._shallow(root))
+                if day not in days:
+                    continue
+            start_key = first_key if day == first_day else "00:00:00"
+            end_key = last_key if day == last_day else "23:59:59"
+            for key, stats in self._read_day(day_path, start_key, end_key, self._is_final(day)):
+                yield bucket_start(day, key), stats
+
+    def samples(self, device, start=None, end=None):
+        """
+        Stream the raw samples of a device taken within [start, end], ordered
+        by time. Samples written before the keys were `sample_key()`s
+        (%d%m%YT%H%M%S, local time) don't sort by time, they are skipped
+        (also if their keys happen to fall within the range).
+
+        Parameters
+        ----------
+        device : str
+            Device name.
+        start : float or datetime, optional
+            Start of the range (epoch or aware datetime). The default is None
+            (from the first sample).
+        end : float or datetime, optional
+            End of the range. The default is None (up to the last sample).
+
+        Yields
+        ------
+        key : str
+            Key of the sample, see `sample_key()`.
+        data : dict
+            Sample.
+
+        """
+        start_key = None if start is None else sample_key(_epoch(start))
+        end_key = None if end is None else sample_key(_epoch(end))
+        for key, data in self._pages(device, start_key, end_key):
+            if _SAMPLE_KEY.fullmatch(key):
+                yield key, data
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,213 @@
+#!/usr/bin/python
+# coding=utf-8
+"""
+Created on Mon Oct 19 10:31:26 2026
+
+On-device rollups of the raw samples. Instead of every sample, buckets of 10 s,
+1 min and 1 h with min/max/mean/p95 per metric are uploaded. The buckets are
+aligned to the epoch, and the coarser ones are merged from the finer ones. The
+p95 comes from a log-scaled histogram (relative error ~1%), which is mergeable
+and needs little memory also for the 1 h buckets at 10 Hz.
+
+Buckets still open on shutdown are written as they are (partial, see their
+`n`). With a state file they are also saved locally, and the next run continues
+them, so a restart within a bucket rewrites it with the rows of both runs
+instead of overwriting the first part. Without it the first part is lost. The
+state is also saved whenever a bucket is finished, so after a crash the next
+run continues from the last finished bucket.
+
+The buckets are stored in a time-partitioned layout (UTC):
+    rollups > Device > Resolution > YYYY-MM-DD > HH:MM:SS > Metrics
+so a reader fetches one day of one resolution, or a key range of it, instead
+of the whole tree.
+
+@author: ikespand@GitHub
+"""
+
+from array import array
+from collections import Counter
+import datetime
+import json
+import math
+import os
+from sampler import firebase_key, nest
+
+# Bucket length in seconds -> key
+RESOLUTIONS = {10: "10s", 60: "1m", 3600: "1h"}
+
+# Relative accuracy of the percentiles
+GAMMA = 1.02
+_LOG_GAMMA = math.log(GAMMA)
+
+
+def bucket_path(device, resolution, start):
+    """Path of a bucket, e.g. "rollups/host/1m/2026-10-19/10:31:00"."""
+    t = datetime.datetime.fromtimestamp(start, datetime.timezone.utc)
+    return "rollups/{}/{}/{}".format(firebase_key(device), RESOLUTIONS[resolution],
+                                     t.strftime("%Y-%m-%d/%H:%M:%S"))
+
+
+def bucket_start(day, key):
+    """Start (epoch) of a bucket from its day and key of `bucket_path()`."""
+    t = datetime.datetime.strptime(day + " " + key, "%Y-%m-%d %H:%M:%S")
+    return t.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+class _Bucket():
+    """Running min/max/sum and histogram of every field."""
+    def __init__(self, start, n_fields):
+        self.start = start
+        self.n = 0
+        self.mins = array("d", [math.inf])*n_fields
+        self.maxs = array("d", [-math.inf])*n_fields
+        self.sums = array("d", bytes(8*n_fields))
+        # Bin -> count, the bin None holds the values <= 0
+        self.histograms = [Counter() for _ in range(n_fields)]
+
+    def add(self, values):
+        self.n += 1
+        for i, v in enumerate(values):
+            if v < self.mins[i]:
+                self.mins[i] = v
+            if v > self.maxs[i]:
+                self.maxs[i] = v
+            self.sums[i] += v
+            self.histograms[i][math.ceil(math.log(v)/_LOG_GAMMA) if v > 0 else None] += 1
+
+    def merge(self, other):
+        self.n += other.n
+        for i in range(len(self.sums)):
+            self.mins[i] = min(self.mins[i], other.mins[i])
+            self.maxs[i] = max(self.maxs[i], other.maxs[i])
+            self.sums[i] += other.sums[i]
+            self.histograms[i].update(other.histograms[i])
+
+    def percentile(self, i, q):
+        rank = q/100*(self.n - 1)
+        seen = 0
+        histogram = self.histograms[i]
+        # Values <= 0 first
+        for b in [None] + sorted(k for k in histogram if k is not None):
+            seen += histogram[b]
+            if seen > rank:
+                # Middle of the bin, within the exact bounds
+                value = 0.0 if b is None else 2*GAMMA**b/(GAMMA + 1)
+                return min(max(value, self.mins[i]), self.maxs[i])
+        return self.maxs[i]
+
+    def to_dict(self):
+        return {"start": self.start, "n": self.n, "mins": list(self.mins),
+                "maxs": list(self.maxs), "sums": list(self.sums),
+                "histograms": [list(h.items()) for h in self.histograms]}
+
+    @classmethod
+    def from_dict(cls, d):
+        bucket = cls(d["start"], len(d["sums"]))
+        bucket.n = d["n"]
+        bucket.mins = array("d", d["mins"])
+        bucket.maxs = array("d", d["maxs"])
+        bucket.sums = array("d", d["sums"])
+        bucket.histograms = [Counter(dict(h)) for h in d["histograms"]]
+        return bucket
+
+    def stats(self, fields):
+        return dict(nest(fields, [{"min": self.mins[i], "max": self.maxs[i],
+                                   "mean": self.sums[i]/self.n,
+                                   "p95": self.percentile(i, 95)}
+                                  for i in range(len(fields))]),
+                    n=self.n)
+
+
+class Rollup():
+    """
+    Aggregates the rows of a `Sampler` into buckets. `add()` returns the
+    buckets finished by a row as (resolution, start, stats).
+    """
+    def __init__(self, sampler, resolutions=tuple(RESOLUTIONS), state_fname=None):
+        """
+        Parameters
+        ----------
+        sampler : Sampler
+            Sampler of the rows, only its aggregated sets are rolled up.
+        resolutions : tuple, optional
+            Bucket lengths in seconds, each a multiple of the previous one. The
+            default is (10, 60, 3600).
+        state_fname : str, optional
+            JSON file the open buckets are saved to by `flush()` and whenever
+            a bucket is finished. If it exists, its buckets are continued. The
+            default is None.
+
+        """
+        self.resolutions = sorted(resolutions)
+        if any(r not in RESOLUTIONS for r in self.resolutions) or any(
+                b % a for a, b in zip(self.resolutions, self.resolutions[1:])):
+            raise ValueError("Unsupported resolutions: {}".format(resolutions))
+        fields = sampler.aggregate_fields()
+        self.indices = [i for i, _ in fields]
+        self.fields = [name for _, name in fields]
+        self.buckets = [None]*len(self.resolutions)
+        self.state_fname = state_fname
+        if state_fname is not None and os.path.isfile(state_fname):
+            self._load_state()
+
+    def _load_state(self):
+        with open(self.state_fname) as f:
+            state = json.load(f)
+        if (state["resolutions"] != self.resolutions or
+                state["fields"] != [list(name) for name in self.fields]):
+            # Other metrics, the saved buckets can't be continued
+            return
+        self.buckets = [None if b is None else _Bucket.from_dict(b)
+                        for b in state["buckets"]]
+
+    def _save_state(self):
+        state = {"resolutions": self.resolutions,
+                 "fields": [list(name) for name in self.fields],
+                 "buckets": [None if b is None else b.to_dict() for b in self.buckets]}
+        # Replaced atomically, a crash while saving keeps the previous state
+        tmp_fname = self.state_fname + ".tmp"
+        with open(tmp_fname, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_fname, self.state_fname)
+
+    def add(self, row):
+        """Add a row (time first), returns the finished buckets."""
+        finished = self._close(row[0])
+        if finished and self.state_fname is not None:
+            # The finished buckets are uploaded, a restart must not continue them
+            self._save_state()
+        first = self.resolutions[0]
+        if self.buckets[0] is None:
+            self.buckets[0] = _Bucket(row[0] // first * first, len(self.fields))
+        self.buckets[0].add([row[i] for i in self.indices])
+        return finished
+
+    def _close(self, now=None):
+        """Finish the buckets which ended before `now` (all if None), the
+        finer ones are merged into the next resolution."""
+        finished = []
+        for k, resolution in enumerate(self.resolutions):
+            bucket = self.buckets[k]
+            if bucket is None:
+                continue
+            if now is not None and now < bucket.start + resolution:
+                break
+            finished.append((resolution, bucket.start, bucket.stats(self.fields)))
+            self.buckets[k] = None
+            if k + 1 < len(self.resolutions):
+                coarser = self.resolutions[k + 1]
+                if self.buckets[k + 1] is None:
+                    self.buckets[k + 1] = _Bucket(bucket.start // coarser * coarser,
+                                                  len(self.fields))
+                self.buckets[k + 1].merge(bucket)
+        return finished
+
+    def flush(self):
+        """Finish the open buckets, e.g. on shutdown. Their `n` tells they
+        are partial. With `state_fname` they are saved first, to be continued
+        by the next run."""
+        if self.state_fname is not None:
+            self._save_state()
+        return self._close()
@@ -0,0 +1,447 @@
+#!/usr/bin/python
+# coding=utf-8
+"""
+Created on Mon Oct 19 09:05:47 2026
+
+Low overhead sampler of the system metrics, e.g. at 10 Hz. The metrics are
+grouped in sets which are enabled per agent:
+    "system": RAM, CPU and root disk usage in % (the fields of `sys_info()`),
+    "cpu": usage of every core in %,
+    "net": received/sent bytes per second of every NIC,
+    "disk": read/written bytes per second and busy time in % of every disk,
+    "procs": the top N processes by CPU usage.
+
+On Linux the counters are read from /proc, the files are kept open and re-read
+with `pread`, which is much cheaper than psutil building its named tuples.
+Elsewhere psutil is used. A sample is a flat `array("d")` whose layout is
+given by `Sampler.fields`, and the last samples are kept in a `SampleRing`.
+
+@author: ikespand@GitHub
+"""
+
+import abc
+from array import array
+import os
+import shutil
+import time
+import psutil
+
+USE_PROC = os.path.exists("/proc/stat")
+
+# Characters not allowed in the keys of the realtime database
+_KEY_TRANS = str.maketrans({c: "_" for c in ".$#[]/"})
+
+
+def firebase_key(name):
+    """`name` usable as key of the realtime database."""
+    return str(name).translate(_KEY_TRANS)
+
+
+def nest(fields, values):
+    """Nested dict of the values of the fields (tuples of names)."""
+    d = {}
+    for name, value in zip(fields, values):
+        node = d
+        for key in name[:-1]:
+            node = node.setdefault(firebase_key(key), {})
+        node[name[-1]] = value
+    return d
+
+
+class ProcFile():
+    """A file of /proc kept open between the reads."""
+    def __init__(self, path):
+        self.fd = os.open(path, os.O_RDONLY)
+
+    def read(self):
+        chunks = []
+        offset = 0
+        while True:
+            chunk = os.pread(self.fd, 65536, offset)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+            offset += len(chunk)
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _rate(new, old, dt):
+    # Counters are reset e.g. when a NIC is re-created
+    return max(0.0, (new - old) / dt) if dt > 0 else 0.0
+
+
+class MetricSet(abc.ABC):
+    """
+    A group of metrics. `fields` are the names of its values in a sample,
+    `sample()` writes them to a row starting at `offset`. Sets with
+    `aggregate` are rolled up before the upload, see `rollup.py`.
+    """
+    fields = []
+    aggregate = True
+
+    @abc.abstractmethod
+    def sample(self, now, row, offset):
+        """Write the values of the set to `row[offset:offset + len(fields)]`."""
+
+    def to_dict(self, values):
+        """Values of the set as nested dict for the database."""
+        return nest(self.fields, values)
+
+    def close(self):
+        pass
+
+
+class CpuTimes():
+    """(busy, total) CPU time of all cores and of every core."""
+    def __init__(self):
+        self.file = ProcFile("/proc/stat") if USE_PROC else None
+
+    def read(self):
+        if self.file is None:
+            times = [psutil.cpu_times()] + psutil.cpu_times(percpu=True)
+            # guest time is part of user time
+            totals = [sum(t) - getattr(t, "guest", 0) - getattr(t, "guest_nice", 0)
+                      for t in times]
+            idles = [t.idle + getattr(t, "iowait", 0) for t in times]
+        else:
+            totals, idles = [], []
+            for line in self.file.read().split(b"\n"):
+                if not line.startswith(b"cpu"):
+                    break
+                # user nice system idle iowait irq softirq steal guest guest_nice
+                values = [int(v) for v in line.split()[1:9]]
+                totals.append(sum(values))
+                idles.append(values[3] + values[4])
+        return [(total - idle, total) for total, idle in zip(totals, idles)]
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def _usage(new, old):
+    busy, total = new[0] - old[0], new[1] - old[1]
+    return 100.0*busy/total if total > 0 else 0.0
+
+
+class SystemMetrics(MetricSet):
+    """RAM, CPU and disk usage in %, as `sys_info()`."""
+    fields = [("ram_usage",), ("cpu_usage",), ("disk_usage",)]
+
+    def __init__(self, cpu_times, disk_path="/"):
+        self.cpu_times = cpu_times
+        self.disk_path = disk_path
+        self.meminfo = ProcFile("/proc/meminfo") if USE_PROC else None
+        self.last = cpu_times.read()[0]
+
+    def ram_usage(self):
+        if self.meminfo is None:
+            return psutil.virtual_memory().percent
+        mem = {}
+        for line in self.meminfo.read().split(b"\n"):
+            key, _, value = line.partition(b":")
+            if key in (b"MemTotal", b"MemAvailable"):
+                mem[key] = int(value.split()[0])
+                if len(mem) == 2:
+                    break
+        return 100.0*(mem[b"MemTotal"] - mem[b"MemAvailable"])/mem[b"MemTotal"]
+
+    def sample(self, now, row, offset):
+        cpu = self.cpu_times.read()[0]
+        disk = shutil.disk_usage(self.disk_path)
+        row[offset] = self.ram_usage()
+        row[offset + 1] = _usage(cpu, self.last)
+        row[offset + 2] = disk[1]/disk[0]*100
+        self.last = cpu
+
+    def close(self):
+        if self.meminfo is not None:
+            self.meminfo.close()
+
+
+class CoreMetrics(MetricSet):
+    """Usage of every core in %."""
+    def __init__(self, cpu_times):
+        self.cpu_times = cpu_times
+        self.last = cpu_times.read()[1:]
+        self.fields = [("cpu", str(i)) for i in range(len(self.last))]
+
+    def sample(self, now, row, offset):
+        cores = self.cpu_times.read()[1:]
+        for i, (new, old) in enumerate(zip(cores, self.last)):
+            row[offset + i] = _usage(new, old)
+        self.last = cores
+
+
+class CounterMetrics(MetricSet):
+    """
+    Rates of the counters of a fixed set of devices, the devices are chosen
+    when the set is created.
+    """
+    group = None
+    names = []
+
+    def __init__(self, devices=None):
+        counters = self.read()
+        self.devices = [d for d in (devices or self.default_devices(counters))
+                        if d in counters]
+        self.fields = [(self.group, d, name) for d in self.devices for name in self.names]
+        self.last = counters
+        self.last_time = time.time()
+
+    @abc.abstractmethod
+    def read(self):
+        """device -> counters, in the order of `names`."""
+
+    def default_devices(self, counters):
+        return list(counters)
+
+    def sample(self, now, row, offset):
+        counters = self.read()
+        dt = now - self.last_time
+        for device in self.devices:
+            new = counters.get(device)
+            old = self.last.get(device)
+            for k in range(len(self.names)):
+                row[offset] = _rate(new[k], old[k], dt) if new and old else 0.0
+                offset += 1
+        self.last, self.last_time = counters, now
+
+
+class NetMetrics(CounterMetrics):
+    """Received/sent bytes per second of every NIC."""
+    group = "net"
+    names = ["rx_bytes_s", "tx_bytes_s"]
+
+    def __init__(self, devices=None):
+        self.file = ProcFile("/proc/net/dev") if USE_PROC else None
+        super().__init__(devices)
+
+    def read(self):
+        if self.file is None:
+            return {nic: (c.bytes_recv, c.bytes_sent)
+                    for nic, c in psutil.net_io_counters(pernic=True).items()}
+        counters = {}
+        # Two lines of header, then "nic: rx_bytes ... (8 rx columns) tx_bytes ..."
+        for line in self.file.read().decode().split("\n")[2:]:
+            nic, _, values = line.partition(":")
+            values = values.split()
+            if values:
+                counters[nic.strip()] = (int(values[0]), int(values[8]))
+        return counters
+
+    def default_devices(self, counters):
+        return [nic for nic in counters if nic != "lo"]
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class DiskMetrics(CounterMetrics):
+    """Read/written bytes per second and busy time in % of every disk."""
+    group = "disk"
+    names = ["read_bytes_s", "write_bytes_s", "busy_pct"]
+
+    def __init__(self, devices=None):
+        self.file = ProcFile("/proc/diskstats") if USE_PROC else None
+        super().__init__(devices)
+
+    def read(self):
+        if self.file is None:
+            return {disk: (c.read_bytes, c.write_bytes, getattr(c, "busy_time", 0)/10)
+                    for disk, c in psutil.disk_io_counters(perdisk=True).items()}
+        counters = {}
+        for line in self.file.read().split(b"\n"):
+            values = line.split()
+            if len(values) >= 13:
+                # Sectors of 512 bytes, the time doing I/O in ms (as % per s: /10)
+                counters[values[2].decode()] = (int(values[5])*512, int(values[9])*512,
+                                                int(values[12])/10)
+        return counters
+
+    def default_devices(self, counters):
+        if not USE_PROC:
+            return list(counters)
+        # Whole disks, no partitions, loop or RAM devices
+        return [d for d in counters if os.path.exists("/sys/block/" + d)
+                and not d.startswith(("loop", "ram", "zram"))]
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class ProcessMetrics(MetricSet):
+    """
+    The top N processes by CPU usage (in % of a core) with their RSS. Listing
+    all processes is the most expensive part of a sample, so they are scanned
+    every `interval` seconds only and the other samples repeat the last scan.
+    """
+    names = ["pid", "cpu_pct", "rss_mb"]
+    # The top N changes between the samples, a mean of the slots is meaningless
+    aggregate = False
+
+    def __init__(self, top_n=5, interval=1.0):
+        self.top_n = top_n
+        self.interval = interval
+        self.fields = [("procs", str(i), name) for i in range(top_n) for name in self.names]
+        self.process_names = {}  # pid -> name, of the current top N
+        self.clock_ticks = os.sysconf("SC_CLK_TCK") if USE_PROC else 1
+        self.page_mb = os.sysconf("SC_PAGE_SIZE")/2**20 if USE_PROC else 1/2**20
+        self.last = self.read()
+        self.last_time = time.time()
+        self.top = []
+
+    def read(self):
+        """pid -> (name, CPU seconds, RSS in pages)."""
+        processes = {}
+        if not USE_PROC:
+            for p in psutil.process_iter(["name", "cpu_times", "memory_info"]):
+                if p.info["cpu_times"] is not None:
+                    processes[p.pid] = (p.info["name"], sum(p.info["cpu_times"][:2]),
+                                        p.info["memory_info"].rss)
+            return processes
+        with os.scandir("/proc") as entries:
+            for entry in entries:
+                if not entry.name.isdigit():
+                    continue
+                try:
+                    with open("/proc/{}/stat".format(entry.name), "rb") as f:
+                        stat = f.read()
+                except OSError:
+                    continue  # Exited meanwhile
+                # The name is in parentheses and may contain spaces
+                end = stat.rfind(b")")
+                values = stat[end + 2:].split()
+                processes[int(entry.name)] = (stat[stat.find(b"(") + 1:end].decode(errors="replace"),
+                                              (int(values[11]) + int(values[12]))/self.clock_ticks,
+                                              int(values[21]))
+        return processes
+
+    def sample(self, now, row, offset):
+        dt = now - self.last_time
+        if dt >= self.interval:
+            processes = self.read()
+            usage = [(100.0*(cpu - self.last[pid][1])/dt if pid in self.last else 0.0, pid)
+                     for pid, (_, cpu, _) in processes.items()]
+            self.top = [(pid, cpu, processes[pid][2]*self.page_mb)
+                        for cpu, pid in sorted(usage, reverse=True)[:self.top_n]]
+            self.process_names = {pid: processes[pid][0] for pid, _, _ in self.top}
+            self.last, self.last_time = processes, now
+        for i in range(self.top_n):
+            row[offset + 3*i:offset + 3*i + 3] = array("d", self.top[i] if i < len(self.top)
+                                                       else (0.0, 0.0, 0.0))
+
+    def to_dict(self, values):
+        procs = {}
+        for i in range(self.top_n):
+            pid, cpu, rss = values[3*i:3*i + 3]
+            if pid:
+                procs[str(i)] = {"pid": int(pid), "name": self.process_names.get(int(pid), ""),
+                                 "cpu_pct": cpu, "rss_mb": rss}
+        return {"procs": procs}
+
+
+METRIC_SETS = ("system", "cpu", "net", "disk", "procs")
+
+
+class SampleRing():
+    """The last `capacity` samples in one preallocated array of doubles."""
+    def __init__(self, n_fields, capacity=3600):
+        self.n_fields = n_fields
+        self.capacity = capacity
+        self.data = array("d", bytes(8*n_fields*capacity))
+        self.count = 0  # Samples appended so far
+
+    def append(self, row):
+        i = self.count % self.capacity
+        self.data[i*self.n_fields:(i + 1)*self.n_fields] = row
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def since(self, seq):
+        """Samples with sequence number >= `seq` which are still kept, as
+        (seq, memoryview of the row)."""
+        view = memoryview(self.data)
+        for s in range(max(seq, self.count - self.capacity), self.count):
+            i = s % self.capacity
+            yield s, view[i*self.n_fields:(i + 1)*self.n_fields]
+
+
+class Sampler():
+    """
+    Samples the enabled metric sets into a ring of flat rows.
+    """
+    def __init__(self, metrics=("system",), top_n=5, process_interval=1.0,
+                 nics=None, disks=None, capacity=3600):
+        """
+        Parameters
+        ----------
+        metrics : tuple, optional
+            Enabled sets, see `METRIC_SETS`. The default is ("system",).
+        top_n : int, optional
+            Processes of the "procs" set. The default is 5.
+        process_interval : float, optional
+            Seconds between the scans of the processes. The default is 1.0.
+        nics : list, optional
+            NICs of the "net" set. The default is None (all but lo).
+        disks : list, optional
+            Disks of the "disk" set. The default is None (all whole disks).
+        capacity : int, optional
+            Samples kept in `ring`. The default is 3600.
+
+        """
+        unknown = set(metrics) - set(METRIC_SETS)
+        if unknown:
+            raise ValueError("Unknown metric sets: {}".format(", ".join(sorted(unknown))))
+        self.cpu_times = CpuTimes()
+        factories = {"system": lambda: SystemMetrics(self.cpu_times),
+                     "cpu": lambda: CoreMetrics(self.cpu_times),
+                     "net": lambda: NetMetrics(nics),
+                     "disk": lambda: DiskMetrics(disks),
+                     "procs": lambda: ProcessMetrics(top_n, process_interval)}
+        self.sets = [factories[name]() for name in metrics]
+        self.fields = [("time",)] + [f for s in self.sets for f in s.fields]
+        self.row = array("d", bytes(8*len(self.fields)))
+        self.ring = SampleRing(len(self.fields), capacity)
+
+    def sample(self):
+        """Take a sample, returns the row (reused by the next sample)."""
+        now = time.time()
+        self.row[0] = now
+        offset = 1
+        for s in self.sets:
+            s.sample(now, self.row, offset)
+            offset += len(s.fields)
+        self.ring.append(self.row)
+        return self.row
+
+    def aggregate_fields(self):
+        """(index in the row, name) of the fields of aggregated sets."""
+        fields = []
+        offset = 1
+        for s in self.sets:
+            if s.aggregate:
+                fields += [(offset + i, name) for i, name in enumerate(s.fields)]
+            offset += len(s.fields)
+        return fields
+
+    def to_dict(self, row=None):
+        """A row (by default the last one) as dict for the database."""
+        row = self.row if row is None else row
+        d = {}
+        offset = 1
+        for s in self.sets:
+            d.update(s.to_dict(row[offset:offset + len(s.fields)]))
+            offset += len(s.fields)
+        return d
+
+    def close(self):
+        for s in self.sets:
+            s.close()
+        self.cpu_times.close()
@@ -0,0 +1,214 @@
+#!/usr/bin/python
+# coding=utf-8
+"""
+Created on Sun Oct 18 22:40:19 2026
+
+Durable local spool of the samples. The collector appends every sample to a
+SQLite file in WAL mode (a short local write, independent of the network),
+and `SpoolUploader` drains it in order from a background thread with multi-path
+`update()`s. Rows are deleted only after the backend accepted them, so samples
+taken during an outage, or before a restart of the agent, are sent later.
+
+@author: ikespand@GitHub
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+
+class SampleSpool():
+    """
+    Append-only queue of (path, data) samples in a SQLite file, shared by the
+    collector and the uploader thread.
+    """
+    def __init__(self, fname="spool.sqlite", max_rows=1000000):
+        """
+        Parameters
+        ----------
+        fname : str, optional
+            Spool file. The default is "spool.sqlite".
+        max_rows : int, optional
+            Samples kept at most, the oldest ones are dropped beyond (e.g. after
+            a very long outage). The default is 1000000.
+
+        """
+        self.fname = fname
+        self.max_rows = max_rows
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(fname, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # A commit survives a crash of the agent, only a power loss may cost the
+        # last ones. FULL would fsync on every sample.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS spool (
+                                      seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                                      created REAL NOT NULL,
+                                      path TEXT NOT NULL,
+                                      data TEXT NOT NULL)""")
+        self._rows = self._conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def __len__(self):
+        return self._rows
+
+    def append(self, path, data):
+        """Store a sample, `data` has to be JSON serializable."""
+        row = (time.time(), path, json.dumps(data))
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO spool (created, path, data) VALUES (?, ?, ?)", row)
+            self._rows += 1
+            if self._rows > self.max_rows:
+                n = self._rows - self.max_rows
+                self._conn.execute("""DELETE FROM spool WHERE seq IN
+                                          (SELECT seq FROM spool ORDER BY seq LIMIT ?)""", (n,))
+                self._rows -= n
+                self.dropped += n
+
+    def oldest(self):
+        """Creation time of the oldest sample, None if the spool is empty."""
+        with self._lock:
+            row = self._conn.execute("SELECT created FROM spool ORDER BY seq LIMIT 1").fetchone()
+        return row and row[0]
+
+    def peek(self, n):
+        """
+        Oldest samples, without removing them.
+
+        Returns
+        -------
+        last_seq : int
+            Sequence number of the last returned sample, for `ack()`.
+        batch : dict
+            path -> data, oldest first.
+
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT seq, path, data FROM spool ORDER BY seq LIMIT ?",
+                                      (n,)).fetchall()
+        # A later sample of the same path wins, as it would in the database
+        return (rows[-1][0] if rows else None,
+                {path: json.loads(data) for _, path, data in rows})
+
+    def ack(self, last_seq):
+        """Remove the samples up to `last_seq`, once they are written."""
+        with self._lock, self._conn:
+            deleted = self._conn.execute("DELETE FROM spool WHERE seq <= ?", (last_seq,)).rowcount
+            self._rows -= deleted
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SpoolUploader():
+    """
+    Background thread sending the spooled samples in order. Give it its own
+    database instance (`firebase.database()`), pyrebase's isn't thread-safe.
+    """
+    def __init__(self, spool, db, max_samples=100, max_delay=10.0, max_batch=1000,
+                 max_backoff=300.0):
+        """
+        Parameters
+        ----------
+        spool : SampleSpool
+            Samples to send.
+        db : pyrebase.pyrebase.Database
+            Database to write to.
+        max_samples : int, optional
+            Spooled samples which trigger a write. The default is 100.
+        max_delay : float, optional
+            Seconds a sample waits at most before a write. The default is 10.0.
+        max_batch : int, optional
+            Samples per request. The default is 1000.
+        max_backoff : float, optional
+            Upper bound of the wait between retries. The default is 300.0.
+
+        """
+        self.spool = spool
+        self.db = db
+        self.max_samples = max_samples
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.max_backoff = max_backoff
+        self.stats = {"requests": 0, "samples": 0, "failures": 0}
+        self._retry_at = 0.0
+        self._backoff = 1.0
+        self._flush_requested = False
+        self._closing = False
+        self._cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def notify(self):
+        """Wake the uploader, e.g. after appending a sample."""
+        with self._cond:
+            self._cond.notify()
+
+    def _due(self):
+        """Seconds until the next write is due, None if the spool is empty."""
+        if not len(self.spool):
+            return None
+        now = time.monotonic()
+        if now < self._retry_at and not self._closing:
+            return self._retry_at - now
+        if self._closing or self._flush_requested or len(self.spool) >= self.max_samples:
+            return 0.0
+        # The spool is shared with the collector, its times are wall clock
+        return max(0.0, self.spool.oldest() + self.max_delay - time.time())
+
+    def _run(self):
+        while True:
+            with self._cond:
+                due = self._due()
+                while due is None or due > 0:
+                    if due is None and self._closing:
+                        return
+                    self._cond.wait(due)
+                    due = self._due()
+            sent = self._send()
+            with self._cond:
+                if not len(self.spool):
+                    self._flush_requested = False
+                if not sent and self._closing:
+                    # One attempt only on close, the rest stays in the spool
+                    return
+                self._cond.notify_all()
+
+    def _send(self):
+        last_seq, batch = self.spool.peek(self.max_batch)
+        if not batch:
+            return True
+        try:
+            # A PATCH on the root with "a/b" keys is a multi-path update
+            self.db.update(batch)
+        except Exception as err:
+            print("Writing {} samples failed with error: {}".format(len(batch), err))
+            self.stats["failures"] += 1
+            self._retry_at = time.monotonic() + self._backoff
+            self._backoff = min(2*self._backoff, self.max_backoff)
+            return False
+        self.spool.ack(last_seq)
+        self.stats["requests"] += 1
+        self.stats["samples"] += len(batch)
+        self._backoff = 1.0
+        self._retry_at = 0.0
+        return True
+
+    def flush(self, timeout=None):
+        """Write the spooled samples now and wait until the spool is empty.
+        Returns False on timeout, e.g. while the backend is unreachable."""
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not len(self.spool), timeout)
+
+    def close(self, timeout=30.0):
+        """Send the spool (one attempt) and stop the uploader thread. Unsent
+        samples are kept for the next start."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self.thread.join(timeout)
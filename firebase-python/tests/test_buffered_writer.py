@@ -0,0 +1,87 @@
+import threading
+import time
+
+from buffered_writer import BufferedFirebaseWriter
+
+
+class FakeDb():
+    """`update()` fails the first `failures` times."""
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.updates = []
+        self.lock = threading.Lock()
+
+    def update(self, data):
+        with self.lock:
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("offline")
+            self.updates.append(dict(data))
+
+    @property
+    def written(self):
+        with self.lock:
+            return {k: v for update in self.updates for k, v in update.items()}
+
+
+def test_batches_in_order():
+    db = FakeDb()
+    writer = BufferedFirebaseWriter(db, max_samples=100, max_batch=3)
+    for i in range(5):
+        writer.add("dev/{}".format(i), {"v": i})
+    writer.add("dev/1", {"v": 10})
+    assert writer.flush(timeout=5)
+    assert [list(u) for u in db.updates] == [["dev/0", "dev/2", "dev/3"], ["dev/4", "dev/1"]]
+    assert db.written["dev/1"] == {"v": 10}
+    assert writer.stats["requests"] == 2 and writer.stats["samples"] == 5
+    writer.close()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_writes_when_full_or_late():
+    db = FakeDb()
+    writer = BufferedFirebaseWriter(db, max_samples=2, max_delay=0.3)
+    writer.add("dev/0", 0)
+    writer.add("dev/1", 1)
+    assert wait_for(lambda: len(db.written) == 2)
+    writer.add("dev/2", 2)
+    time.sleep(0.1)
+    assert len(db.written) == 2
+    assert wait_for(lambda: len(db.written) == 3)
+    assert [list(u) for u in db.updates] == [["dev/0", "dev/1"], ["dev/2"]]
+    writer.close()
+
+
+def test_retry_keeps_order():
+    db = FakeDb(failures=2)
+    writer = BufferedFirebaseWriter(db, max_samples=100)
+    writer._backoff = 0.01
+    writer.add("dev/0", 0)
+    writer.add("dev/1", 1)
+    writer.flush(timeout=0)
+    writer.add("dev/2", 2)
+    assert writer.flush(timeout=5)
+    assert list(db.written) == ["dev/0", "dev/1", "dev/2"]
+    assert writer.stats["failures"] == 2
+    assert writer.stats["samples"] == 3
+    writer.close()
+
+
+def test_offline_drops_oldest_and_close_gives_up():
+    db = FakeDb(failures=10**6)
+    writer = BufferedFirebaseWriter(db, max_samples=100, max_pending=3)
+    for i in range(5):
+        writer.add("dev/{}".format(i), i)
+    assert writer.stats["dropped"] == 2
+    assert list(writer._buffer) == ["dev/2", "dev/3", "dev/4"]
+    assert not writer.flush(timeout=0.2)
+    writer.close(timeout=5)
+    assert not writer.thread.is_alive()
+    assert writer.stats["dropped"] == 5
+    assert db.updates == []
@@ -0,0 +1,106 @@
+import datetime
+
+from query import MetricsQuery, sample_key
+from rollup import bucket_path
+
+
+class FakeResponse():
+    def __init__(self, value):
+        self.value = value
+
+    def val(self):
+        return self.value
+
+
+class FakeQuery():
+    """pyrebase query of a child of a nested dict, ordered by key."""
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+        self.start = self.end = self.limit = None
+        self.is_shallow = False
+
+    def child(self, path):
+        self.path = "/".join(p for p in (self.path, path) if p)
+        return self
+
+    def shallow(self):
+        self.is_shallow = True
+        return self
+
+    def order_by_key(self):
+        return self
+
+    def start_at(self, key):
+        self.start = key
+        return self
+
+    def end_at(self, key):
+        self.end = key
+        return self
+
+    def limit_to_first(self, n):
+        self.limit = n
+        return self
+
+    def get(self):
+        self.db.requests.append((self.path, self.start, self.end, self.limit))
+        node = self.db.data
+        for key in self.path.split("/"):
+            node = node.get(key, {})
+        if self.is_shallow:
+            return FakeResponse({k: True for k in node} or None)
+        items = sorted((k, v) for k, v in node.items()
+                       if (self.start is None or k >= self.start) and
+                       (self.end is None or k <= self.end))
+        return FakeResponse(dict(items[:self.limit]) or None)
+
+
+class FakeDb():
+    def __init__(self, data):
+        self.data = data
+        self.requests = []
+
+    def child(self, path):
+        return FakeQuery(self, path)
+
+
+T0 = datetime.datetime(2026, 10, 19, 10, tzinfo=datetime.timezone.utc).timestamp()
+
+
+def test_sample_key_sorts_by_time():
+    assert sample_key(T0 + 0.25) == "20261019T100000250000Z"
+    keys = [sample_key(T0 + dt) for dt in (0, 0.5, 9, 3600*24*40)]
+    assert keys == sorted(keys)
+
+
+def test_samples_paged_and_ranged():
+    samples = {sample_key(T0 + i): {"i": i} for i in range(7)}
+    # Legacy keys (%d%m%YT%H%M%S), also within the range
+    legacy = {"19102026T100003": {"i": -1}, "01102026T100000": {"i": -2}}
+    db = FakeDb({"host": dict(samples, **legacy)})
+    query = MetricsQuery(db, page_size=2)
+    assert [v["i"] for _, v in query.samples("host")] == list(range(7))
+    # Each page but the first also returns the last key of the previous one
+    assert [r[3] for r in db.requests] == [2, 3, 3, 3, 3]
+    assert [v["i"] for _, v in query.samples("host", T0 + 2, T0 + 5)] == [2, 3, 4, 5]
+    assert [v["i"] for _, v in query.samples("host", end=T0 + 1)] == [0, 1]
+    assert list(query.samples("host", T0 + 100)) == []
+
+
+def test_buckets_across_days_and_pages():
+    data = {}
+    starts = [T0 + 60*i for i in range(5)] + [T0 + 86400 + 60*i for i in range(3)]
+    for start in starts:
+        node = data
+        for key in bucket_path("host", 60, start).split("/"):
+            node = node.setdefault(key, {})
+        node["n"] = start
+    db = FakeDb(data)
+    query = MetricsQuery(db, page_size=2)
+    found = list(query.buckets("host", 60, T0 + 60, T0 + 86400 + 60))
+    assert [start for start, _ in found] == starts[1:7]
+    assert all(stats["n"] == start for start, stats in found)
+    # One listing of the days, no request for the day without buckets
+    assert sum(r[3] is None for r in db.requests) == 1
+    assert list(query.buckets("host", 60, T0 - 86400*3, T0 - 86400)) == []
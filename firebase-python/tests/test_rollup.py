@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from rollup import Rollup, bucket_path, bucket_start
+
+
+class FakeSampler():
+    """Rows of (time, cpu, temp), temp isn't aggregated."""
+    def aggregate_fields(self):
+        return [(1, ("cpu",))]
+
+
+def rows(times, value=1.0):
+    return [(t, value, 20.0) for t in times]
+
+
+def add_all(rollup, rows):
+    finished = []
+    for row in rows:
+        finished += rollup.add(row)
+    return finished
+
+
+def test_bucket_boundaries():
+    rollup = Rollup(FakeSampler(), resolutions=(10, 60))
+    assert add_all(rollup, rows([0, 5, 9.99])) == []
+    finished = rollup.add((10, 4.0, 20.0))
+    assert [(r, start, stats["n"]) for r, start, stats in finished] == [(10, 0, 3)]
+    assert finished[0][2]["cpu"] == {"min": 1.0, "max": 1.0, "mean": 1.0, "p95": 1.0}
+    finished = add_all(rollup, rows([59.99, 60]))
+    # The 10 s buckets of 10 and 50, then the minute merged from them
+    assert [(r, start, stats["n"]) for r, start, stats in finished] == [
+        (10, 10, 1), (10, 50, 1), (60, 0, 5)]
+    assert finished[-1][2]["cpu"]["max"] == 4.0
+    assert finished[-1][2]["cpu"]["mean"] == pytest.approx(8.0/5)
+    assert [(r, start, stats["n"]) for r, start, stats in rollup.flush()] == [
+        (10, 60, 1), (60, 60, 1)]
+
+
+def test_unsupported_resolutions():
+    with pytest.raises(ValueError):
+        Rollup(FakeSampler(), resolutions=(10, 15))
+
+
+def test_bucket_path():
+    path = bucket_path("my.host", 60, 3600*24 + 61)
+    assert path == "rollups/my_host/1m/1970-01-02/00:01:01"
+    assert bucket_start(*path.split("/")[-2:]) == 3600*24 + 61
+
+
+def test_restart_continues_buckets(tmp_path):
+    fname = str(tmp_path / "rollup.json")
+    rollup = Rollup(FakeSampler(), resolutions=(10, 60), state_fname=fname)
+    add_all(rollup, rows([0, 5, 12]))
+    partial = rollup.flush()
+    assert [(r, start, stats["n"]) for r, start, stats in partial] == [(10, 10, 1), (60, 0, 3)]
+
+    rollup = Rollup(FakeSampler(), resolutions=(10, 60), state_fname=fname)
+    assert os.path.isfile(fname)
+    finished = add_all(rollup, rows([15, 25]))
+    assert [(r, start, stats["n"]) for r, start, stats in finished] == [(10, 10, 2)]
+    finished = rollup.add((60, 1.0, 20.0))
+    # The minute holds the rows of both runs
+    assert [(r, start, stats["n"]) for r, start, stats in finished] == [(10, 20, 1), (60, 0, 5)]
+
+
+def test_crash_continues_from_last_finished_bucket(tmp_path):
+    fname = str(tmp_path / "rollup.json")
+    rollup = Rollup(FakeSampler(), resolutions=(10, 60), state_fname=fname)
+    add_all(rollup, rows([0, 5, 12]))
+    # Crashed without flush(): the 10 s bucket of 0 was finished and saved
+    rollup = Rollup(FakeSampler(), resolutions=(10, 60), state_fname=fname)
+    assert [b and (b.start, b.n) for b in rollup.buckets] == [None, (0, 2)]
+    finished = add_all(rollup, rows([15, 60]))
+    assert [(r, start, stats["n"]) for r, start, stats in finished] == [(10, 10, 1), (60, 0, 3)]
+
+
+def test_other_fields_are_not_continued(tmp_path):
+    fname = str(tmp_path / "rollup.json")
+    rollup = Rollup(FakeSampler(), resolutions=(10, 60), state_fname=fname)
+    add_all(rollup, rows([0, 5]))
+    rollup.flush()
+    rollup = Rollup(FakeSampler(), resolutions=(10, 60, 3600), state_fname=fname)
+    assert rollup.buckets == [None, None, None]
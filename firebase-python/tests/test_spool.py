@@ -0,0 +1,72 @@
+import threading
+
+from spool import SampleSpool, SpoolUploader
+
+
+class FakeDb():
+    """`update()` fails while `offline` is set."""
+    def __init__(self, offline=False):
+        self.offline = offline
+        self.updates = []
+        self.lock = threading.Lock()
+
+    def update(self, data):
+        with self.lock:
+            if self.offline:
+                raise ConnectionError("offline")
+            self.updates.append(dict(data))
+
+
+def test_peek_ack_and_max_rows(tmp_path):
+    spool = SampleSpool(str(tmp_path / "spool.sqlite"), max_rows=4)
+    for i in range(6):
+        spool.append("dev/{}".format(i % 5), {"v": i})
+    assert len(spool) == 4 and spool.dropped == 2
+    last_seq, batch = spool.peek(3)
+    assert list(batch) == ["dev/2", "dev/3", "dev/4"]
+    spool.ack(last_seq)
+    assert spool.peek(10)[1] == {"dev/0": {"v": 5}}
+    spool.close()
+
+
+def test_replay_after_outage_and_restart(tmp_path):
+    fname = str(tmp_path / "spool.sqlite")
+    spool = SampleSpool(fname)
+    db = FakeDb(offline=True)
+    uploader = SpoolUploader(spool, db, max_samples=100)
+    for i in range(5):
+        spool.append("dev/{}".format(i), {"v": i})
+    assert not uploader.flush(timeout=0.2)
+    uploader.close(timeout=5)
+    assert not uploader.thread.is_alive()
+    assert uploader.stats["failures"] >= 1
+    spool.close()
+
+    # Restarted agent: the samples of the outage are sent, in order
+    spool = SampleSpool(fname)
+    assert len(spool) == 5
+    db = FakeDb()
+    uploader = SpoolUploader(spool, db, max_samples=100, max_batch=2)
+    spool.append("dev/5", {"v": 5})
+    uploader.notify()
+    assert uploader.flush(timeout=5)
+    assert [list(u) for u in db.updates] == [["dev/0", "dev/1"], ["dev/2", "dev/3"],
+                                            ["dev/4", "dev/5"]]
+    assert len(spool) == 0
+    uploader.close()
+    spool.close()
+
+
+def test_retry_after_failure(tmp_path):
+    spool = SampleSpool(str(tmp_path / "spool.sqlite"))
+    db = FakeDb(offline=True)
+    uploader = SpoolUploader(spool, db, max_samples=1)
+    uploader._backoff = 0.01
+    spool.append("dev/0", {"v": 0})
+    uploader.notify()
+    assert not uploader.flush(timeout=0.1)
+    db.offline = False
+    assert uploader.flush(timeout=5)
+    assert db.updates == [{"dev/0": {"v": 0}}]
+    uploader.close()
+    spool.close()
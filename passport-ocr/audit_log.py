@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:20:44 2026
+
+Append-only audit log of the passport requests. Rows are handed to a
+background thread through a queue (a few microseconds for the request) and
+group-committed into SQLite in WAL mode: every transaction takes all rows
+queued meanwhile, so there is one fsync per batch instead of one per row.
+SQLite's locking makes it safe for several processes (e.g. uvicorn workers)
+appending to the same file, and triggers reject updates and deletes.
+A batch that still fails after MAX_RETRIES attempts (e.g. read-only or full
+disk, corrupt file) is appended to a JSON lines fallback file next to the
+database instead, so a broken database can't back up the queue.
+
+@author: ikespand
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# "Cached" tells requests answered from the result cache, without OCR
+COLUMNS = ["Id", "FirstName", "LastName", "PassportNumber", "PassportImage", "MzrImage",
+           "Cached"]
+
+_CLOSE = object()
+
+# Upper bound of the wait between retries of a failed commit, in seconds
+MAX_BACKOFF = 60.0
+
+# Attempts to commit a batch before it goes to the fallback file
+MAX_RETRIES = 5
+
+# %%
+
+class AuditLog():
+    """Non-blocking writer of audit rows, see `log()`.
+    """
+    def __init__(self, path:str="audit_log.sqlite", columns:list=COLUMNS,
+                 max_queue:int=100000, max_batch:int=1000, fallback_path:str=None):
+        self.path = path
+        self.fallback_path = fallback_path or path + ".failed.jsonl"
+        self.columns = list(columns)
+        self.max_batch = max_batch
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.written = 0
+        # Failed commits, rows written to the fallback file, rows lost
+        self.errors = 0
+        self.spilled = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._init_db()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # fsync on every commit, the commits are batched instead
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        columns = ", ".join('"{}" TEXT'.format(c) for c in self.columns)
+        with conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS audit_log (
+                                logged_at REAL NOT NULL,
+                                pid INTEGER NOT NULL, {})""".format(columns))
+            # Logs created before a column was added get it, with NULL in the old rows
+            existing = [r[1] for r in conn.execute("PRAGMA table_info(audit_log)")]
+            for c in self.columns:
+                if c not in existing:
+                    conn.execute('ALTER TABLE audit_log ADD COLUMN "{}" TEXT'.format(c))
+            for op in ("UPDATE", "DELETE"):
+                conn.execute("""CREATE TRIGGER IF NOT EXISTS audit_log_no_{0}
+                                    BEFORE {1} ON audit_log
+                                    BEGIN SELECT RAISE(ABORT, 'audit_log is append-only'); END
+                             """.format(op.lower(), op))
+        conn.close()
+
+    def log(self, row:list)->bool:
+        """
+        Queue a row, with a value per column. Never blocks: if `max_queue` rows
+        are waiting the row is dropped and counted in `dropped`.
+
+        Returns
+        -------
+        queued : bool
+            False if the row was dropped.
+        """
+        if os.getpid() != self._pid:
+            raise RuntimeError("AuditLog can't be used across fork, create one per process")
+        try:
+            self.queue.put_nowait((time.time(), row))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def _run(self):
+        conn = self._connect()
+        sql = "INSERT INTO audit_log VALUES ({})".format(", ".join("?"*(len(self.columns) + 2)))
+        pid = os.getpid()
+        closing = False
+        while not closing:
+            batch = [self.queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = []
+            for item in batch:
+                if item is _CLOSE:
+                    closing = True
+                else:
+                    rows.append([item[0], pid] + [None if v is None else str(v)
+                                                  for v in item[1]])
+            backoff = 1.0
+            for attempt in range(MAX_RETRIES):
+                try:
+                    with conn:
+                        conn.executemany(sql, rows)
+                    self.written += len(rows)
+                    break
+                except sqlite3.Error as err:
+                    # E.g. locked by other processes for longer than the timeout
+                    print("Writing {} audit rows failed with error: {}".format(len(rows), err))
+                    with self._lock:
+                        self.errors += 1
+                    if attempt + 1 < MAX_RETRIES:
+                        time.sleep(backoff)
+                        backoff = min(2*backoff, MAX_BACKOFF)
+            else:
+                self._spill(rows)
+            for _ in batch:
+                self.queue.task_done()
+        conn.close()
+
+    def _spill(self, rows):
+        """Append rows that can't be committed to the fallback file."""
+        names = ["logged_at", "pid"] + self.columns
+        try:
+            with open(self.fallback_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(dict(zip(names, row))) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as err:
+            print("Writing {} audit rows to {} failed with error: {}".format(
+                len(rows), self.fallback_path, err))
+            with self._lock:
+                self.dropped += len(rows)
+            return None
+        with self._lock:
+            self.spilled += len(rows)
+        return None
+
+    def flush(self):
+        """Block until all queued rows are committed."""
+        self.queue.join()
+
+    def close(self, timeout:float=30.0)->bool:
+        """
+        Commit the queued rows and stop the writer, waiting up to `timeout`
+        seconds. Rows still queued afterwards are lost at exit.
+
+        Returns
+        -------
+        stopped : bool
+            False if the writer didn't finish within `timeout`.
+        """
+        if self.thread.is_alive():
+            deadline = time.time() + timeout
+            try:
+                self.queue.put(_CLOSE, timeout=timeout)
+            except queue.Full:
+                pass
+            self.thread.join(max(0.0, deadline - time.time()))
+        if self.thread.is_alive():
+            print("Audit log writer didn't stop within {} s, {} rows still queued".format(
+                timeout, self.queue.qsize()))
+            return False
+        return True
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:05:41 2026
+
+Benchmark of the MRZ localizers on a sample set. Images in `positive_dir`
+contain a MRZ, images in the optional `negative_dir` don't (e.g. other pages
+or random photos). Reports per backend the latency and the recall (MRZ found
+in positives), plus the false positive rate on the negatives. With --decode
+the RoIs are also OCR'ed and only valid check digits count as found.
+
+Usage: python bench_localizers.py positive_dir [negative_dir] [--decode]
+
+@author: ikespand
+"""
+
+import glob
+import os
+import sys
+import time
+import numpy as np
+import cv2
+import passport_eye_mrz as pem
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png")
+
+# %%
+
+def list_images(directory):
+    if not directory:
+        return []
+    return sorted(f for pattern in IMAGE_PATTERNS
+                  for f in glob.glob(os.path.join(directory, pattern)))
+
+
+def found(image, backend, decode):
+    if decode:
+        return pem.read_from_passport_v2(image, backend=backend) is not None
+    return pem.locate_mrz_roi(image, backend) is not None
+
+
+def bench_backend(images, backend, decode):
+    """Latencies in ms and hits of a backend on decoded images."""
+    latencies, hits = [], []
+    for image in images:
+        st = time.perf_counter()
+        try:
+            hit = found(image, backend, decode)
+        except Exception as err:
+            print("{} failed with error: {}".format(backend, err))
+            hit = False
+        latencies.append((time.perf_counter() - st)*1000)
+        hits.append(hit)
+    return np.array(latencies), np.array(hits, dtype=bool)
+
+# %%
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    decode = "--decode" in sys.argv
+    if not args:
+        sys.exit(__doc__)
+    # Decoding is the same for both backends, so it isn't timed
+    positives = [cv2.imread(f) for f in list_images(args[0])]
+    negatives = [cv2.imread(f) for f in list_images(args[1] if len(args) > 1 else None)]
+    if decode:
+        pem.warmup()
+
+    print("{} positive, {} negative images{}".format(len(positives), len(negatives),
+                                                     ", with OCR" if decode else ""))
+    print("{:<12s} {:>9s} {:>9s} {:>9s} {:>8s} {:>8s}".format(
+        "backend", "mean ms", "p50 ms", "p95 ms", "recall", "fpr"))
+    for backend in pem.MRZ_BACKENDS:
+        lat_pos, hits_pos = bench_backend(positives, backend, decode)
+        lat_neg, hits_neg = bench_backend(negatives, backend, decode)
+        lat = np.concatenate([lat_pos, lat_neg])
+        print("{:<12s} {:>9.1f} {:>9.1f} {:>9.1f} {:>8.3f} {:>8s}".format(
+            backend, lat.mean(), np.percentile(lat, 50), np.percentile(lat, 95),
+            hits_pos.mean() if len(hits_pos) else float("nan"),
+            "{:.3f}".format(hits_neg.mean()) if len(hits_neg) else "-"))
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:10:52 2026
+
+Benchmark of the passport pipelines (v0, v1, v2 with both localizers) on
+synthetic passports. The images are rendered locally: random TD3 MRZs with
+valid check digits in OCR-B (if the font is available, else a fallback font)
+on noisy backgrounds, the ground truth goes to `labels.json`.
+
+The stages are timed by wrapping the module functions, so the pipelines run
+unmodified. The report is JSON: per version and stage the latency percentiles,
+docs/sec, peak memory (Python heap via tracemalloc and the process peak RSS)
+and the decode accuracy, e.g. to compare against the last deploy.
+
+Usage:
+    python bench_pipeline.py generate out_dir [n_images] [font.ttf]
+    python bench_pipeline.py run image_dir [versions...] > report.json
+
+@author: ikespand
+"""
+
+from functools import wraps
+import json
+import os
+import random
+import resource
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+import passport_eye_mrz as pem
+from mrz_candidates import check_digit
+
+VERSIONS = ("v0", "v1", "v2", "v2_cv2")
+FONT_NAMES = ("OCRB.ttf", "OCR-B.ttf", "ocrb10.ttf", "DejaVuSansMono.ttf")
+PAGE_SIZE = (1250, 880)  # ID page of 125x88 mm
+COUNTRIES = ("UTO", "GBR", "FRA", "IND", "D<<", "NLD", "USA")
+PERCENTILES = (50, 90, 95, 99)
+
+# %% Synthetic passports
+
+def _random_date(rng, start_year, end_year):
+    return "{:02d}{:02d}{:02d}".format(rng.randint(start_year, end_year) % 100,
+                                     rng.randint(1, 12), rng.randint(1, 28))
+
+
+def random_td3(rng):
+    """Random TD3 MRZ lines with valid check digits and their fields."""
+    surname = "".join(rng.choices(string.ascii_uppercase, k=rng.randint(3, 12)))
+    names = "<".join("".join(rng.choices(string.ascii_uppercase, k=rng.randint(3, 8)))
+                     for _ in range(rng.randint(1, 2)))
+    country = rng.choice(COUNTRIES)
+    number = "".join(rng.choices(string.ascii_uppercase + string.digits, k=9))
+    birth = _random_date(rng, 1950, 2005)
+    expiry = _random_date(rng, 2025, 2035)
+    optional = "".join(rng.choices(string.ascii_uppercase + string.digits,
+                                   k=rng.randint(0, 14))).ljust(14, "<")
+    line1 = "P<{}{}<<{}".format(country, surname, names)[:44].ljust(44, "<")
+    line2 = (number + check_digit(number) + country + birth + check_digit(birth)
+             + rng.choice("MF") + expiry + check_digit(expiry)
+             + optional + check_digit(optional))
+    line2 += check_digit(line2[0:10] + line2[13:20] + line2[21:43])
+    return [line1, line2], {"number": number, "birth_date": birth}
+
+
+def load_font(size, font_file=None):
+    for name in ([font_file] if font_file else []) + list(FONT_NAMES):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            pass
+    print("OCR-B not found, using the default font", file=sys.stderr)
+    return ImageFont.load_default(size=size)
+
+
+def render_passport(lines, rng, font):
+    """Image of a passport page with the MRZ `lines` at the bottom."""
+    w, h = PAGE_SIZE
+    # Light background with a gradient, some fake printed content and noise
+    base = np.linspace(rng.randint(200, 235), rng.randint(215, 250), w)[None, :, None]
+    tint = np.array([rng.randint(-10, 10) for _ in range(3)])
+    img = Image.fromarray(np.clip(np.repeat(base, h, 0) + tint, 0, 255).astype(np.uint8))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((60, 90, 360, 500), fill=tuple(rng.randint(120, 200) for _ in range(3)))
+    for k in range(6):
+        text = "".join(rng.choices(string.ascii_uppercase + " ", k=rng.randint(8, 24)))
+        draw.text((420, 100 + 65*k), text, fill=(60, 60, 80), font=font.font_variant(size=26))
+    # MRZ in a fixed pitch, also if the font is proportional
+    pitch = 0.92*w / 44
+    for i, line in enumerate(lines):
+        y = h - 190 + i*int(1.7*font.size)
+        for k, char in enumerate(line):
+            draw.text((0.04*w + k*pitch, y), char, fill=(15, 15, 15), font=font)
+    img = img.filter(ImageFilter.GaussianBlur(rng.uniform(0.3, 1.2)))
+    noise = np.random.default_rng(rng.randint(0, 2**31)).normal(0, rng.uniform(3, 10), (h, w, 1))
+    return Image.fromarray(np.clip(np.asarray(img) + noise, 0, 255).astype(np.uint8))
+
+
+def generate(out_dir, n=100, font_file=None, seed=0):
+    rng = random.Random(seed)
+    font = load_font(40, font_file)
+    os.makedirs(out_dir, exist_ok=True)
+    labels = {}
+    for i in range(n):
+        lines, fields = random_td3(rng)
+        fname = "passport_{:05d}.jpg".format(i)
+        render_passport(lines, rng, font).save(os.path.join(out_dir, fname), quality=88)
+        labels[fname] = dict(fields, mrz=lines)
+    with open(os.path.join(out_dir, "labels.json"), "w") as f:
+        json.dump(labels, f, indent=1)
+    return labels
+
+# %% Stage timing
+
+class StageTimer():
+    """Wraps module attributes with timers, restored by `restore()`."""
+    def __init__(self):
+        self.times = {}
+        self._patched = []
+
+    def wrap(self, obj, attr, stage=None):
+        func = getattr(obj, attr)
+        times = self.times.setdefault(stage or attr, [])
+
+        @wraps(func)
+        def timed(*args, **kwargs):
+            st = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                times.append(time.perf_counter() - st)
+        self.replace(obj, attr, timed)
+
+    def replace(self, obj, attr, value):
+        self._patched.append((obj, attr, getattr(obj, attr)))
+        setattr(obj, attr, value)
+
+    def restore(self):
+        for obj, attr, func in reversed(self._patched):
+            setattr(obj, attr, func)
+        self._patched = []
+
+
+class _TimedReader():
+    """Proxy of the OCR reader with a timed `readtext`."""
+    def __init__(self, reader, timer):
+        self._reader = reader
+        self.readtext = reader.readtext
+        timer.wrap(self, "readtext")
+
+    def __getattr__(self, name):
+        return getattr(self._reader, name)
+
+
+def instrument(timer):
+    import passporteye
+    import matplotlib.image
+    for attr in ("read_mrz_any", "locate_mrz_roi", "roi_to_uint8", "best_candidate",
+                 "decode_mrz_text"):
+        timer.wrap(pem, attr)
+    timer.wrap(passporteye, "read_mrz", "passporteye.read_mrz")
+    timer.wrap(matplotlib.image, "imsave", "roi_save")
+    timer.wrap(pem.AuditLog, "log", "audit_log")
+    reader = _TimedReader(pem.get_reader(), timer)
+    timer.replace(pem, "get_reader", lambda: reader)
+
+
+def read_with(version, fname):
+    if version == "v0":
+        result = pem.read_from_passport_v0(fname)
+        return result and {"number": result["number"], "birth_date": result["date_of_birth"]}
+    if version == "v1":
+        result = pem.read_from_passport_v1(fname)
+        return {"number": result["passport_number"], "birth_date": result["date_of_birth"]}
+    result = pem.read_from_passport_v2(fname, backend="cv2" if version == "v2_cv2" else "passporteye")
+    return result and {"number": result["document_number"], "birth_date": result["birth_date"]}
+
+
+def _is_correct(result, label):
+    if not result:
+        return False
+    # v1/v2 report the date as dd/mm/yyyy
+    birth = {label["birth_date"], pem.parse_date(label["birth_date"])}
+    return result["number"] == label["number"] and result["birth_date"] in birth
+
+
+def _summary(times):
+    ms = np.array(times)*1000
+    return dict({"n": len(ms), "mean_ms": float(ms.mean())},
+                **{"p{}_ms".format(p): float(np.percentile(ms, p)) for p in PERCENTILES})
+
+
+def python_peak_mb(version, files):
+    """Peak Python heap of reading `files`. tracemalloc slows down allocations
+    a lot, so this is a separate pass and not part of the timings."""
+    tracemalloc.start()
+    try:
+        for fname in files:
+            try:
+                read_with(version, fname)
+            except Exception:
+                pass
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def run_version(version, files, labels, memory_docs=10):
+    timer = StageTimer()
+    instrument(timer)
+    correct, failed = 0, 0
+    st = time.perf_counter()
+    try:
+        for fname in files:
+            t0 = time.perf_counter()
+            try:
+                result = read_with(version, fname)
+            except Exception:
+                result, failed = None, failed + 1
+            timer.times.setdefault("total", []).append(time.perf_counter() - t0)
+            label = labels.get(os.path.basename(fname))
+            correct += label is not None and _is_correct(result, label)
+        elapsed = time.perf_counter() - st
+    finally:
+        timer.restore()
+    return {"documents": len(files),
+            "docs_per_sec": len(files) / elapsed if elapsed else 0.0,
+            "accuracy": correct / len(files) if files else 0.0,
+            "errors": failed,
+            "python_peak_mb": python_peak_mb(version, files[:memory_docs]),
+            "stages": {stage: _summary(t) for stage, t in timer.times.items() if t}}
+
+
+def run(image_dir, versions=VERSIONS):
+    with open(os.path.join(image_dir, "labels.json")) as f:
+        labels = json.load(f)
+    files = [os.path.abspath(os.path.join(image_dir, fname)) for fname in sorted(labels)]
+    workdir = tempfile.mkdtemp(prefix="bench_passport_")
+    cwd = os.getcwd()
+    # v1 writes its RoIs to ./mrz_roi and v0 logs, keep that out of the repo
+    os.chdir(workdir)
+    os.makedirs("mrz_roi", exist_ok=True)
+    pem.audit_log_file = os.path.join(workdir, "audit_log.sqlite")
+    try:
+        st = time.perf_counter()
+        pem.warmup()
+        report = {"image_dir": os.path.abspath(os.path.join(cwd, image_dir)),
+                  "warmup_sec": time.perf_counter() - st,
+                  "versions": {v: run_version(v, files, labels) for v in versions}}
+    finally:
+        os.chdir(cwd)
+    # ru_maxrss is in kB on Linux
+    report["process_peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return report
+
+# %%
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("generate", "run"):
+        sys.exit(__doc__)
+    if sys.argv[1] == "generate":
+        generate(sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 100,
+                 sys.argv[4] if len(sys.argv) > 4 else None)
+    else:
+        image_dir = os.path.abspath(sys.argv[2])
+        print(json.dumps(run(image_dir, sys.argv[3:] or VERSIONS), indent=2))
@@ -7,29 +7,71 @@ FastAPI based REST interface for passport data extraction.
 @author: ikespand
 """
 
+from concurrent.futures import BrokenExecutor
 import uvicorn
 from fastapi import FastAPI, File, UploadFile
-from passport_eye_mrz import read_from_passport_v0
-from PIL import Image
-from io import BytesIO
+from fastapi.responses import JSONResponse
+from passport_eye_mrz import (BackgroundImageSaver, sniff_image_type, log_request,
+                              DECODE_MAX_SIDE, ImageDecodeError)
+from ocr_workers import OcrWorkerPool, QueueFullError
+from result_cache import ResultCache
+from upload_guard import (UploadGuard, UploadTooLargeError, check_api_key,
+                          upload_too_large_handler)
+import asyncio
 import os
 import uuid
 import time
 
 app = FastAPI()
 
-# Super dirty way to keep apiKeys here
-apiKeys = ["SP0123456", "PS0123456"]
+# Comma separated in PASSPORT_API_KEYS, the defaults are for local testing only
+apiKeys = frozenset(os.environ.get("PASSPORT_API_KEYS", "SP0123456,PS0123456").split(","))
 
 v0 = FastAPI(version="0.0.0",
              title="Passport reader",
              description="Reads the MRZ from passport")
 
-def read_imagefile(file) -> Image.Image:
-    image = Image.open(BytesIO(file))
-    filename = os.path.join("requested_image", str(uuid.uuid4())+".jpg" )
-    image.save(filename)
-    return image, filename
+# Invalid keys and uploads beyond PASSPORT_MAX_UPLOAD_MB are refused before the
+# body is read. Larger images are downscaled to PASSPORT_MAX_SIDE while decoding.
+max_upload_bytes = int(float(os.environ.get("PASSPORT_MAX_UPLOAD_MB", 10))*1024*1024)
+v0.add_middleware(UploadGuard, api_keys=apiKeys, max_bytes=max_upload_bytes)
+v0.add_exception_handler(UploadTooLargeError, upload_too_large_handler)
+
+# Uploads and their MRZ RoIs are kept for future training/analysis. They are
+# written in the background, set PASSPORT_SAVE_IMAGES=0 to skip it entirely.
+save_images = os.environ.get("PASSPORT_SAVE_IMAGES", "1") == "1"
+upload_saver = BackgroundImageSaver("requested_image") if save_images else None
+
+# OCR runs in a pool of worker processes (PASSPORT_WORKERS=0 runs it in a thread
+# of this process). Beyond PASSPORT_MAX_PENDING requests the API answers with
+# 429, requests taking longer than PASSPORT_TIMEOUT_SEC with 504.
+workers = os.environ.get("PASSPORT_WORKERS")
+ocr_pool = OcrWorkerPool(workers=int(workers) if workers else None,
+                         max_pending=int(os.environ.get("PASSPORT_MAX_PENDING", 0)) or None,
+                         timeout=float(os.environ.get("PASSPORT_TIMEOUT_SEC", 30)),
+                         save_rois=save_images,
+                         max_side=int(os.environ.get("PASSPORT_MAX_SIDE", DECODE_MAX_SIDE)))
+
+# Results by upload content, so resubmissions (e.g. after a timeout) are served
+# without OCR. PASSPORT_CACHE_SIZE=0 disables it. With PASSPORT_CACHE_DIR the
+# results evicted from memory are kept there encrypted, with the Fernet key in
+# PASSPORT_CACHE_KEY (needed to share them between processes/restarts).
+cache_size = int(os.environ.get("PASSPORT_CACHE_SIZE", 1024))
+cache_secret = os.environ.get("PASSPORT_CACHE_KEY")
+result_cache = ResultCache(max_entries=cache_size,
+                           ttl=float(os.environ.get("PASSPORT_CACHE_TTL_SEC", 3600)),
+                           spill_dir=os.environ.get("PASSPORT_CACHE_DIR"),
+                           secret=cache_secret.encode() if cache_secret else None
+                           ) if cache_size > 0 else None
+
+# Lifespan events of the mounted apps aren't run, so the pool lives on `app`
+@app.on_event("startup")
+def start_ocr_pool():
+    ocr_pool.start()
+
+@app.on_event("shutdown")
+def stop_ocr_pool():
+    ocr_pool.shutdown()
 
 @app.get("/")
 async def root():
@@ -38,17 +80,56 @@ async def root():
         
 @v0.post("/mrz")
 async def read_mrz(apiKey:str, file: UploadFile = File(...)):
-    if apiKey in apiKeys:
-        extension = file.filename.split(".")[-1] in ("jpg", "jpeg", "png")
-        if not extension:
-            return {"Error" : "Image must be jpg or png format!"}
+    if check_api_key(apiKey, apiKeys):
         st = time.time()
-        image, fname = read_imagefile(await file.read())
-        ps_info = read_from_passport_v0(fname)
+        # The content decides, not the extension. Reject before reading it all.
+        image_type = sniff_image_type(await file.read(8))
+        if image_type is None:
+            return JSONResponse(status_code=415,
+                                content={"Error" : "Image must be jpg or png format!"})
+        await file.seek(0)
+        contents = await file.read()
+        if result_cache is not None:
+            key = result_cache.key(contents)
+            ps_info = result_cache.get(key)
+            if ps_info is not None:
+                # No OCR and no stored upload, but it still is a request for the passport.
+                # Off the event loop, the first call opens the database.
+                await asyncio.to_thread(log_request, str(uuid.uuid4()), ps_info, cached=True)
+                return {"data": ps_info, "time_taken_sec" : time.time() - st}
+        # Decoded straight from memory, the upload is stored as is (no re-encode)
+        name = str(uuid.uuid4()) + "." + image_type
+        if upload_saver is not None:
+            upload_saver(name, contents)
+        try:
+            on_result = None
+            if result_cache is not None:
+                on_result = lambda result: result_cache.set(key, result)
+            ps_info = await ocr_pool.read_passport(contents, name, on_result=on_result)
+        except QueueFullError:
+            return JSONResponse(status_code=429,
+                                content={"Error" : "Too many requests, try again later!"})
+        except asyncio.TimeoutError:
+            return JSONResponse(status_code=504,
+                                content={"Error" : "Reading the passport timed out!"})
+        except ImageDecodeError:
+            # The header looked fine, but the image is corrupt or truncated
+            return JSONResponse(status_code=400,
+                                content={"Error" : "Image can't be decoded!"})
+        except BrokenExecutor:
+            # A worker crashed, the pool has been restarted for the next requests
+            return JSONResponse(status_code=503,
+                                content={"Error" : "OCR worker failed, try again later!"})
         tt = time.time() - st
         return {"data": ps_info, "time_taken_sec" : tt}
     else:
-        return {"Error" : "Invalid apiKey!"}
+        return JSONResponse(status_code=401, content={"Error" : "Invalid apiKey!"})
+
+@v0.get("/cache")
+async def cache_stats(apiKey:str):
+    if not check_api_key(apiKey, apiKeys):
+        return JSONResponse(status_code=401, content={"Error" : "Invalid apiKey!"})
+    return {"data": result_cache.stats if result_cache is not None else None}
 
 app.mount("/api/v0", v0)
 
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:31:17 2026
+
+Error tolerant MRZ reconstruction from OCR'ed text lines. Instead of requiring
+the exact length of a document type, candidates are generated for every
+type from the lines: re-split joined/broken lines, pad missing or drop extra
+fillers and fix the common OCR confusions (0/O, 1/I, 5/S, 8/B) where only
+digits or only letters are allowed. All candidates are scored at once by
+validating their check digits as a numpy array. An exact-length read is kept
+as is unless an edited candidate passes every check digit, so a bad check
+digit is reported instead of "fixed" by changing the data. Otherwise the
+candidate with the most valid check digits and the fewest edits wins.
+
+@author: ikespand
+"""
+
+import itertools
+import re
+import numpy as np
+
+# Characters of a MRZ, everything else is OCR noise
+_NOT_MRZ = re.compile("[^A-Z0-9<]")
+
+# Letter <-> digit confusions of the OCR
+TO_DIGIT = {"O": "0", "I": "1", "S": "5", "B": "8"}
+TO_LETTER = {v: k for k, v in TO_DIGIT.items()}
+
+# Document number characters tried both ways, i.e. up to 2**4 variants
+MAX_AMBIGUOUS = 4
+
+# Lines further off the length of a document type aren't fitted to it
+MAX_LENGTH_ERROR = 3
+
+# Candidates scored per document type at most. The most likely ones (whole
+# lines, trailing fillers) are generated first.
+MAX_CANDIDATES = 2000
+
+# Value of every (ASCII) character for the check digits: digits 0-9, A-Z 10-35, < 0
+_VALUES = np.zeros(256, dtype=np.int64)
+_VALUES[ord("0"):ord("9") + 1] = np.arange(10)
+_VALUES[ord("A"):ord("Z") + 1] = np.arange(10, 36)
+_IS_DIGIT = np.zeros(256, dtype=bool)
+_IS_DIGIT[ord("0"):ord("9") + 1] = True
+
+
+def _layout(line_len, n_lines, checks, digits, letters, doc_number, required,
+            filler_checks=()):
+    """Positions are in the MRZ joined without newlines."""
+    positions = [pos for _, pos in checks]
+    checks = [(np.concatenate([np.arange(a, b) for a, b in ranges]), pos)
+              for ranges, pos in checks]
+    digits = np.concatenate([np.arange(a, b) for a, b in digits])
+    letters = np.concatenate([np.arange(a, b) for a, b in letters])
+    # A filler there (padded or read) makes the dates unparsable
+    no_filler = np.setdiff1d(digits, filler_checks)
+    per_line = lambda idx: [{int(i) % line_len for i in idx if i // line_len == k}
+                            for k in range(n_lines)]
+    return {"line_len": line_len,
+            "n_lines": n_lines,
+            "checks": checks,
+            # Check digits a candidate has to pass
+            "required": np.isin(positions, required),
+            # Check digits which may be a filler, e.g. of empty optional data
+            "filler_ok": np.isin(positions, filler_checks),
+            # Variants of the other lines (names) can't be told apart
+            "checked_lines": {int(i) // line_len for idx, pos in checks for i in [*idx, pos]},
+            # Positions within each line, lines are fitted and fixed one by one
+            "line_digits": per_line(digits),
+            "line_letters": per_line(letters),
+            "line_no_filler": per_line(no_filler),
+            "doc_number": doc_number}
+
+
+# ICAO 9303 layouts: (fields, check digit position) plus the digit/letter only
+# positions, the (alphanumeric) document number and the required check digits
+# (dates and composite)
+LAYOUTS = {
+    "TD1": _layout(30, 3,
+                   checks=[([(5, 14)], 14), ([(30, 36)], 36), ([(38, 44)], 44),
+                           ([(5, 30), (30, 37), (38, 45), (48, 59)], 59)],
+                   digits=[(14, 15), (30, 37), (38, 45), (59, 60)],
+                   letters=[(2, 5), (37, 38), (45, 48), (60, 90)],
+                   doc_number=(5, 14),
+                   required=[36, 44, 59],
+                   # "<" if the document number continues in the optional data
+                   filler_checks=[14]),
+    "TD2": _layout(36, 2,
+                   checks=[([(36, 45)], 45), ([(49, 55)], 55), ([(57, 63)], 63),
+                           ([(36, 46), (49, 56), (57, 71)], 71)],
+                   digits=[(45, 46), (49, 56), (57, 64), (71, 72)],
+                   letters=[(2, 36), (46, 49), (56, 57)],
+                   doc_number=(36, 45),
+                   required=[55, 63, 71]),
+    "TD3": _layout(44, 2,
+                   checks=[([(44, 53)], 53), ([(57, 63)], 63), ([(65, 71)], 71),
+                           ([(72, 86)], 86), ([(44, 54), (57, 64), (65, 87)], 87)],
+                   digits=[(53, 54), (57, 64), (65, 72), (87, 88)],
+                   letters=[(2, 44), (54, 57), (64, 65)],
+                   doc_number=(44, 53),
+                   required=[63, 71, 87],
+                   # "<" for an empty personal number
+                   filler_checks=[86]),
+}
+
+
+def check_digit(field:str)->str:
+    """ICAO 9303 check digit of a field."""
+    codes = np.frombuffer(field.encode("ascii"), dtype=np.uint8)
+    return str(int(_VALUES[codes] @ np.resize(np.array([7, 3, 1]), len(codes)) % 10))
+
+
+def clean_lines(code:list, min_len:int=15)->list:
+    """Upper case MRZ characters of the lines, short lines (e.g. embossed text)
+    are dropped."""
+    lines = [_NOT_MRZ.sub("", s.upper().replace(" ", "")) for s in code]
+    return [s for s in lines if len(s) >= min_len]
+
+
+def _fit_line(line, line_len):
+    """Variants of a line with the target length, with the number of inserted
+    or dropped characters. Fillers are inserted into or dropped from runs of
+    fillers only, other characters are only cut off the ends."""
+    n_edits = abs(len(line) - line_len)
+    if not n_edits:
+        return [(line, 0)]
+    runs = list(re.finditer("<+", line))
+    if len(line) < line_len:
+        # Trailing fillers are the most likely to be lost
+        variants = [line + "<"*n_edits]
+        # ... else fillers of a run
+        variants += [line[:m.end()] + "<"*n_edits + line[m.end():] for m in runs]
+    else:
+        # Noise at the ends of the line
+        variants = [line[:line_len], line[n_edits:]]
+        # ... or fillers read in excess in a run, e.g. noise read as "<"
+        variants += [line[:m.start()] + line[m.start() + n_edits:] for m in runs
+                     if m.end() - m.start() > n_edits]
+    return [(variant, n_edits) for variant in variants]
+
+
+def _line_sets(lines, layout):
+    """Candidate line splits for a layout with the characters padded or cut
+    off to split them (the windows of lines are fitted line by line)."""
+    n, line_len = layout["n_lines"], layout["line_len"]
+    sets = []
+    # The MRZ is usually at the bottom, text above it is noise
+    for start in range(len(lines) - n + 1):
+        window = lines[start:start + n]
+        if max(abs(len(line) - line_len) for line in window) <= MAX_LENGTH_ERROR:
+            sets.append((window, 0))
+    # Lines merged or broken by the OCR, split the text again
+    for start in range(len(lines)):
+        joined = "".join(lines[start:])
+        error = abs(len(joined) - n*line_len)
+        if error <= MAX_LENGTH_ERROR:
+            joined = joined[:n*line_len].ljust(n*line_len, "<")
+            sets.append(([joined[i*line_len:(i + 1)*line_len] for i in range(n)], error))
+    return sets
+
+
+def _fix_confusions(line, digits, letters):
+    """Letter/digit confusions where only digits or only letters are allowed,
+    with the number of fixed characters."""
+    chars = list(line)
+    for i in digits:
+        chars[i] = TO_DIGIT.get(chars[i], chars[i])
+    for i in letters:
+        chars[i] = TO_LETTER.get(chars[i], chars[i])
+    return "".join(chars), sum(a != b for a, b in zip(line, chars))
+
+
+def _line_variants(line, k, layout):
+    """Fitted and fixed variants of the `k`-th line, without fillers where
+    only digits are allowed, with their number of edits."""
+    variants = _fit_line(line, layout["line_len"])
+    if k not in layout["checked_lines"]:
+        variants = variants[:1]
+    fixed = {}
+    for variant, n_edits in variants:
+        variant, n_fixed = _fix_confusions(variant, layout["line_digits"][k],
+                                           layout["line_letters"][k])
+        if all(variant[i] != "<" for i in layout["line_no_filler"][k]):
+            fixed[variant] = min(n_edits + n_fixed, fixed.get(variant, n_edits + n_fixed))
+    return list(fixed.items())
+
+
+def _doc_number_variants(mrz, layout):
+    """Both readings of the ambiguous document number characters, with the
+    number of swapped ones."""
+    a, b = layout["doc_number"]
+    ambiguous = [i for i in range(a, b) if mrz[i] in TO_DIGIT or mrz[i] in TO_LETTER]
+    ambiguous = ambiguous[:MAX_AMBIGUOUS]
+    variants = []
+    for swap in itertools.product((False, True), repeat=len(ambiguous)):
+        chars = list(mrz)
+        for i, s in zip(ambiguous, swap):
+            if s:
+                chars[i] = TO_DIGIT.get(chars[i]) or TO_LETTER[chars[i]]
+        variants.append(("".join(chars), sum(swap)))
+    return variants
+
+
+def candidates(lines:list, doc_type:str)->dict:
+    """All candidate MRZs (joined, without newlines) of a document type, with
+    their number of edits: characters inserted, dropped or swapped."""
+    layout = LAYOUTS[doc_type]
+    found = {}
+    for line_set, split_edits in _line_sets(lines, layout):
+        fitted = [_line_variants(line, k, layout) for k, line in enumerate(line_set)]
+        for combination in itertools.product(*fitted):
+            line_edits = split_edits + sum(n for _, n in combination)
+            joined = "".join(line for line, _ in combination)
+            for variant, n_swapped in _doc_number_variants(joined, layout):
+                n_edits = line_edits + n_swapped
+                found[variant] = min(n_edits, found.get(variant, n_edits))
+                if len(found) >= MAX_CANDIDATES:
+                    return found
+    return found
+
+
+def _exact_read(lines, layout):
+    """The lines as read (joined), if the bottom ones have the exact lengths of
+    the layout, else None."""
+    n, line_len = layout["n_lines"], layout["line_len"]
+    for start in range(len(lines) - n, -1, -1):
+        window = lines[start:start + n]
+        if all(len(line) == line_len for line in window):
+            return "".join(window)
+    return None
+
+
+def _valid_checks(mrzs, doc_type):
+    """Boolean matrix candidate x check digit of the valid check digits."""
+    layout = LAYOUTS[doc_type]
+    codes = np.frombuffer("".join(mrzs).encode("ascii"), dtype=np.uint8)
+    codes = codes.reshape(len(mrzs), -1)
+    values = _VALUES[codes]
+    valid = np.zeros((len(mrzs), len(layout["checks"])), dtype=bool)
+    for j, (idx, pos) in enumerate(layout["checks"]):
+        weights = np.resize(np.array([7, 3, 1]), len(idx))
+        expected = values[:, idx] @ weights % 10
+        allowed = _IS_DIGIT[codes[:, pos]]
+        if layout["filler_ok"][j]:
+            # "<" counts as 0, i.e. it is valid for an empty field
+            allowed |= codes[:, pos] == ord("<")
+        valid[:, j] = (expected == values[:, pos]) & allowed
+    return valid
+
+
+def check_digit_scores(mrzs:list, doc_type:str)->np.ndarray:
+    """
+    Number of valid check digits of every candidate, computed for all of them
+    at once.
+
+    Parameters
+    ----------
+    mrzs : list
+        Candidate MRZs of `doc_type`, joined without newlines.
+    doc_type : str
+        "TD1", "TD2" or "TD3".
+
+    Returns
+    -------
+    scores : np.ndarray
+        Valid check digits per candidate.
+
+    """
+    return _valid_checks(mrzs, doc_type).sum(axis=1)
+
+
+def best_candidate(code:list):
+    """
+    Most plausible MRZ of OCR'ed text lines.
+
+    If the lines have the exact lengths of a document type, they are returned
+    as read, unless an edited candidate passes every check digit: a failing
+    check digit is then reported by the checker instead of edited away.
+    Otherwise the candidate passing the date and composite check digits with
+    the most valid check digits, then the fewest edits, is returned.
+
+    Parameters
+    ----------
+    code : list
+        Text lines as returned by `reader.readtext(..., detail=0)`.
+
+    Returns
+    -------
+    doc_type : str
+        "TD1", "TD2" or "TD3", None if no candidate passes the date and
+        composite check digits.
+    mrz : str
+        MRZ with newlines between the lines.
+    n_valid : int
+        Valid check digits of the MRZ.
+
+    """
+    lines = clean_lines(code)
+    best, best_rank = (None, None, 0), None
+    for doc_type, layout in LAYOUTS.items():
+        n_checks = len(layout["checks"])
+        exact = _exact_read(lines, layout)
+        found = candidates(lines, doc_type)
+        mrzs = list(found)
+        valid = _valid_checks(mrzs, doc_type) if mrzs else np.zeros((0, n_checks), dtype=bool)
+        scores = valid.sum(axis=1)
+        edits = np.array([found[m] for m in mrzs], dtype=np.int64)
+        if exact is not None:
+            mrz, n_valid, n_edits = exact, int(_valid_checks([exact], doc_type).sum()), 0
+            if n_valid < n_checks:
+                keep = np.flatnonzero(scores == n_checks)
+                if len(keep):
+                    i = int(keep[np.argmin(edits[keep])])
+                    mrz, n_valid, n_edits = mrzs[i], n_checks, int(edits[i])
+        else:
+            # Without valid dates and composite it's rather noise than a MRZ
+            keep = np.flatnonzero(valid[:, layout["required"]].all(axis=1))
+            if not len(keep):
+                continue
+            # Most valid check digits, then the fewest edits
+            i = int(keep[np.lexsort((edits[keep], -scores[keep]))[0]])
+            mrz, n_valid, n_edits = mrzs[i], int(scores[i]), int(edits[i])
+        # Exact-length reads first
+        rank = (exact is not None, n_valid / n_checks, -n_edits)
+        if best_rank is None or rank > best_rank:
+            line_len = layout["line_len"]
+            mrz = "\n".join(mrz[k:k + line_len] for k in range(0, len(mrz), line_len))
+            best, best_rank = (doc_type, mrz, n_valid), rank
+    return best
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Jun 12 11:34:08 2022
+
+MRZ localization with plain OpenCV morphology (blackhat, Scharr gradient,
+closing), as an alternative to `passporteye.read_mrz`. No OCR is involved and
+the search runs on a downscaled copy, so it takes a few milliseconds. Only
+the crop is taken from the full resolution image. Unlike passporteye it
+doesn't handle rotated documents. Besides the largest elongated box, a few
+smaller ones are kept as fallbacks, e.g. for a text line or barcode which
+looks like a MRZ.
+
+Usage: python mrz_locator.py image_file [roi_file]
+
+@author: PC
+"""
+
+import os
+import sys
+import cv2
+import numpy as np
+
+# Height of the image the MRZ is searched in
+SEARCH_HEIGHT = 600
+
+# initialize a rectangular and square structuring kernel (for SEARCH_HEIGHT)
+rectKernel = cv2.getStructuringElement(cv2.MORPH_RECT, (13, 5))
+sqKernel = cv2.getStructuringElement(cv2.MORPH_RECT, (21, 21))
+
+# Images without any text barely have a gradient, no need to search them
+MIN_GRADIENT = 8.0
+
+# Boxes returned by `locate_mrz_candidates` at most
+MAX_CANDIDATES = 3
+
+
+def load_gray(image)->np.ndarray:
+    """
+    Grayscale uint8 image from a file path, encoded bytes, file-like or an
+    already decoded (BGR) array.
+    """
+    if isinstance(image, np.ndarray):
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY if image.shape[2] == 4
+                                 else cv2.COLOR_BGR2GRAY)
+        if image.dtype != np.uint8:
+            image = (np.clip(image, 0, 1)*255).astype(np.uint8)
+        return image
+    if isinstance(image, (str, os.PathLike)):
+        return cv2.imread(os.fspath(image), cv2.IMREAD_GRAYSCALE)
+    if hasattr(image, "read"):
+        image = image.read()
+    return cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_GRAYSCALE)
+
+
+def _merge_lines(box, boxes):
+    # Widely spaced MRZ lines can survive the closing as separate boxes, grow
+    # the box by the lines stacked right above/below it
+    (x, y, w, h) = box
+    merged = True
+    while merged:
+        merged = False
+        for (bx, by, bw, bh) in boxes:
+            overlap = min(x + w, bx + bw) - max(x, bx)
+            gap = max(by - (y + h), y - (by + bh))
+            if 0 < gap < 3*bh and overlap > 0.5*min(w, bw):
+                (x, y, w, h) = (min(x, bx), min(y, by),
+                                max(x + w, bx + bw) - min(x, bx),
+                                max(y + h, by + bh) - min(y, by))
+                merged = True
+    return (x, y, w, h)
+
+
+def locate_mrz_candidates(image, search_height:int=SEARCH_HEIGHT, min_aspect:float=5.0,
+                          min_width:float=0.6, max_candidates:int=MAX_CANDIDATES)->list:
+    """
+    Find the boxes which may hold the MRZ of a document, largest first.
+
+    Parameters
+    ----------
+    image : str/bytes/file-like/np.ndarray
+        Image of the document, see `load_gray`.
+    search_height : int, optional
+        The image is downscaled to this height for the search. The default is
+        SEARCH_HEIGHT.
+    min_aspect : float, optional
+        Minimum width/height of the MRZ box. The default is 5.0.
+    min_width : float, optional
+        Minimum width of the MRZ box relative to the image. The default is 0.6,
+        which leaves some room for the background around the document.
+    max_candidates : int, optional
+        Boxes returned at most. The default is MAX_CANDIDATES.
+
+    Returns
+    -------
+    rois : list
+        Grayscale uint8 crops (np.ndarray) in full resolution, empty if no
+        MRZ is found.
+
+    """
+    full = load_gray(image)
+    if full is None:
+        return []
+    scale = min(1.0, search_height / full.shape[0])
+    gray = cv2.resize(full, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    # smooth the image using a 3x3 Gaussian, then apply the blackhat
+    # morphological operator to find dark regions on a light background
+    gray = cv2.GaussianBlur(gray, (3, 3), 0)
+    blackhat = cv2.morphologyEx(gray, cv2.MORPH_BLACKHAT, rectKernel)
+
+    # compute the Scharr gradient of the blackhat image and scale the
+    # result into the range [0, 255]
+    gradX = np.absolute(cv2.Sobel(blackhat, ddepth=cv2.CV_32F, dx=1, dy=0, ksize=-1))
+    (minVal, maxVal) = cv2.minMaxLoc(gradX)[:2]
+    if maxVal - minVal < MIN_GRADIENT:
+        return []
+    gradX = cv2.convertScaleAbs(gradX, alpha=255/(maxVal - minVal), beta=-minVal*255/(maxVal - minVal))
+
+    # apply a closing operation using the rectangular kernel to close
+    # gaps in between letters -- then apply Otsu's thresholding method
+    gradX = cv2.morphologyEx(gradX, cv2.MORPH_CLOSE, rectKernel)
+    thresh = cv2.threshold(gradX, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
+
+    # perform another closing operation, this time using the square
+    # kernel to close gaps between lines of the MRZ, then perform a
+    # series of erosions to break apart connected components
+    thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, sqKernel)
+    thresh = cv2.erode(thresh, None, iterations=4)
+
+    # during thresholding, it's possible that border pixels were
+    # included in the thresholding, so let's set 5% of the left and
+    # right borders to zero
+    p = int(gray.shape[1] * 0.05)
+    thresh[:, 0:p] = 0
+    thresh[:, gray.shape[1] - p:] = 0
+
+    # The MRZ lines are long and thin, so most boxes are rejected right away
+    cnts = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+    boxes = [cv2.boundingRect(c) for c in cnts]
+    boxes = [b for b in boxes if b[2] / float(b[3]) > min_aspect]
+    rois, seen = [], set()
+    for box in sorted(boxes, key=lambda b: b[2]*b[3], reverse=True):
+        (x, y, w, h) = _merge_lines(box, boxes)
+        # The lines of one MRZ all merge into the same box
+        if (x, y, w, h) in seen or w / float(gray.shape[1]) <= min_width:
+            continue
+        seen.add((x, y, w, h))
+
+        # pad the bounding box since we applied erosions and now need
+        # to re-grow it, then map it back to the full resolution image
+        pX = int((x + w) * 0.03)
+        pY = int((y + h) * 0.03)
+        (x, y) = (max(0, x - pX), max(0, y - pY))
+        (w, h) = (w + (pX * 2), h + (pY * 2))
+        (x, y, w, h) = (int(x / scale), int(y / scale), int(w / scale), int(h / scale))
+        rois.append(full[y:y + h, x:x + w].copy())
+        if len(rois) == max_candidates:
+            break
+    return rois
+
+
+def locate_mrz(image, **kwargs):
+    """
+    Find the MRZ of a document, see `locate_mrz_candidates` for the arguments.
+
+    Returns
+    -------
+    roi : np.ndarray
+        Grayscale uint8 crop of the MRZ in full resolution, None if not found.
+
+    """
+    rois = locate_mrz_candidates(image, max_candidates=1, **kwargs)
+    return rois[0] if rois else None
+
+# %%
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python mrz_locator.py image_file [roi_file]")
+    image_file = sys.argv[1]
+    rois = locate_mrz_candidates(image_file)
+    if not rois:
+        sys.exit("No MRZ found in {}".format(image_file))
+    roi_file = (sys.argv[2] if len(sys.argv) > 2 else
+                os.path.splitext(image_file)[0] + "_mrz.png")
+    cv2.imwrite(roi_file, rois[0])
+    print("{} candidate(s), the largest one is written to {}".format(len(rois), roi_file))
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:12:30 2026
+
+Worker farm for the passport OCR. The CPU heavy reading runs in a pool of
+pre-warmed processes. Where fork is available the model is loaded once in the
+server and the workers share its weights copy-on-write. Requests are
+admitted through a bounded number of pending slots, so the API can reject
+load early (HTTP 429) instead of queueing without limit, and every request has
+a timeout. A pool broken by a crashed worker is restarted.
+
+@author: ikespand
+"""
+
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import multiprocessing
+import os
+import passport_eye_mrz as pem
+
+# Per process sink for the RoIs, set by the initializer of the pool
+_roi_saver = None
+
+def _init_worker(save_rois:bool, torch_threads:int=None):
+    global _roi_saver
+    _roi_saver = pem.BackgroundImageSaver("mrz_roi") if save_rois else None
+    if torch_threads:
+        # The workers already run in parallel, don't oversubscribe the cores
+        import torch
+        torch.set_num_threads(torch_threads)
+    pem.warmup()
+
+
+def _warmup()->int:
+    return os.getpid()
+
+
+def read_passport(contents:bytes, name:str, max_side:int=pem.DECODE_MAX_SIDE)->dict:
+    """Task executed by the workers, see `read_from_passport_v0`. Large images
+    are downscaled to `max_side` while decoding."""
+    image = pem.decode_image(contents, max_side)
+    return pem.read_from_passport_v0(image, name=name, roi_sink=_roi_saver)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when all pending slots of the pool are taken."""
+
+
+class OcrWorkerPool():
+    """
+    Bounded pool of OCR worker processes for an asyncio server. With
+    `workers=0` the requests run in a single thread of the server process,
+    which still keeps the event loop responsive.
+    """
+    def __init__(self, workers:int=None, max_pending:int=None, timeout:float=30.0,
+                 save_rois:bool=True, share_model:bool=None,
+                 max_side:int=pem.DECODE_MAX_SIDE):
+        self.workers = os.cpu_count() if workers is None else workers
+        # Fork the workers from a process holding the model, instead of each
+        # worker loading its own copy
+        if share_model is None:
+            share_model = "fork" in multiprocessing.get_all_start_methods()
+        self.share_model = share_model
+        # Requests waiting or running, beyond that the pool refuses new ones
+        self.max_pending = max_pending or 4*max(self.workers, 1)
+        self.timeout = timeout
+        self.save_rois = save_rois
+        self.max_side = max_side
+        self.pending = 0
+        self.executor = None
+        self._restart_lock = asyncio.Lock()
+
+    def start(self):
+        """Start the workers and block until all of them have loaded the model."""
+        if self.workers == 0:
+            self.executor = ThreadPoolExecutor(max_workers=1,
+                                               initializer=_init_worker,
+                                               initargs=(self.save_rois,))
+            self.executor.submit(_warmup).result()
+            return None
+        if self.share_model:
+            # Only load the weights here, torch's thread pool doesn't survive
+            # a fork once it has run. The workers run their first OCR themselves.
+            pem.warmup(run_ocr=False)
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context("spawn")
+        torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                            mp_context=context,
+                                            initializer=_init_worker,
+                                            initargs=(self.save_rois, torch_threads))
+        futures = [self.executor.submit(_warmup) for _ in range(self.workers)]
+        _ = [f.result() for f in futures]
+        return None
+
+    async def _restart(self, broken):
+        """Replace the executor after a worker died (e.g. killed by the OOM
+        killer), unless another request has already replaced it."""
+        async with self._restart_lock:
+            if self.executor is not broken:
+                return
+            print("OCR worker pool is broken, restarting it")
+            broken.shutdown(wait=False, cancel_futures=True)
+            await asyncio.to_thread(self.start)
+
+    def _release(self, loop):
+        """Done callback of a task, frees its slot on the event loop thread."""
+        def _callback(future):
+            try:
+                loop.call_soon_threadsafe(self._decrement)
+            except RuntimeError:
+                # The loop is closed, nothing is pending anymore
+                pass
+        return _callback
+
+    def _decrement(self):
+        self.pending -= 1
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def read_passport(self, contents:bytes, name:str, on_result=None)->dict:
+        """
+        Read a passport in the pool.
+
+        Parameters
+        ----------
+        contents : bytes
+            Encoded image.
+        name : str
+            Name of the request for the log and the saved RoI.
+        on_result : callable, optional
+            `on_result(result)` called from a thread of the pool as soon as
+            the result is available, also if the request has timed out by then.
+
+        Raises
+        ------
+        QueueFullError
+            If `max_pending` requests are already pending.
+        asyncio.TimeoutError
+            If the result isn't available within `timeout` seconds.
+        concurrent.futures.BrokenExecutor
+            If a worker died while reading. The pool is restarted.
+
+        Returns
+        -------
+        dict
+            See `read_from_passport_v0`.
+
+        """
+        # Only touched from the event loop thread, so no lock is needed
+        if self.pending >= self.max_pending:
+            raise QueueFullError("{} requests are pending".format(self.pending))
+        # The slot is taken until the task has finished in the pool, a timed
+        # out request keeps it while its task is still running
+        self.pending += 1
+        executor = self.executor
+        try:
+            try:
+                future = executor.submit(read_passport, contents, name, self.max_side)
+            except BrokenExecutor:
+                await self._restart(executor)
+                executor = self.executor
+                future = executor.submit(read_passport, contents, name, self.max_side)
+        except BaseException:
+            self.pending -= 1
+            raise
+        future.add_done_callback(self._release(asyncio.get_running_loop()))
+        if on_result is not None:
+            def _done(f):
+                if not f.cancelled() and f.exception() is None:
+                    on_result(f.result())
+            future.add_done_callback(_done)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except BrokenExecutor:
+            # This request is lost, the next ones get a fresh pool
+            await self._restart(executor)
+            raise
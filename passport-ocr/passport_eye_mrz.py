@@ -12,41 +12,250 @@ For windows, if tesseract throws an error then follow this:
 @author: ikespand
 """
 
-import matplotlib.pyplot as plt
 #from mrz.checker.td1 import TD1CodeChecker, get_country
-from passporteye import read_mrz
-import matplotlib.image as mpimg
 #pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-import pandas as pd
+import io
 import os
+import queue
 import string as st
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dateutil import parser
 import cv2
-import easyocr
 import numpy as np
 from mrz.checker.td1 import TD1CodeChecker, get_country
 from mrz.checker.td2 import TD2CodeChecker
 from mrz.checker.td3 import TD3CodeChecker
+from mrz_locator import locate_mrz_candidates
+from mrz_candidates import best_candidate
+from audit_log import AuditLog
+import multiprocessing.util
 
 # plt.ioff()
 
-reader=easyocr.Reader(lang_list=['en'])  # Enable gpu if available
+# easyocr (torch), passporteye (scikit-image) and matplotlib are heavy,
+# they are imported on first use. The OCR model is loaded by `get_reader()`.
+_reader = None
+_reader_lock = threading.Lock()
 
 
-log_file = r"logfile.csv"
-cname = ["Id", "FirstName", "LastName", "PassportNumber", "PassportImage", "MzrImage"]
+# Requests are logged in the background, see `audit_log.AuditLog`
+audit_log_file = os.environ.get("PASSPORT_AUDIT_LOG", r"audit_log.sqlite")
+_audit_log = None
+_audit_log_lock = threading.Lock()
 
+# Input size of the MRZ region for the OCR
+MRZ_ROI_SIZE = (1110, 140)
+#remove < from mrz code
+MRZ_ALLOWLIST = st.ascii_letters+st.digits+'< '
 
+# Uploads are decoded to at most this width/height, which is plenty for the
+# MRZ localization and OCR. Phone photos are often twice as large.
+DECODE_MAX_SIDE = 2000
 
-def read_from_passport_v0(image_file:str)->dict:
+# Magic bytes of the accepted image formats
+IMAGE_SIGNATURES = {b"\xff\xd8\xff": "jpeg", b"\x89PNG\r\n\x1a\n": "png"}
+
+# MRZ localizers: passporteye's `read_mrz` or the OpenCV one of `mrz_locator`
+MRZ_BACKENDS = ("passporteye", "cv2")
+
+
+def get_reader():
+    """The shared `easyocr.Reader`, loaded once on first use (thread-safe)."""
+    global _reader
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None:
+                import easyocr
+                _reader = easyocr.Reader(lang_list=['en'])  # Enable gpu if available
+    return _reader
+
+
+def __getattr__(name):
+    # Keeps `passport_eye_mrz.reader` working, loads the model on access
+    if name == "reader":
+        return get_reader()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def warmup(run_ocr:bool=True):
+    """
+    Load the OCR model and the heavy dependencies before the first request.
+
+    Parameters
+    ----------
+    run_ocr : bool, optional
+        Also read a blank RoI once, so that the buffers allocated on the first
+        inference exist too. The default is True. Use False in a process which
+        forks workers afterwards: the loaded weights are then shared
+        copy-on-write, but torch's thread pool must not be running at fork time.
+
+    Returns
+    -------
+    None.
+
+    """
+    ocr_reader = get_reader()
+    import passporteye.mrz.image  # noqa: F401
+    if run_ocr:
+        ocr_reader.readtext(np.full(MRZ_ROI_SIZE[::-1], 255, np.uint8), detail=0)
+    return None
+
+
+class BackgroundImageSaver():
+    """
+    Saves images (e.g. MRZ RoIs for future training/analysis) from a background
+    thread, so that encoding and disk writes are not part of the request. Raw
+    bytes are written as they are, arrays are encoded by the file extension.
+    If the queue is full, images are dropped instead of blocking the caller.
+    """
+    def __init__(self, output_dir="mrz_roi", max_queue=256):
+        self.output_dir = output_dir
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        os.makedirs(output_dir, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def path_for(self, name:str)->str:
+        if not os.path.splitext(name)[1]:
+            name = name + ".png"
+        return os.path.join(self.output_dir, os.path.basename(name))
+
+    def __call__(self, name:str, image)->str:
+        fname = self.path_for(name)
+        try:
+            self.queue.put_nowait((fname, image))
+        except queue.Full:
+            self.dropped += 1
+        return fname
+
+    def flush(self):
+        """Block until all queued images are written."""
+        self.queue.join()
+
+    def _run(self):
+        while True:
+            fname, image = self.queue.get()
+            try:
+                if isinstance(image, (bytes, bytearray)):
+                    with open(fname, "wb") as f:
+                        f.write(image)
+                else:
+                    cv2.imwrite(fname, image)
+            except Exception as err:
+                print("Saving {} failed with error: {}".format(fname, err))
+            finally:
+                self.queue.task_done()
+
+
+def to_gray_float(image:np.ndarray)->np.ndarray:
+    """Grayscale float image in [0, 1] as passporteye loads it. Color images
+    are expected in OpenCV's BGR order."""
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY if image.shape[2] == 4
+                             else cv2.COLOR_BGR2GRAY)
+    if image.dtype == np.uint8:
+        return image.astype(np.float32) / 255
+    return image
+
+
+def sniff_image_type(header:bytes)->str:
+    """Image format by the first (8) bytes, "jpeg"/"png" or None if unknown."""
+    for signature, image_type in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return image_type
+    return None
+
+
+class ImageDecodeError(ValueError):
+    """Raised by `decode_image` for corrupt or truncated images."""
+
+
+def decode_image(data:bytes, max_side:int=DECODE_MAX_SIDE)->np.ndarray:
+    """
+    Decode an encoded image to a grayscale uint8 array, upright as per EXIF.
+    Images larger than `max_side` are downscaled, JPEGs already while decoding
+    (DCT scaling by 1/2, 1/4 or 1/8 in PIL's draft mode), which is several
+    times faster than decoding the full resolution. Raises ImageDecodeError if
+    the data can't be decoded.
+    """
+    from PIL import Image, ImageOps
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            scale = max_side / max(img.size) if max_side else 1.0
+            if scale < 1:
+                # Picks the largest reduction still at least as large as requested
+                img.draft("L", (int(img.size[0]*scale), int(img.size[1]*scale)))
+            img = ImageOps.exif_transpose(img).convert("L")
+    except (OSError, SyntaxError, Image.DecompressionBombError) as err:
+        # PIL raises OSError (UnidentifiedImageError, truncated data) and for
+        # some broken headers SyntaxError
+        raise ImageDecodeError(str(err)) from None
+    if max_side and max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.BILINEAR)
+    return np.asarray(img)
+
+
+def read_mrz_any(image):
+    """
+    `passporteye.read_mrz` for a file path, encoded bytes/stream or an already
+    decoded array. The image is decoded in memory, nothing is written to disk.
+
+    Parameters
+    ----------
+    image : str/bytes/file-like/np.ndarray
+        Image of the document.
+
+    Returns
+    -------
+    mrz : passporteye.mrz.text.MRZ
+        Parsed MRZ with the RoI in `mrz.aux['roi']`, None if not found.
+
+    """
+    from passporteye import read_mrz
+    from passporteye.mrz.image import MRZPipeline
+    if isinstance(image, np.ndarray):
+        p = MRZPipeline(None)
+        p['img'] = to_gray_float(image)
+        mrz = p.result
+        if mrz is not None:
+            mrz.aux['roi'] = p['roi']
+        return mrz
+    return read_mrz(image, save_roi=True)
+
+
+def roi_to_uint8(roi:np.ndarray)->np.ndarray:
+    if roi.dtype == np.uint8:
+        return roi
+    return (np.clip(roi, 0, 1)*255).astype('uint8')
+
+
+def _image_name(image, name):
+    if name is not None:
+        return name
+    if isinstance(image, str):
+        return os.path.basename(image)
+    return str(uuid.uuid4())
+
+
+def read_from_passport_v0(image, name:str=None, roi_sink=None)->dict:
     """
     Function that will localize MRZ from the image and will
     also log the requests. 
 
     Parameters
     ----------
-    image_file : str
-        Path of the image.
+    image : str/bytes/np.ndarray
+        Path of the image, its encoded bytes or the decoded array.
+    name : str, optional
+        Name of the request for the log, by default the file name of the image
+        or a random id.
+    roi_sink : callable, optional
+        `roi_sink(name, roi)` to keep the RoI, e.g. a `BackgroundImageSaver`.
+        It returns the path logged as "MzrImage".
 
     Returns
     -------
@@ -54,28 +263,40 @@ def read_from_passport_v0(image_file:str)->dict:
         DESCRIPTION.
 
     """
-    roi_save_fname = r'mrz_roi/' + os.path.basename(image_file)
-    mrz = read_mrz(image_file, save_roi=True)
+    name = _image_name(image, name)
+    mrz = read_mrz_any(image)
     mrz_dict = mrz.to_dict()
-    _ = log_data_to_csv([[os.path.basename(image_file).split(".")[0],
-                        mrz_dict["names"],
-                        mrz_dict["surname"],
-                        mrz_dict["number"],
-                        image_file,
-                        roi_save_fname]]
-                        )
-    mpimg.imsave(roi_save_fname, mrz.aux['roi'], cmap='gray')
+    roi_save_fname = None
+    if roi_sink is not None:
+        roi_save_fname = roi_sink(name, roi_to_uint8(mrz.aux['roi']))
+    log_request(name.split(".")[0], mrz_dict, image if isinstance(image, str) else name,
+                roi_save_fname)
     return mrz_dict
 
 
+def log_request(request_id:str, mrz_dict:dict, image_fname:str=None, roi_fname:str=None,
+                cached:bool=False):
+    """Queue the audit row of a request, see `audit_log.COLUMNS`. Requests
+    served from the result cache are logged with `cached=True`."""
+    get_audit_log().log([request_id,
+                         mrz_dict["names"],
+                         mrz_dict["surname"],
+                         mrz_dict["number"],
+                         image_fname,
+                         roi_fname,
+                         cached])
+
     
-def log_data_to_csv(data:list):
-    df = pd.DataFrame(data, columns = cname)
-    if os.path.isfile(log_file):
-        df.to_csv(log_file, header=None, mode='a', index=False)
-    else:
-        df.to_csv(log_file, index=False)
-    return None
+def get_audit_log()->AuditLog:
+    """The audit log of this process, created on first use (also after a fork)."""
+    global _audit_log
+    if _audit_log is None or _audit_log._pid != os.getpid():
+        with _audit_log_lock:
+            if _audit_log is None or _audit_log._pid != os.getpid():
+                _audit_log = AuditLog(audit_log_file)
+                # Unlike atexit, also run at the exit of multiprocessing workers
+                multiprocessing.util.Finalize(None, _audit_log.close, exitpriority=10)
+    return _audit_log
     
     
 def parse_date(string, iob=True):
@@ -101,6 +322,8 @@ def get_gender(code):
     return sex
 
 def read_from_passport_v1(image_file):
+    from passporteye import read_mrz
+    import matplotlib.image as mpimg
     user_info = {}
     roi_save_fname = r'mrz_roi/' + os.path.basename(image_file)
     mrz = read_mrz(image_file, save_roi=True)   
@@ -113,7 +336,7 @@ def read_from_passport_v1(image_file):
     
     #remove < from mrz code
     allowlist = st.ascii_letters+st.digits+'< '
-    code = reader.readtext(img, paragraph=False, detail=0, allowlist=allowlist)
+    code = get_reader().readtext(img, paragraph=False, detail=0, allowlist=allowlist)
     
     
     a, b = code[0].upper(), code[1].upper()
@@ -145,85 +368,265 @@ def read_from_passport_v1(image_file):
 
 
 
-def read_from_passport_v2(image_file:str):
+def locate_mrz_rois(image, backend:str="passporteye")->list:
     """
-    Localize MRZ from the document > 
-    Save only MRZ RoI >
+    Grayscale uint8 RoIs which may hold the MRZ, found by `backend` (see
+    MRZ_BACKENDS), the most likely one first. Only "cv2" returns fallback
+    boxes, the list is empty if no MRZ is found.
+    """
+    if backend == "cv2":
+        return locate_mrz_candidates(image)
+    if backend != "passporteye":
+        raise ValueError("Unknown MRZ backend {}, use one of {}".format(backend, MRZ_BACKENDS))
+    mrz = read_mrz_any(image)
+    if not mrz:
+        return []
+    return [roi_to_uint8(mrz.aux['roi'])]
+
+
+def locate_mrz_roi(image, backend:str="passporteye"):
+    """
+    Grayscale uint8 RoI of the MRZ found by `backend` (see MRZ_BACKENDS),
+    None if no MRZ is found.
+    """
+    rois = locate_mrz_rois(image, backend)
+    return rois[0] if rois else None
+
+
+def _read_fallback_rois(image, name, backend, reader):
+    """OCR and decode the fallback boxes of `locate_mrz_rois` in turn, until
+    one of them decodes."""
+    for roi in locate_mrz_rois(image, backend)[1:]:
+        code = reader.readtext(cv2.resize(roi, MRZ_ROI_SIZE), paragraph=False,
+                               detail=0, allowlist=MRZ_ALLOWLIST)
+        user_info = _safe_decode_mrz_text(code, name)
+        if user_info is not None:
+            return user_info
+    return None
+
+
+def mrz_roi_for_ocr(image, name:str=None, roi_sink=None, backend:str="passporteye"):
+    """
+    Localize the MRZ and prepare its RoI as input for the OCR.
+
+    Parameters
+    ----------
+    image : str/bytes/np.ndarray
+        Path of the image, its encoded bytes or the decoded (BGR) array.
+    name : str, optional
+        Name for the saved RoI, by default the file name or a random id.
+    roi_sink : callable, optional
+        `roi_sink(name, roi)` to keep the RoI, e.g. a `BackgroundImageSaver`.
+    backend : str, optional
+        MRZ localizer, "passporteye" (default) or the faster "cv2".
+
+    Returns
+    -------
+    img : np.ndarray
+        Grayscale uint8 RoI of `MRZ_ROI_SIZE`, None if no MRZ is found.
+
+    """
+    roi = locate_mrz_roi(image, backend)
+    if roi is None:
+        return None
+    # Save image for future training/analysis
+    if roi_sink is not None:
+        roi_sink(_image_name(image, name), roi)
+    # RoI is already grayscale, which enchments the ocr process
+    return cv2.resize(roi, MRZ_ROI_SIZE)
+
+
+def decode_mrz_text(code:list):
+    """
+    Decode the OCR'ed lines of a MRZ with the check digits. OCR errors like a
+    missing/extra character or a confused letter/digit are tolerated, see
+    `mrz_candidates.best_candidate`.
+
+    Parameters
+    ----------
+    code : list
+        Text lines as returned by `reader.readtext(..., detail=0)`.
+
+    Returns
+    -------
+    user_info : dict
+        Decoded fields, None if the text doesn't match a document type or
+        has invalid dates.
+
+    """
+    user_info = {}
+    # Embossed informations are also detected, lines < 15 chars are dropped
+    doc_type, code_joined, _ = best_candidate(code)
+    # TODO: Adapt this part to handle different type of docs. E.g., visa, passport, id card etc.
     
+    if doc_type == "TD1":
+        decoded_mrz = TD1CodeChecker(code_joined)
+    elif doc_type == "TD2":
+        decoded_mrz = TD2CodeChecker(code_joined)            
+    elif doc_type == "TD3":
+        decoded_mrz = TD3CodeChecker(code_joined)
+    else:
+        return None
+    # fields() builds a new namedtuple class on every call
+    fields = decoded_mrz.fields()
+    try:
+        birth_date = parse_date(fields.birth_date)
+        expiry_date = parse_date(fields.expiry_date)
+    except (ValueError, OverflowError):
+        # Check digits can be valid for impossible dates, e.g. a month 13
+        # (dateutil's ParserError is a ValueError)
+        return None
+    user_info['name'] = fields.name
+    user_info['surname'] = fields.surname
+    user_info['country_code'] = fields.country
+    user_info["country_name"] = get_country(fields.country)
+    user_info['nationality'] = fields.nationality
+    user_info['birth_date'] = birth_date
+    user_info['expiry_date'] = expiry_date
+    user_info['sex']  = fields.sex
+    user_info['document_type'] = fields.document_type
+    user_info['document_number'] = fields.document_number
+    user_info['optional_data'] = fields.optional_data
+    user_info["doc_error"] = decoded_mrz.report.errors
+    user_info["doc_warning"] = decoded_mrz.report.warnings
+    return user_info
+
+
+def read_from_passport_v2(image, name:str=None, roi_sink=None, backend:str="passporteye"):
+    """
+    Localize MRZ from the document > 
+    Optionally hand over the MRZ RoI to a sink >
+    OCR of the grayscale RoI > Decode with the check digits.
+    Everything happens in memory.
 
     Parameters
     ----------
-    image_file : str
-        DESCRIPTION.
+    image : str/bytes/np.ndarray
+        Path of the image, its encoded bytes or the decoded (BGR) array.
+    name : str, optional
+        Name for the saved RoI, by default the file name or a random id.
+    roi_sink : callable, optional
+        `roi_sink(name, roi)` to keep the RoI, e.g. a `BackgroundImageSaver`.
+    backend : str, optional
+        MRZ localizer, "passporteye" (default) or the faster "cv2". With "cv2"
+        the smaller candidate boxes are read if the largest doesn't decode.
 
     Returns
     -------
-    user_info : TYPE
-        DESCRIPTION.
+    user_info : dict
+        Decoded fields, None if no MRZ is found.
 
     """
-    mrz = read_mrz(image_file, save_roi=True)  
-    # mrz_dict = mrz.to_dict()
-    if mrz:
-        user_info = {}
-        # Save image for future training/analysis
-        roi_save_fname = r'mrz_roi/' + os.path.basename(image_file)
-        mpimg.imsave(roi_save_fname, mrz.aux['roi'], cmap='gray')
-        
-        #image manipulation
-        img = cv2.cvtColor(np.array(mrz.aux['roi']*255).astype('uint8'), 
-                           cv2.COLOR_GRAY2BGR)
-        
-        img = cv2.cvtColor( cv2.resize(img, (1110, 140)), cv2.COLOR_BGR2GRAY) #convert image to grayscale to enchment the ocr process
-        
-        #remove < from mrz code
-        allowlist = st.ascii_letters+st.digits+'< '
-        code = reader.readtext(img, paragraph=False, detail=0, allowlist=allowlist)
-        
-        # Handle condition where embossed informations are also detected.
-        # Typically row length > 15
-        code = [s for s in code if len(s) >= 15]
+    img = mrz_roi_for_ocr(image, name, roi_sink, backend)
+    if img is None:
+        return None
+    reader = get_reader()
+    code = reader.readtext(img, paragraph=False, detail=0, allowlist=MRZ_ALLOWLIST)
+    user_info = decode_mrz_text(code)
+    if user_info is None and backend == "cv2":
+        # The largest box may be another text line, try the smaller ones
+        user_info = _read_fallback_rois(image, name, backend, reader)
+    return user_info
 
-            
-        
-        code_joined = "\n".join(code).upper().replace(" ", "")
-        # Extract with MRZ
-        # TODO: Adapt this part to handle different type of docs. E.g., visa, passport, id card etc.
-        
-        if len(code_joined) == 92:
-            decoded_mrz = TD1CodeChecker(code_joined)
-        elif len(code_joined) == 73:
-            decoded_mrz = TD2CodeChecker(code_joined)            
-        elif len(code_joined) == 89:
-            decoded_mrz = TD3CodeChecker(code_joined)
-        else:
-            return None
-        user_info['name'] = decoded_mrz.fields().name
-        user_info['surname'] = decoded_mrz.fields().surname
-        user_info['country_code'] = decoded_mrz.fields().country
-        user_info["country_name"] = get_country(decoded_mrz.fields().country)
-        user_info['nationality'] = decoded_mrz.fields().nationality
-        user_info['birth_date'] = parse_date(decoded_mrz.fields().birth_date)
-        user_info['expiry_date'] = parse_date(decoded_mrz.fields().expiry_date)
-        user_info['sex']  = decoded_mrz.fields().sex
-        user_info['document_type'] = decoded_mrz.fields().document_type
-        user_info['document_number'] = decoded_mrz.fields().document_number
-        user_info['optional_data'] = decoded_mrz.fields().optional_data
-        user_info["doc_error"] = decoded_mrz.report.errors
-        user_info["doc_warning"] = decoded_mrz.report.warnings
-        return user_info
-
-    else: 
+
+def _safe_roi_for_ocr(args):
+    image, name, roi_sink, backend = args
+    try:
+        return mrz_roi_for_ocr(image, name, roi_sink, backend)
+    except Exception as err:
+        print("Localization of {} failed with error: {}".format(_image_name(image, name), err))
         return None
+
+
+def _safe_decode_mrz_text(code, name):
+    try:
+        return decode_mrz_text(code)
+    except Exception as err:
+        print("Decoding the MRZ of {} failed with error: {}".format(name, err))
+        return None
+
+
+def read_passports_batch(images:list, batch_size:int=16, max_workers:int=None,
+                         roi_sink=None, backend:str="passporteye"):
+    """
+    Batched version of `read_from_passport_v2` for bulk processing. MRZs are
+    localized concurrently, the fixed-size RoIs are stacked and the EasyOCR
+    detector/recognizer runs on whole batches instead of one RoI at a time.
+
+    Parameters
+    ----------
+    images : list
+        Paths, encoded bytes or decoded arrays of the documents.
+    batch_size : int, optional
+        RoIs per OCR call. The default is 16.
+    max_workers : int, optional
+        Threads for the localization, by default one per CPU. The heavy parts
+        (tesseract, OpenCV, scikit-image) run outside the GIL.
+    roi_sink : callable, optional
+        `roi_sink(name, roi)` to keep the RoIs.
+    backend : str, optional
+        MRZ localizer, "passporteye" (default) or the faster "cv2".
+
+    Returns
+    -------
+    results : list
+        `user_info` dict per input in input order, None if not decoded.
+    report : dict
+        Timings of the stages and the throughput in "docs_per_sec".
+
+    """
+    if backend not in MRZ_BACKENDS:
+        raise ValueError("Unknown MRZ backend {}, use one of {}".format(backend, MRZ_BACKENDS))
+    st = time.perf_counter()
+    names = [_image_name(image, None) for image in images]
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        rois = list(pool.map(_safe_roi_for_ocr,
+                             [(image, name, roi_sink, backend)
+                              for image, name in zip(images, names)]))
+    localize_sec = time.perf_counter() - st
+
+    results = [None]*len(images)
+    found = [i for i, roi in enumerate(rois) if roi is not None]
+    reader = get_reader()
+    for k in range(0, len(found), batch_size):
+        idx = found[k:k+batch_size]
+        # All RoIs share MRZ_ROI_SIZE, so no padding/resizing is needed
+        codes = reader.readtext_batched([rois[i] for i in idx],
+                                        n_width=MRZ_ROI_SIZE[0], n_height=MRZ_ROI_SIZE[1],
+                                        batch_size=batch_size, paragraph=False,
+                                        detail=0, allowlist=MRZ_ALLOWLIST)
+        for i, code in zip(idx, codes):
+            # One unreadable document must not fail the whole batch
+            results[i] = _safe_decode_mrz_text(code, names[i])
+    if backend == "cv2":
+        # Rare, the fallback boxes are read one by one
+        for i in found:
+            if results[i] is None:
+                results[i] = _read_fallback_rois(images[i], names[i], backend, reader)
+    total_sec = time.perf_counter() - st
+
+    report = {"documents": len(images),
+              "mrz_found": len(found),
+              "decoded": sum(r is not None for r in results),
+              "localize_sec": localize_sec,
+              "ocr_sec": total_sec - localize_sec,
+              "total_sec": total_sec,
+              "docs_per_sec": len(images) / total_sec if total_sec else 0.0}
+    return results, report
+
 # %%
 if __name__ == "__main__":
     import glob
+    import matplotlib.image as mpimg
+    import matplotlib.pyplot as plt
     sample_imgs = glob.glob("sample_img/*.jpeg")
     
+    roi_saver = BackgroundImageSaver("mrz_roi")
     for img_file in sample_imgs:
         print(f"Processing {img_file}")
-        mrz_dict = read_from_passport_v2(image_file=img_file)
-        roi_img_file = r'mrz_roi/' + os.path.basename(img_file)
+        mrz_dict = read_from_passport_v2(img_file, roi_sink=roi_saver)
+        roi_saver.flush()
+        roi_img_file = roi_saver.path_for(os.path.basename(img_file))
         
         img = mpimg.imread(img_file)
         img_roi = mpimg.imread(roi_img_file)
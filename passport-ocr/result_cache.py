@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:41:09 2026
+
+Result cache for repeated passport submissions, e.g. retries after a timeout.
+Results are keyed by a keyed hash (HMAC-SHA256) of the uploaded bytes, so the
+keys can't be used to confirm that a given image was submitted. Recent results
+are kept in memory (LRU, bounded). Entries evicted from memory can be spilled
+to disk, encrypted with Fernet (AES + HMAC) since they contain PII. Both
+levels expire after the TTL.
+
+@author: ikespand
+"""
+
+from collections import OrderedDict
+import hashlib
+import hmac
+import importlib.util
+import json
+import os
+import threading
+import time
+
+CRYPTO_AVAILABLE = importlib.util.find_spec("cryptography") is not None
+
+# %%
+
+class ResultCache():
+    """Thread-safe cache of decoded passport data by upload content.
+    """
+    def __init__(self, max_entries:int=1024, ttl:float=3600, spill_dir:str=None,
+                 max_spill_entries:int=100000, secret:bytes=None):
+        """
+        Parameters
+        ----------
+        max_entries : int, optional
+            Results kept in memory. The default is 1024.
+        ttl : float, optional
+            Seconds a result stays valid. The default is 3600.
+        spill_dir : str, optional
+            Directory for the encrypted results evicted from memory. The
+            default is None, i.e. evicted results are dropped.
+        max_spill_entries : int, optional
+            Files kept in `spill_dir`. The default is 100000.
+        secret : bytes, optional
+            Fernet key (`Fernet.generate_key()`) for the hashes and the spilled
+            results. Processes sharing `spill_dir` need the same key. By
+            default a random key is used, i.e. spilled results are only
+            readable by this process.
+
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.spill_dir = spill_dir
+        self.max_spill_entries = max_spill_entries
+        self.secret = secret or os.urandom(32)
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+        self._spills = 0
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._lock = threading.Lock()
+        self._fernet = None
+        if spill_dir is not None:
+            if not CRYPTO_AVAILABLE:
+                raise ImportError("Spilling results to disk needs the `cryptography` package")
+            from cryptography.fernet import Fernet
+            if secret is None:
+                self.secret = Fernet.generate_key()
+            self._fernet = Fernet(self.secret)
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def key(self, contents:bytes)->str:
+        """Cache key of the uploaded bytes."""
+        return hmac.new(self.secret, contents, hashlib.sha256).hexdigest()
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, key + ".bin")
+
+    def get(self, key:str):
+        """
+        Cached result of a key.
+
+        Parameters
+        ----------
+        key : str
+            See `key()`.
+
+        Returns
+        -------
+        result : dict
+            Cached result, None if missing or expired.
+
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+        result = self._read_spill(key) if self._fernet is not None else None
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.spill_hits += 1
+        return result
+
+    def _read_spill(self, key):
+        from cryptography.fernet import InvalidToken
+        fname = self._spill_path(key)
+        try:
+            with open(fname, "rb") as f:
+                token = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            # Fernet tokens carry the original insert time, which gives the TTL
+            return json.loads(self._fernet.decrypt(token, ttl=int(self.ttl)))
+        except InvalidToken:
+            # Expired, or written with another key
+            try:
+                os.remove(fname)
+            except OSError:
+                pass
+            return None
+
+    def set(self, key:str, result:dict):
+        """Cache a result, the least recently used ones are evicted/spilled."""
+        if result is None:
+            return None
+        evicted = []
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False))
+        if self._fernet is not None:
+            for old_key, (expires_at, old_result) in evicted:
+                if expires_at > time.time():
+                    self._write_spill(old_key, old_result, expires_at - self.ttl)
+        return None
+
+    def _write_spill(self, key, result, inserted_at):
+        fname = self._spill_path(key)
+        tmp_fname = "{}.{}.tmp".format(fname, threading.get_ident())
+        # Stamp the token and the mtime with the insert time, not the spill
+        # time, so the spilled entry expires when the in-memory one would have
+        inserted_at = int(inserted_at)
+        with open(tmp_fname, "wb") as f:
+            f.write(self._fernet.encrypt_at_time(json.dumps(result, default=str).encode(),
+                                                 inserted_at))
+        os.utime(tmp_fname, (inserted_at, inserted_at))
+        os.replace(tmp_fname, fname)
+        with self._lock:
+            self._spills += 1
+            prune = self._spills % 100 == 0
+        if prune:
+            self._prune_spill()
+
+    def _prune_spill(self):
+        entries = []
+        for entry in os.scandir(self.spill_dir):
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except OSError:
+                pass
+        now = time.time()
+        entries.sort()
+        n_over = len(entries) - self.max_spill_entries
+        for i, (mtime, fname) in enumerate(entries):
+            if i >= n_over and mtime + self.ttl > now:
+                break
+            try:
+                os.remove(fname)
+            except OSError:
+                pass
+
+    @property
+    def stats(self)->dict:
+        with self._lock:
+            lookups = self.hits + self.spill_hits + self.misses
+            return {"entries": len(self._entries),
+                    "hits": self.hits,
+                    "spill_hits": self.spill_hits,
+                    "misses": self.misses,
+                    "hit_rate": (self.hits + self.spill_hits) / lookups if lookups else 0.0}
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules import each other flat, e.g. `from audit_log import ...`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
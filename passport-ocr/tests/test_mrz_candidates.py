@@ -0,0 +1,50 @@
+from mrz_candidates import best_candidate, check_digit
+from passport_eye_mrz import decode_mrz_text
+
+TD3 = ["P<UTOERIKSSON<<ANNA<MARIA<<<<<<<<<<<<<<<<<<<",
+       "L898902C36UTO7408122F1204159ZE184226B<<<<<10"]
+TD1 = ["I<UTOD231458907<<<<<<<<<<<<<<<",
+       "7408122F1204159UTO<<<<<<<<<<<6",
+       "ERIKSSON<<ANNA<MARIA<<<<<<<<<<"]
+
+
+def test_exact_reads():
+    assert best_candidate(TD3) == ("TD3", "\n".join(TD3), 5)
+    assert best_candidate(TD1) == ("TD1", "\n".join(TD1), 4)
+    # Noise above the MRZ
+    assert best_candidate(["REPUBLIC OF UTOPIA"] + TD3)[1] == "\n".join(TD3)
+
+
+def test_dropped_filler_in_run():
+    line = TD3[1].replace("B<<<<<", "B<<<<")
+    assert best_candidate([TD3[0], line]) == ("TD3", "\n".join(TD3), 5)
+
+
+def test_dropped_trailing_fillers():
+    assert best_candidate([TD3[0][:-2], TD3[1]])[1] == "\n".join(TD3)
+
+
+def test_extra_filler_in_run():
+    line = TD3[1].replace("B<<<<<", "B<<<<<<")
+    assert best_candidate([TD3[0], line])[1] == "\n".join(TD3)
+
+
+def test_letter_digit_confusions():
+    # Digits of the dates read as letters
+    line = TD3[1].replace("7408122F1204159", "74O8122F12O4159")
+    assert best_candidate([TD3[0], line]) == ("TD3", "\n".join(TD3), 5)
+
+
+def test_bad_check_digit_is_reported_not_edited():
+    composite = str((int(TD3[1][-1]) + 1) % 10)
+    line = TD3[1][:-1] + composite
+    assert best_candidate([TD3[0], line]) == ("TD3", TD3[0] + "\n" + line, 4)
+    user_info = decode_mrz_text([TD3[0], line])
+    assert user_info["document_number"] == "L898902C3"
+    assert user_info["optional_data"].startswith("ZE184226B")
+    assert user_info["doc_error"]
+
+
+def test_check_digit():
+    assert check_digit("L898902C3") == "6"
+    assert check_digit("740812") == "2"
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:58:36 2026
+
+ASGI middleware rejecting uploads early, before FastAPI parses the multipart
+body: requests with an invalid `apiKey` query parameter are refused without
+reading the body, and bodies beyond `max_bytes` are cut off while streaming
+(by Content-Length up front, or by counting chunked bodies).
+
+@author: ikespand
+"""
+
+from urllib.parse import parse_qs
+import hmac
+import json
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+
+def check_api_key(api_key:str, api_keys)->bool:
+    """Constant time check of a key against all valid keys."""
+    if not api_key:
+        return False
+    # No early exit, the timing doesn't tell which or how many keys matched
+    valid = False
+    for key in api_keys:
+        valid |= hmac.compare_digest(api_key.encode(), key.encode())
+    return valid
+
+
+class UploadTooLargeError(HTTPException):
+    """Raised while streaming a body beyond `max_bytes`. Register
+    `upload_too_large_handler` on the app to answer it like the other
+    rejections."""
+    def __init__(self):
+        super().__init__(status_code=413, detail="Image is too large!")
+
+
+async def upload_too_large_handler(request, exc:UploadTooLargeError):
+    return JSONResponse(status_code=exc.status_code, content={"Error": exc.detail})
+
+
+class UploadGuard():
+    """Early rejection of POST requests, add with `app.add_middleware`.
+    """
+    def __init__(self, app, api_keys, max_bytes:int=10*1024*1024):
+        self.app = app
+        self.api_keys = api_keys
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    async def _reject(send, status:int, message:str):
+        body = json.dumps({"Error": message}).encode()
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode()),
+                                (b"connection", b"close")]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if not check_api_key(query.get("apiKey", [""])[0], self.api_keys):
+            return await self._reject(send, 401, "Invalid apiKey!")
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            return await self._reject(send, 413, "Image is too large!")
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # FastAPI passes HTTPExceptions raised while reading the body on
+                    raise UploadTooLargeError()
+            return message
+
+        return await self.app(scope, limited_receive, send)
@@ -10,56 +10,194 @@ download the thumbnail.
 """
 
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 import requests
 import os
 from pathlib import Path
 import pandas as pd
+import threading
+import time
+from batch_fetcher import BatchVideoFetcher
+from response_cache import ResponseCache
+from http_session import make_session
+from thumbnails import ThumbnailDownloader
+from pipeline import ChannelStatsPipeline
+from instrumentation import ApiMetrics, count_retries
+
+# Counter in the `statistics` part -> column of `summerize_stats`
+SUMMARY_COUNTERS = {'likeCount': 'liked',
+                    'dislikeCount': 'disliked',
+                    'viewCount': 'views',
+                    'commentCount': 'comment'}
+
+# Quota units per request of `CustomYouTubeApi`, all other endpoints cost 1
+ENDPOINT_COST = {'search': 100}
 
 # %%
 
 class YoutubeApi():
     """Wrapper class for YouTube's official client from Google.
     """
-    def __init__(self, api_key):
+    def __init__(self, api_key, max_workers=8, quota=None, cache=None, metrics=None):
         self.api_key = api_key
-        self.youtube = build('youtube', 'v3', developerKey = self.api_key)
+        # Optional `TokenBucket`, shared by all calls made through this object
+        self.quota = quota
+        # Optional `ApiMetrics` to record the requests in
+        self.metrics = metrics
+        self._local = threading.local()
+        # Each worker thread needs its own client, see `BatchVideoFetcher`.
+        self.fetcher = BatchVideoFetcher(
+            lambda: build('youtube', 'v3', developerKey = self.api_key),
+            max_workers=max_workers,
+            quota=quota,
+            cache=cache,
+            metrics=metrics)
 
-    def get_video_ids_for_channel(self, channel_id):
+    @property
+    def youtube(self):
+        """Client of the calling thread, the client itself isn't thread-safe."""
+        if getattr(self._local, "youtube", None) is None:
+            self._local.youtube = build('youtube', 'v3', developerKey = self.api_key)
+        return self._local.youtube
+
+    def _execute(self, endpoint, request):
+        # Single request of 1 quota unit, response sizes are unknown here
+        if self.quota is not None:
+            self.quota.consume(1)
+        st = time.perf_counter()
+        try:
+            res = request.execute()
+        except HttpError as err:
+            if self.metrics is not None:
+                self.metrics.record(endpoint, time.perf_counter() - st,
+                                    err.resp.status, quota_units=1)
+            raise
+        if self.metrics is not None:
+            self.metrics.record(endpoint, time.perf_counter() - st, 200, quota_units=1)
+        return res
+
+    def get_uploads_playlist_id(self, channel_id, state=None):
         """
-        Provides all video ids for a given channel.
+        Id of the playlist with all uploads of a channel. It never changes, so
+        it is taken from the sync state if one is given.
 
         Parameters
         ----------
-        channel_id : TYPE
-            Channel id, can be obtained from a variety of sources.
+        channel_id : str
+            Id of the channel.
+        state : ChannelSyncState, optional
+            Local state store. The default is None.
 
         Returns
         -------
-        TYPE
-            DESCRIPTION.
+        str
+            Id of the uploads playlist.
 
         """
-        
-        contentdata = self.youtube.channels().list(id = channel_id,part='contentDetails').execute()
-    
+        known = state.get(channel_id) if state is not None else None
+        if known is not None and known["uploads_playlist_id"]:
+            return known["uploads_playlist_id"]
+        contentdata = self._execute('channels',
+                                    self.youtube.channels().list(id = channel_id,part='contentDetails'))
         playlist_id = contentdata['items'][0]['contentDetails']['relatedPlaylists']['uploads']
-        videos = []
+        if state is not None:
+            state.set_playlist(channel_id, playlist_id)
+        return playlist_id
+
+    def iter_channel_uploads(self, channel_id, last_video_id=None,
+                             last_published_at=None, state=None):
+        """
+        Yield the uploads of a channel page by page, newest first. Paging
+        stops as soon as the last known video is reached.
+
+        Parameters
+        ----------
+        channel_id : str
+            Id of the channel.
+        last_video_id : str, optional
+            Newest video of the previous sync. The default is None.
+        last_published_at : str, optional
+            `publishedAt` of that video. Older items are known as well, which
+            covers the case that the video itself has been deleted.
+        state : ChannelSyncState, optional
+            Used to look up the uploads playlist. The default is None.
+
+        Yields
+        ------
+        video : dict
+            `playlistItems` resource with the snippet part.
+
+        """
+        playlist_id = self.get_uploads_playlist_id(channel_id, state)
         next_page_token = None
-        
         while 1:
-            res = self.youtube.playlistItems().list(playlistId=playlist_id, 
+            res = self._execute('playlistItems',
+                                self.youtube.playlistItems().list(playlistId=playlist_id, 
                                             part='snippet', 
                                             maxResults=50,
-                                            pageToken=next_page_token).execute()
-            videos += res['items']
+                                            pageToken=next_page_token))
+            for video in res['items']:
+                if (video["snippet"]["resourceId"]["videoId"] == last_video_id or
+                    (last_published_at is not None and
+                     video["snippet"]["publishedAt"] < last_published_at)):
+                    return
+                yield video
             next_page_token = res.get('nextPageToken')
-        
             if next_page_token is None:
                 break
-        
-        video_ids = list(map(lambda x:x['snippet']['resourceId']['videoId'], videos))
-        
-        searched_videos = videos
+
+    def sync_channel(self, channel_id, state):
+        """
+        Incremental sync: yield only the videos uploaded since the last
+        completed sync of the channel. The state is advanced once the generator
+        is exhausted, so an interrupted sync is repeated next time.
+
+        Parameters
+        ----------
+        channel_id : str
+            Id of the channel.
+        state : ChannelSyncState
+            Local state store.
+
+        Yields
+        ------
+        video : dict
+            New `playlistItems` resource with the snippet part, newest first.
+
+        """
+        known = state.get(channel_id) or {}
+        newest = None
+        for video in self.iter_channel_uploads(channel_id,
+                                               known.get("last_video_id"),
+                                               known.get("last_published_at"),
+                                               state=state):
+            if newest is None:
+                newest = video["snippet"]
+            yield video
+        if newest is not None:
+            state.set_last_seen(channel_id, newest["resourceId"]["videoId"],
+                                newest["publishedAt"])
+
+    def get_video_ids_for_channel(self, channel_id):
+        """
+        Provides all video ids for a given channel.
+
+        Parameters
+        ----------
+        channel_id : TYPE
+            Channel id, can be obtained from a variety of sources.
+
+        Returns
+        -------
+        video_ids : list
+            Ids of all videos.
+        videos : list
+            Raw `playlistItems` resources.
+        df : pd.DataFrame
+            Flattened snippet of the videos.
+
+        """
+        videos = []
         video_ids = []
         publish_ts = []
         title = []
@@ -67,7 +205,8 @@ class YoutubeApi():
         thumbnail_mq = []        
         thumbnail_hq = []
         channel_title = []
-        for video in searched_videos:
+        for video in self.iter_channel_uploads(channel_id):
+           videos.append(video)
            video_ids.append(video["snippet"]["resourceId"]["videoId"])
            publish_ts.append(video["snippet"]["publishedAt"])
            title.append(video["snippet"]["title"])
@@ -88,27 +227,24 @@ class YoutubeApi():
     
     def get_video_stats(self, video_ids):
         """
-        Get the statistics of a videos given in list form.
+        Get the statistics of a videos given in list form. Requests are made
+        in batches of 50 ids and run concurrently, see `BatchVideoFetcher`.
 
         Parameters
         ----------
         video_ids : list
-            DESCRIPTION.
+            Video ids to get the statistics for.
 
         Returns
         -------
-        stats : TYPE
-            DESCRIPTION.
+        stats : list
+            `videos().list` resources with the statistics part.
 
         """
-        stats = []
-        for i in range(0, len(video_ids), 40):
-            res = (self.youtube).videos().list(id=','.join(video_ids[i:i+40]),part='statistics').execute()
-            stats += res['items']
-        return stats
+        return self.fetcher.fetch(video_ids, part='statistics')
 
 
-    def summerize_stats(self, channel_id):
+    def summerize_stats(self, channel_id, videos=None):
         """
         Summerize the statistics of all videos in a given channel id.
 
@@ -116,40 +252,36 @@ class YoutubeApi():
         ----------
         channel_id : TYPE
             DESCRIPTION.
+        videos : list, optional
+            `playlistItems` resources of the channel if the caller already has
+            them, e.g. from `get_video_ids_for_channel`. Fetched otherwise.
 
         Returns
         -------
-        df : TYPE
-            DESCRIPTION.
+        df : pd.DataFrame
+            One row per video with nullable integer counters, which are <NA>
+            for hidden counters and for videos without statistics.
 
         """
-        video_ids, videos, _ = self.get_video_ids_for_channel(channel_id)
+        if videos is None:
+            video_ids, videos, _ = self.get_video_ids_for_channel(channel_id)
+        else:
+            video_ids = [video['snippet']['resourceId']['videoId'] for video in videos]
         stats = self.get_video_stats(video_ids)
-    
-        title=[]
-        liked=[]
-        disliked=[]
-        views=[]
-        url=[]
-        comment=[]
-        for i in range(len(videos)):      
-                title.append((videos[i])['snippet']['title'])
-                url.append("https://www.youtube.com/watch?v="+(videos[i])['snippet']['resourceId']['videoId'])
-                liked.append(int((stats[i])['statistics']['likeCount']))
-                disliked.append(int((stats[i])['statistics']['dislikeCount']))
-                views.append(int((stats[i])['statistics']['viewCount']))
-                comment.append(int((stats[i])['statistics']['commentCount']))
-                
-        
-        data={'video_id': video_ids,
-              'title':title,
-              'url':url,
-              'liked':liked,
-              'disliked':disliked,
-              'views':views,
-              'comment':comment}
-        
-        df=pd.DataFrame(data)
+
+        videos_df = pd.DataFrame({'video_id': video_ids,
+                                  'title': [video['snippet']['title'] for video in videos]})
+        videos_df['url'] = "https://www.youtube.com/watch?v=" + videos_df['video_id']
+        # Join on the id, `videos().list` silently drops private/deleted videos
+        stats_df = pd.DataFrame([item.get('statistics', {}) for item in stats],
+                                index=pd.Index([item['id'] for item in stats], name='video_id'))
+        stats_df = stats_df[~stats_df.index.duplicated()].reindex(columns=list(SUMMARY_COUNTERS))
+        df = videos_df.join(stats_df, on='video_id')
+
+        # Counters can be hidden (e.g. `dislikeCount`), keep them as <NA>
+        for key, name in SUMMARY_COUNTERS.items():
+            df[name] = pd.to_numeric(df.pop(key), errors='coerce',
+                                     dtype_backend='numpy_nullable').astype('Int64')
         return df
 
 # %%
@@ -158,9 +290,64 @@ class CustomYouTubeApi():
     its API then this can be obsolete.
     """
     
-    def __init__(self, api_key):
+    def __init__(self, api_key, cache=None, session=None, quota=None, metrics=None):
         self.api_key = api_key
         self.BASE_URL = r"https://www.googleapis.com/youtube/v3/"
+        # Optional `ResponseCache` to avoid paying quota for repeated requests
+        self.cache = cache
+        # Pooled keep-alive session, anything with a `get()` like requests' works
+        self.session = session or make_session()
+        # Optional `TokenBucket`, charged for requests which miss the cache
+        self.quota = quota
+        # Optional `ApiMetrics` to record the requests in
+        self.metrics = metrics
+
+    def _get_json(self, endpoint, params):
+        """
+        GET an endpoint of the API and return the decoded JSON. Successful
+        responses are served from and stored into the cache if one is given.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint relative to `BASE_URL`, e.g. "videos".
+        params : dict
+            Query parameters without the API key.
+
+        Returns
+        -------
+        dict/None
+            Decoded JSON response or None if the request failed.
+
+        """
+        if self.cache is not None:
+            data = self.cache.get(endpoint, params)
+            if data is not None:
+                if self.metrics is not None:
+                    self.metrics.record_cache_hit(endpoint)
+                return data
+        units = ENDPOINT_COST.get(endpoint, 1)
+        if self.quota is not None:
+            self.quota.consume(units)
+        st = time.perf_counter()
+        try:
+            resp = self.session.get(self.BASE_URL + endpoint,
+                                    params=dict(params, key=self.api_key))
+        except requests.RequestException as err:
+            if self.metrics is not None:
+                self.metrics.record(endpoint, time.perf_counter() - st,
+                                    type(err).__name__, quota_units=units)
+            raise
+        if self.metrics is not None:
+            self.metrics.record(endpoint, time.perf_counter() - st, resp.status_code,
+                                len(resp.content), count_retries(resp), units)
+        if resp.status_code != 200:
+            print("Something went wrong with error message: {}".format(resp.text))
+            return None
+        data = resp.json()
+        if self.cache is not None:
+            self.cache.set(endpoint, params, data)
+        return data
     
     def get_channelid_from_video_url(self, video_url):
         """
@@ -178,12 +365,9 @@ class CustomYouTubeApi():
     
         """
         video_id = video_url.split("v=")[1]
-        url = self.BASE_URL + r"videos?part=snippet&id={}&key={}".format(video_id, self.api_key)
-        resp = requests.get(url)
-        if resp.status_code == 200:
-            return resp.json()["items"][0]["snippet"]["channelId"]
-        else:
-            print("Something went wrong! See message : ", resp.text)
+        data = self._get_json("videos", {"part": "snippet", "id": video_id})
+        if data is not None:
+            return data["items"][0]["snippet"]["channelId"]
         
     def get_channelid_from_username(self, user_name):
         """
@@ -207,15 +391,14 @@ class CustomYouTubeApi():
             DESCRIPTION.
     
         """
-        url = self.BASE_URL + r"channels?key={}&forUsername={}&part=id".format( self.api_key , user_name)
-        resp = requests.get(url)
-        if resp.json()["items"][0]["kind"] == "youtube#channel":
-            return resp.json()["items"][0]["id"]
+        data = self._get_json("channels", {"forUsername": user_name, "part": "id"})
+        if data is not None and data["items"][0]["kind"] == "youtube#channel":
+            return data["items"][0]["id"]
         else:
             print("Not a YouTube channel")
         
     @staticmethod
-    def get_thumbnail(video_id, output_dir = os.getcwd()):
+    def get_thumbnail(video_id, output_dir = os.getcwd(), session=requests):
         """
         Download the thumbnail from a given video id.
     
@@ -225,6 +408,8 @@ class CustomYouTubeApi():
             DESCRIPTION.
         output_dir : TYPE, optional
             DESCRIPTION. The default is os.getcwd().
+        session : requests.Session, optional
+            Session to reuse connections with. The default is `requests`.
     
         Returns
         -------
@@ -233,7 +418,7 @@ class CustomYouTubeApi():
     
         """
         url = r"https://img.youtube.com/vi/{}/0.jpg".format(video_id)
-        response = requests.get(url)
+        response = session.get(url)
         Path(output_dir).mkdir(parents=True, exist_ok=True)    
         if response.status_code == 200:
             with open(os.path.join(output_dir, video_id+".jpg"), 'wb') as f:
@@ -258,51 +443,95 @@ class CustomYouTubeApi():
             DESCRIPTION.
 
         """
-        url = self.BASE_URL + r"search?part=snippet&maxResults={}&q={}&type=video&key={}".format(max_results, keywords, self.api_key)
-        resp = requests.get(url)
-        if resp.status_code == 200:
-            searched_videos = resp.json()["items"]
-            video_ids = []
-            publish_ts = []
-            title = []
-            thumbnail_def = []
-            thumbnail_mq = []        
-            thumbnail_hq = []
-            channel_title = []
-            for video in searched_videos:
-               video_ids.append(video["id"]["videoId"])
-               publish_ts.append(video["snippet"]["publishedAt"])
-               title.append(video["snippet"]["title"])
-               thumbnail_def.append(video["snippet"]["thumbnails"]["default"]["url"])
-               thumbnail_mq.append(video["snippet"]["thumbnails"]["medium"]["url"])
-               thumbnail_hq.append(video["snippet"]["thumbnails"]["high"]["url"])
-               channel_title.append(video["snippet"]["channelTitle"])         
-        
-            data={'video_id': video_ids,
-                  'publish_ts':publish_ts,
-                  'title':title,
-                  'thumbnail_def':thumbnail_def,
-                  'thumbnail_mq':thumbnail_mq,
-                  'thumbnail_hq':thumbnail_hq,
-                  'channel_title':channel_title}
-            return pd.DataFrame(data)    
-        
+        data = self._get_json("search", {"part": "snippet",
+                                         "maxResults": max_results,
+                                         "q": keywords,
+                                         "type": "video"})
+        if data is not None:
+            return self.search_results_to_df(data["items"])
         else:
-            print("Something went wrong with error message: {}".format(resp.text))
             return None
 
+    def iter_search_pages(self, keywords, page_size=50, max_pages=None):
+        """
+        Page through all search results of the keywords by following
+        `nextPageToken`. Only one page is held in memory at a time.
+
+        Parameters
+        ----------
+        keywords : str
+            Search query.
+        page_size : int, optional
+            Results per page, at most 50. The default is 50.
+        max_pages : int, optional
+            Stop after this many pages, each costs 100 quota units. By default
+            all pages are fetched (YouTube stops at around 500 results).
+
+        Yields
+        ------
+        items : list
+            Items of a `search` response page.
+
+        """
+        page_token = None
+        n_pages = 0
+        while max_pages is None or n_pages < max_pages:
+            data = self._get_json("search", {"part": "snippet",
+                                             "maxResults": page_size,
+                                             "q": keywords,
+                                             "type": "video",
+                                             "pageToken": page_token})
+            if data is None:
+                return
+            n_pages += 1
+            yield data["items"]
+            page_token = data.get("nextPageToken")
+            if page_token is None:
+                return
+
+    @staticmethod
+    def search_results_to_df(searched_videos):
+        """Flatten the items of a `search` response into a DataFrame."""
+        video_ids = []
+        publish_ts = []
+        title = []
+        thumbnail_def = []
+        thumbnail_mq = []        
+        thumbnail_hq = []
+        channel_title = []
+        for video in searched_videos:
+           video_ids.append(video["id"]["videoId"])
+           publish_ts.append(video["snippet"]["publishedAt"])
+           title.append(video["snippet"]["title"])
+           thumbnail_def.append(video["snippet"]["thumbnails"]["default"]["url"])
+           thumbnail_mq.append(video["snippet"]["thumbnails"]["medium"]["url"])
+           thumbnail_hq.append(video["snippet"]["thumbnails"]["high"]["url"])
+           channel_title.append(video["snippet"]["channelTitle"])         
+    
+        data={'video_id': video_ids,
+              'publish_ts':publish_ts,
+              'title':title,
+              'thumbnail_def':thumbnail_def,
+              'thumbnail_mq':thumbnail_mq,
+              'thumbnail_hq':thumbnail_hq,
+              'channel_title':channel_title}
+        return pd.DataFrame(data)    
+
     def get_video_stats_from_video_id(self, video_id):
-        url = self.BASE_URL + r"videos?part=statistics&key={}&id={}".format(self.api_key, video_id)
-        resp = requests.get(url)
-        if resp.status_code == 200:
-            vid_stat = resp.json()["items"][0]["statistics"]
-            vid_stat_df = pd.DataFrame(columns=list(vid_stat.keys()))
-            vid_stat_df.loc[0] = list(vid_stat.values())
-            vid_stat_df["video_id"] = video_id
-            return vid_stat_df
+        data = self._get_json("videos", {"part": "statistics", "id": video_id})
+        if data is not None:
+            return self.video_stats_to_df(data, video_id)
         else:
-            print("Something went wrong with error message: {}".format(resp.text))
             return None
+
+    @staticmethod
+    def video_stats_to_df(data, video_id):
+        """One row DataFrame from the `videos` response of a single video."""
+        vid_stat = data["items"][0]["statistics"]
+        vid_stat_df = pd.DataFrame(columns=list(vid_stat.keys()))
+        vid_stat_df.loc[0] = list(vid_stat.values())
+        vid_stat_df["video_id"] = video_id
+        return vid_stat_df
         
 #%%
 
@@ -312,32 +541,25 @@ if __name__ == "__main__":
     api_key = os.environ["YOUTUBEAPIKEY"]
     # 1. Get channel id from a video url 
     # OR Get ur channel id from: https://www.youtube.com/account_advanced
-    custom_api = CustomYouTubeApi(api_key)
+    # Responses are cached on disk, so re-runs barely cost any quota
+    cache = ResponseCache("youtube_cache.sqlite")
+    # Latency, bytes, retries and quota per endpoint of all requests below
+    metrics = ApiMetrics()
+    custom_api = CustomYouTubeApi(api_key, cache=cache, metrics=metrics)
     channel_id = custom_api.get_channelid_from_video_url(r"https://www.youtube.com/watch?v=th5_9woFJmk")
     
-    # 2. Get video id for the entire channel
-    yt = YoutubeApi(api_key)
-    video_ids, _, searched_videos = yt.get_video_ids_for_channel(channel_id=channel_id)
-    stats = yt.summerize_stats(channel_id)
-    # OR combine 1 and 2 get video id for any searched video
-    #searched_videos = search_video_with_keywords("machinelearning", api_key, max_results = 2)
+    # 2. Get all videos of the channel with their statistics and thumbnails.
+    # Stats are fetched in batches of 50 and written incrementally to parquet.
+    yt = YoutubeApi(api_key, cache=cache, metrics=metrics)
+    downloader = ThumbnailDownloader(output_dir = "./thumbnails", resolution = "hq",
+                                     metrics = metrics)
+    pipeline = ChannelStatsPipeline(yt, thumbnail_downloader=downloader)
+    n_videos = pipeline.run(channel_id, "video_stats.parquet")
+    print("Collected statistics for {} videos".format(n_videos))
+    # OR get video id for any searched video
+    #searched_videos = custom_api.search_video_with_keywords("machinelearning", max_results = 2)
     #video_ids = searched_videos["video_id"]
-    
-    # 3. Download the thumbnail and video stats
-    video_stats = []
-    for vid in video_ids:
-        __df = custom_api.get_video_stats_from_video_id(vid)
-        __df["thumbnail_location"] = custom_api.get_thumbnail(vid, output_dir = "./thumbnails")
-        video_stats.append(__df)
-            
-    video_stats_df = pd.concat(video_stats)
-    video_stats_df = pd.merge(searched_videos, 
-                          video_stats_df, 
-                          left_on='video_id', 
-                          right_on='video_id')
-    
-    with open("video_stats_df.csv", "a") as f:
-        video_stats_df.to_csv("video_stats_df.csv", index=False)
-    
-    
-    
\ No newline at end of file
+
+    print("Cache statistics: ", cache.stats)
+    cache.close()
+    print(metrics.to_prometheus())
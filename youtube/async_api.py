@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 12:06:33 2026
+
+Asyncio variant of `CustomYouTubeApi` on top of `httpx`. It uses the same
+endpoints, cache and response parsing, but many requests can be in flight at
+once over a few pooled (HTTP/2 if available) connections, e.g.
+
+    async with AsyncCustomYouTubeApi(api_key) as api:
+        dfs = await asyncio.gather(*[api.get_video_stats_from_video_id(v)
+                                     for v in video_ids])
+
+@author: ikespand
+"""
+
+import asyncio
+import os
+import time
+from pathlib import Path
+from api import CustomYouTubeApi, ENDPOINT_COST
+from http_session import RETRY_STATUS, make_async_client
+
+# %%
+
+class AsyncCustomYouTubeApi(CustomYouTubeApi):
+    """Async version of `CustomYouTubeApi`, all API methods are coroutines.
+    """
+    def __init__(self, api_key, cache=None, client=None, max_concurrency=100,
+                 quota=None, metrics=None, retries=3):
+        client = client or make_async_client(max_connections=max_concurrency)
+        # Passed as the session, so no unused requests.Session pool is built
+        super().__init__(api_key, cache=cache, session=client, quota=quota, metrics=metrics)
+        self.client = client
+        # Retries for connection errors and 429/5xx responses, as the sync session
+        self.retries = retries
+        # Bounds the in-flight requests independent of the connection limits
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _get(self, url, params=None):
+        """GET with retries on connection errors and 429/5xx, returns the
+        response and the number of retries."""
+        import httpx
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.semaphore:
+                    resp = await self.client.get(url, params=params)
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+            else:
+                if resp.status_code not in RETRY_STATUS or attempt == self.retries:
+                    return resp, attempt
+            await asyncio.sleep(0.5 * 2**attempt)
+
+    async def _get_json(self, endpoint, params):
+        # SQLite blocks, keep it off the event loop
+        if self.cache is not None:
+            data = await asyncio.to_thread(self.cache.get, endpoint, params)
+            if data is not None:
+                if self.metrics is not None:
+                    self.metrics.record_cache_hit(endpoint)
+                return data
+        units = ENDPOINT_COST.get(endpoint, 1)
+        if self.quota is not None:
+            # Waits without blocking the event loop
+            while True:
+                wait = self.quota.try_consume(units)
+                if not wait:
+                    break
+                await asyncio.sleep(wait)
+        st = time.perf_counter()
+        try:
+            resp, retries = await self._get(self.BASE_URL + endpoint,
+                                            params=dict(params, key=self.api_key))
+        except Exception as err:
+            if self.metrics is not None:
+                self.metrics.record(endpoint, time.perf_counter() - st,
+                                    type(err).__name__, quota_units=units)
+            raise
+        if self.metrics is not None:
+            self.metrics.record(endpoint, time.perf_counter() - st, resp.status_code,
+                                len(resp.content), retries, units)
+        if resp.status_code != 200:
+            print("Something went wrong with error message: {}".format(resp.text))
+            return None
+        data = resp.json()
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.set, endpoint, params, data)
+        return data
+
+    async def get_channelid_from_video_url(self, video_url):
+        video_id = video_url.split("v=")[1]
+        data = await self._get_json("videos", {"part": "snippet", "id": video_id})
+        if data is not None:
+            return data["items"][0]["snippet"]["channelId"]
+
+    async def get_channelid_from_username(self, user_name):
+        data = await self._get_json("channels", {"forUsername": user_name, "part": "id"})
+        if data is not None and data["items"][0]["kind"] == "youtube#channel":
+            return data["items"][0]["id"]
+        else:
+            print("Not a YouTube channel")
+
+    async def get_thumbnail(self, video_id, output_dir = os.getcwd()):
+        url = r"https://img.youtube.com/vi/{}/0.jpg".format(video_id)
+        response, _ = await self._get(url)
+        fname = os.path.join(output_dir, video_id+".jpg")
+        if response.status_code == 200:
+            # Disk writes block, keep them off the event loop
+            await asyncio.to_thread(self._write_file, fname, response.content)
+        return fname
+
+    @staticmethod
+    def _write_file(fname, content):
+        Path(os.path.dirname(fname)).mkdir(parents=True, exist_ok=True)
+        with open(fname, 'wb') as f:
+            f.write(content)
+
+    async def search_video_with_keywords(self, keywords, max_results = 2):
+        data = await self._get_json("search", {"part": "snippet",
+                                               "maxResults": max_results,
+                                               "q": keywords,
+                                               "type": "video"})
+        if data is not None:
+            return self.search_results_to_df(data["items"])
+        else:
+            return None
+
+    async def iter_search_pages(self, keywords, page_size=50, max_pages=None):
+        """Async generator of the search result pages, see
+        `CustomYouTubeApi.iter_search_pages`."""
+        page_token = None
+        n_pages = 0
+        while max_pages is None or n_pages < max_pages:
+            data = await self._get_json("search", {"part": "snippet",
+                                                   "maxResults": page_size,
+                                                   "q": keywords,
+                                                   "type": "video",
+                                                   "pageToken": page_token})
+            if data is None:
+                return
+            n_pages += 1
+            yield data["items"]
+            page_token = data.get("nextPageToken")
+            if page_token is None:
+                return
+
+    async def get_video_stats_from_video_id(self, video_id):
+        data = await self._get_json("videos", {"part": "statistics", "id": video_id})
+        if data is not None:
+            return self.video_stats_to_df(data, video_id)
+        else:
+            return None
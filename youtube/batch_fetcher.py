@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:12:41 2026
+
+Batched and concurrent fetching of `videos().list` for the official YouTube
+client. Requests are filled up to the 50-ID maximum, dispatched through a
+bounded thread pool and throttled by a token bucket which keeps track of the
+spent API quota. Throttling and transient errors are retried with backoff.
+
+@author: ikespand
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from googleapiclient.errors import HttpError
+import random
+import threading
+import time
+
+# Maximum number of IDs accepted by a single `videos().list` call.
+MAX_IDS_PER_REQUEST = 50
+# Quota units charged for one `videos().list` call, independent of the parts.
+VIDEOS_LIST_COST = 1
+# 403 is included since YouTube reports `rateLimitExceeded` with it.
+RETRY_STATUS = (403, 429, 500, 502, 503, 504)
+
+# %%
+
+class QuotaExhaustedError(RuntimeError):
+    """Raised when the total budget of a `TokenBucket` is spent."""
+
+
+class TokenBucket():
+    """Thread-safe token bucket to throttle and account the API quota.
+
+    Tokens are refilled continuously with `rate` units per second up to
+    `capacity`. If `budget` is given, the bucket refuses to hand out more than
+    this many units in total (e.g. the daily quota of the project).
+    """
+    def __init__(self, rate=100, capacity=None, budget=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.budget = budget
+        self.consumed = 0
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self):
+        """Units left in the budget, None if the budget is unlimited."""
+        if self.budget is None:
+            return None
+        return self.budget - self.consumed
+
+    def consume(self, units=1):
+        """
+        Take `units` tokens from the bucket, blocking until they are available.
+
+        Parameters
+        ----------
+        units : int, optional
+            Quota units of the call to be made. The default is 1.
+
+        Raises
+        ------
+        QuotaExhaustedError
+            If the call would exceed the total budget.
+
+        Returns
+        -------
+        None.
+
+        """
+        while True:
+            wait = self.try_consume(units)
+            if not wait:
+                return None
+            time.sleep(wait)
+
+    def try_consume(self, units=1):
+        """
+        Take `units` tokens if they are available, without blocking. Lets
+        async callers wait with `asyncio.sleep` instead.
+
+        Returns
+        -------
+        wait : float
+            0.0 if the tokens were taken, else the seconds until they will be.
+
+        """
+        with self._lock:
+            if self.budget is not None and self.consumed + units > self.budget:
+                raise QuotaExhaustedError(
+                    "Quota budget of {} units is exhausted".format(self.budget))
+            now = time.monotonic()
+            self._tokens = min(self.capacity,
+                               self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= units:
+                self._tokens -= units
+                self.consumed += units
+                return 0.0
+            return (units - self._tokens) / self.rate
+
+
+class BatchVideoFetcher():
+    """Fetches `videos().list` resources for many IDs concurrently.
+
+    The client built by `googleapiclient` is not thread-safe, therefore each
+    worker thread builds its own client with `service_factory`. With a
+    `ResponseCache`, resources are cached per video id under the same key as
+    a single-id `videos` request of `CustomYouTubeApi`.
+    """
+    def __init__(self, service_factory, max_workers=8, quota=None,
+                 max_retries=5, backoff=1.0, cache=None, metrics=None):
+        self.service_factory = service_factory
+        self.max_workers = max_workers
+        self.quota = quota
+        self.cache = cache
+        self.metrics = metrics
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._local = threading.local()
+
+    def _service(self):
+        if getattr(self._local, "youtube", None) is None:
+            self._local.youtube = self.service_factory()
+        return self._local.youtube
+
+    def _sleep_before_retry(self, err, attempt):
+        retry_after = err.resp.get("retry-after")
+        if retry_after is not None and retry_after.isdigit():
+            delay = int(retry_after)
+        else:
+            delay = self.backoff * 2**attempt
+        time.sleep(delay + random.uniform(0, self.backoff))
+
+    def _record(self, st, status, attempt):
+        if self.metrics is not None:
+            self.metrics.record('videos', time.perf_counter() - st, status,
+                                retries=attempt,
+                                quota_units=(attempt + 1)*VIDEOS_LIST_COST)
+
+    def _execute(self, video_ids, part):
+        st = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            if self.quota is not None:
+                self.quota.consume(VIDEOS_LIST_COST)
+            try:
+                # maxResults doesn't apply to id lookups, the ids bound the page
+                res = self._service().videos().list(id=','.join(video_ids),
+                                                    part=part).execute()
+            except HttpError as err:
+                if err.resp.status not in RETRY_STATUS or attempt == self.max_retries:
+                    self._record(st, err.resp.status, attempt)
+                    raise
+                self._sleep_before_retry(err, attempt)
+            else:
+                self._record(st, 200, attempt)
+                return res
+
+    def iter_batches(self, video_ids, part='statistics'):
+        """
+        Fetch the resources in batches of 50 and yield them batch by batch in
+        request order, while later batches are still in flight. Resources found
+        in the cache are yielded first as one batch.
+
+        Parameters
+        ----------
+        video_ids : list
+            Video ids to fetch.
+        part : str, optional
+            Comma separated resource parts. The default is 'statistics'.
+
+        Yields
+        ------
+        ids : list
+            Requested ids of the batch.
+        items : list
+            Returned resources. Private or deleted videos are missing here.
+
+        """
+        video_ids = list(video_ids)
+        if self.cache is not None:
+            cached_ids, cached_items, missing = [], [], []
+            found = self.cache.get_many('videos', [{'part': part, 'id': vid}
+                                                   for vid in video_ids])
+            for vid, data in zip(video_ids, found):
+                if data is not None and data.get('items'):
+                    cached_ids.append(vid)
+                    cached_items += data['items']
+                else:
+                    missing.append(vid)
+            if cached_ids:
+                yield cached_ids, cached_items
+            video_ids = missing
+
+        chunks = [video_ids[i:i+MAX_IDS_PER_REQUEST]
+                  for i in range(0, len(video_ids), MAX_IDS_PER_REQUEST)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = pool.map(lambda ids: self._execute(ids, part), chunks)
+            for ids, res in zip(chunks, results):
+                items = res.get('items', [])
+                if self.cache is not None:
+                    self.cache.set_many('videos', [({'part': part, 'id': item['id']},
+                                                    {'items': [item]}) for item in items])
+                yield ids, items
+
+    def fetch(self, video_ids, part='statistics'):
+        """
+        Fetch the resources for all given ids.
+
+        Parameters
+        ----------
+        video_ids : list
+            Video ids to fetch.
+        part : str, optional
+            Comma separated resource parts. The default is 'statistics'.
+
+        Returns
+        -------
+        items : list
+            Returned resources in request order.
+
+        """
+        video_ids = list(video_ids)
+        by_id = {}
+        for _, batch in self.iter_batches(video_ids, part):
+            by_id.update((item['id'], item) for item in batch)
+        return [by_id[vid] for vid in video_ids if vid in by_id]
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 12:31:50 2026
+
+Benchmark of the HTTP layer against a local stub of the `videos` endpoint, so
+no quota is spent. Compares requests/sec of:
+    1. one `requests.get` per call (the old behaviour),
+    2. a pooled keep-alive session shared by a thread pool,
+    3. `AsyncCustomYouTubeApi` with many requests in flight.
+
+Usage: python bench_http.py [n_requests]
+
+@author: ikespand
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import asyncio
+import json
+import sys
+import threading
+import time
+import requests
+from api import CustomYouTubeApi
+from async_api import AsyncCustomYouTubeApi
+from http_session import make_session
+
+# %%
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every GET with a canned `videos` response over keep-alive."""
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes, avoid Nagle's delay on keep-alive
+    disable_nagle_algorithm = True
+    body = json.dumps({"items": [{"id": "stub",
+                                  "statistics": {"viewCount": "1",
+                                                 "likeCount": "1",
+                                                 "commentCount": "1"}}]}).encode()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:{}/youtube/v3/".format(server.server_port)
+
+
+# Only the raw `_get_json` is timed, building DataFrames would dominate otherwise
+PARAMS = {"part": "statistics", "id": "stub"}
+
+
+def bench_sync(api, n, workers):
+    st = time.time()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda _: api._get_json("videos", PARAMS), range(n)))
+    return n / (time.time() - st)
+
+
+async def bench_async(base_url, n, concurrency):
+    async with AsyncCustomYouTubeApi("STUB", max_concurrency=concurrency) as api:
+        api.BASE_URL = base_url
+        st = time.time()
+        await asyncio.gather(*[api._get_json("videos", PARAMS)
+                               for _ in range(n)])
+        return n / (time.time() - st)
+
+# %%
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    server, base_url = start_stub_server()
+
+    # Passing the `requests` module as session reproduces one connection per call
+    old_api = CustomYouTubeApi("STUB", session=requests)
+    old_api.BASE_URL = base_url
+    pooled_api = CustomYouTubeApi("STUB", session=make_session(pool_size=16))
+    pooled_api.BASE_URL = base_url
+
+    results = {"requests.get, serial": bench_sync(old_api, n, 1),
+               "requests.get, 16 threads": bench_sync(old_api, n, 16),
+               "pooled session, serial": bench_sync(pooled_api, n, 1),
+               "pooled session, 16 threads": bench_sync(pooled_api, n, 16),
+               "async, 64 in flight": asyncio.run(bench_async(base_url, n, 64))}
+    for name, rps in results.items():
+        print("{:<28s} {:>8.0f} req/s".format(name, rps))
+    server.shutdown()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:05:38 2026
+
+Job runner for the video statistics of many channels. Channels run in
+parallel through one `YoutubeApi`, so they share its quota bucket and response
+cache. Every channel is written as one partition of a Parquet dataset
+(`<output_dir>/channel_id=<id>/part-0.parquet`) and recorded in a checkpoint,
+so an interrupted run resumes with the remaining channels. Within a channel,
+statistics already fetched before the interruption are served from the cache.
+
+@author: ikespand
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+import json
+import os
+import time
+import pyarrow.parquet as pq
+from batch_fetcher import QuotaExhaustedError
+from pipeline import ChannelStatsPipeline
+
+# Files starting with an underscore are ignored when reading the dataset
+CHECKPOINT_FNAME = "_checkpoint.json"
+
+# %%
+
+class MultiChannelJob():
+    """Fan-out of `ChannelStatsPipeline` over a list of channels.
+    """
+    def __init__(self, yt, output_dir, max_workers=4, thumbnail_downloader=None):
+        """
+        Parameters
+        ----------
+        yt : YoutubeApi
+            Shared client, create it with a `TokenBucket` and `ResponseCache`.
+        output_dir : str
+            Folder of the Parquet dataset and the checkpoint.
+        max_workers : int, optional
+            Channels processed in parallel. Each of them runs its own batches
+            through the fetcher's pool. The default is 4.
+        thumbnail_downloader : ThumbnailDownloader, optional
+            If given, thumbnails are downloaded as well.
+
+        """
+        self.yt = yt
+        self.output_dir = output_dir
+        self.max_workers = max_workers
+        self.pipeline = ChannelStatsPipeline(yt, thumbnail_downloader=thumbnail_downloader)
+        self.checkpoint_fname = os.path.join(output_dir, CHECKPOINT_FNAME)
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    def read_checkpoint(self):
+        if os.path.isfile(self.checkpoint_fname):
+            with open(self.checkpoint_fname) as f:
+                return json.load(f)
+        return {}
+
+    def write_checkpoint(self, checkpoint):
+        tmp_fname = self.checkpoint_fname + ".tmp"
+        with open(tmp_fname, "w") as f:
+            json.dump(checkpoint, f, indent=1)
+        os.replace(tmp_fname, self.checkpoint_fname)
+
+    def partition_path(self, channel_id):
+        return os.path.join(self.output_dir, "channel_id={}".format(channel_id),
+                            "part-0.parquet")
+
+    def _run_channel(self, channel_id):
+        fname = self.partition_path(channel_id)
+        Path(fname).parent.mkdir(parents=True, exist_ok=True)
+        # Written under a hidden name first, so a half written file is never read
+        tmp_fname = os.path.join(os.path.dirname(fname), ".part-0.parquet.tmp")
+        n_rows = self.pipeline.run(channel_id, tmp_fname)
+        os.replace(tmp_fname, fname)
+        return n_rows
+
+    def run(self, channel_ids):
+        """
+        Process all channels which are not yet in the checkpoint.
+
+        Parameters
+        ----------
+        channel_ids : list
+            Ids of the channels.
+
+        Returns
+        -------
+        summary : dict
+            Lists of "done", "failed" and "pending" channel ids. Channels are
+            pending if the quota was exhausted before they could run.
+
+        """
+        checkpoint = self.read_checkpoint()
+        todo = [c for c in dict.fromkeys(channel_ids) if c not in checkpoint]
+        done, failed = [], []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._run_channel, c): c for c in todo}
+            for future in as_completed(futures):
+                channel_id = futures[future]
+                try:
+                    n_rows = future.result()
+                except QuotaExhaustedError:
+                    # Everything else would fail as well, resume on the next run
+                    for other in futures:
+                        other.cancel()
+                    continue
+                except Exception as err:
+                    print("Channel {} failed with error: {}".format(channel_id, err))
+                    failed.append(channel_id)
+                    continue
+                checkpoint[channel_id] = {"rows": n_rows, "finished_at": time.time()}
+                self.write_checkpoint(checkpoint)
+                done.append(channel_id)
+        pending = [c for c in todo if c not in done and c not in failed]
+        return {"done": done, "failed": failed, "pending": pending}
+
+    def read(self):
+        """Read the whole dataset into a DataFrame with a `channel_id` column."""
+        return pq.read_table(self.output_dir).to_pandas()
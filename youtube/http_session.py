@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:48:05 2026
+
+HTTP session layer shared by the YouTube wrappers. Connections to
+googleapis.com and img.youtube.com are kept alive and pooled instead of doing
+a new TCP+TLS handshake for every call. The async client speaks HTTP/2 when
+the optional `h2` package is installed.
+
+@author: ikespand
+"""
+
+import importlib.util
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# %%
+
+def make_session(pool_size=32, retries=3):
+    """
+    Create a `requests.Session` with keep-alive connection pooling and retries
+    on transient errors.
+
+    Parameters
+    ----------
+    pool_size : int, optional
+        Connections kept open per host. Should be at least the number of
+        threads sharing the session. The default is 32.
+    retries : int, optional
+        Retries for connection errors and 429/5xx responses. The default is 3.
+
+    Returns
+    -------
+    session : requests.Session
+        Session to be used instead of the module-level `requests.get`.
+
+    """
+    retry = Retry(total=retries,
+                  backoff_factor=0.5,
+                  status_forcelist=RETRY_STATUS,
+                  allowed_methods=["GET"],
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size,
+                          pool_maxsize=pool_size,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def make_async_client(max_connections=100, http2=None, timeout=30.0):
+    """
+    Create a pooled `httpx.AsyncClient`, which is an optional dependency.
+
+    Parameters
+    ----------
+    max_connections : int, optional
+        Upper bound of open connections. The default is 100.
+    http2 : bool, optional
+        Use HTTP/2, by default only if `h2` is installed.
+    timeout : float, optional
+        Timeout in seconds for each request. The default is 30.0.
+
+    Returns
+    -------
+    client : httpx.AsyncClient
+        Client to be used by `AsyncCustomYouTubeApi`.
+
+    """
+    import httpx
+    if http2 is None:
+        http2 = HTTP2_AVAILABLE
+    limits = httpx.Limits(max_connections=max_connections,
+                          max_keepalive_connections=max_connections)
+    return httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout)
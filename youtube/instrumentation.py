@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:20:57 2026
+
+Request instrumentation for the YouTube wrappers. `ApiMetrics` records per
+endpoint latency histograms, transferred bytes, retries, spent quota units,
+cache hits and failures. The numbers can be dumped in the Prometheus text
+format (e.g. for the node exporter's textfile collector) or passed on to
+callbacks as they happen.
+
+@author: ikespand
+"""
+
+import bisect
+import math
+import os
+import threading
+
+# Upper bounds of the latency buckets in seconds
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+COUNTERS = {"requests": "Requests sent, by endpoint and HTTP status.",
+            "errors": "Failed requests (non-200 responses and exceptions).",
+            "retries": "Retries done for the requests.",
+            "response_bytes": "Bytes received in response bodies.",
+            "quota_units": "Quota units charged for the requests.",
+            "cache_hits": "Requests served from the response cache."}
+
+# %%
+
+class ApiMetrics():
+    """Thread-safe metric registry shared by the API wrappers.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS, prefix="youtube_api"):
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self.hooks = []
+        self._lock = threading.Lock()
+        self._histograms = {}  # endpoint -> [bucket counts, sum, count]
+        self._counters = {name: {} for name in COUNTERS}  # name -> labels -> value
+
+    def add_hook(self, callback):
+        """
+        Register a callback which is called after every recorded request with
+        `callback(endpoint, event)`, where `event` is a dict with the keys
+        "latency", "status", "bytes", "retries" and "quota_units".
+        """
+        self.hooks.append(callback)
+
+    def _inc(self, name, labels, value=1):
+        self._counters[name][labels] = self._counters[name].get(labels, 0) + value
+
+    def record(self, endpoint, latency, status, n_bytes=0, retries=0, quota_units=0):
+        """
+        Record a single request.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint name, e.g. "videos" or "thumbnail".
+        latency : float
+            Duration of the request in seconds, including its retries.
+        status : int/str
+            HTTP status code, or the exception name if there was no response.
+        n_bytes : int, optional
+            Size of the response body. The default is 0.
+        retries : int, optional
+            Number of retries. The default is 0.
+        quota_units : int, optional
+            Quota units charged. The default is 0.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            hist = self._histograms.setdefault(endpoint, [[0]*len(self.buckets), 0.0, 0])
+            hist[0][bisect.bisect_left(self.buckets, latency)] += 1
+            hist[1] += latency
+            hist[2] += 1
+            self._inc("requests", (endpoint, str(status)))
+            if status != 200 and status != 304:
+                self._inc("errors", (endpoint,))
+            self._inc("retries", (endpoint,), retries)
+            self._inc("response_bytes", (endpoint,), n_bytes)
+            self._inc("quota_units", (endpoint,), quota_units)
+        event = {"latency": latency, "status": status, "bytes": n_bytes,
+                 "retries": retries, "quota_units": quota_units}
+        for hook in self.hooks:
+            try:
+                hook(endpoint, event)
+            except Exception as err:
+                print("Metrics hook failed with error: {}".format(err))
+        return None
+
+    def record_cache_hit(self, endpoint):
+        with self._lock:
+            self._inc("cache_hits", (endpoint,))
+
+    def snapshot(self):
+        """Copy of all metrics as nested dicts."""
+        with self._lock:
+            return {"latency": {endpoint: {"buckets": dict(zip(self.buckets, hist[0])),
+                                           "sum": hist[1],
+                                           "count": hist[2]}
+                                for endpoint, hist in self._histograms.items()},
+                    **{name: dict(values) for name, values in self._counters.items()}}
+
+    def to_prometheus(self):
+        """
+        Dump all metrics in the Prometheus text exposition format.
+
+        Returns
+        -------
+        str
+            Metrics, one sample per line.
+
+        """
+        name = self.prefix + "_request_duration_seconds"
+        lines = ["# HELP {} Latency of the requests.".format(name),
+                 "# TYPE {} histogram".format(name)]
+        with self._lock:
+            for endpoint, (counts, total, count) in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    lines.append('{}_bucket{{endpoint="{}",le="{}"}} {}'.format(
+                        name, endpoint, le, cumulative))
+                lines.append('{}_sum{{endpoint="{}"}} {}'.format(name, endpoint, total))
+                lines.append('{}_count{{endpoint="{}"}} {}'.format(name, endpoint, count))
+            for counter, help_text in COUNTERS.items():
+                name = "{}_{}_total".format(self.prefix, counter)
+                lines += ["# HELP {} {}".format(name, help_text),
+                          "# TYPE {} counter".format(name)]
+                for labels, value in sorted(self._counters[counter].items()):
+                    if counter == "requests":
+                        label_str = 'endpoint="{}",status="{}"'.format(*labels)
+                    else:
+                        label_str = 'endpoint="{}"'.format(*labels)
+                    lines.append("{}{{{}}} {}".format(name, label_str, value))
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, fname):
+        """Atomically write `to_prometheus()` to a file."""
+        tmp_fname = fname + ".tmp"
+        with open(tmp_fname, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_fname, fname)
+
+
+def count_retries(resp):
+    """Retries urllib3 did for a `requests` response, see `make_session`."""
+    retries = getattr(getattr(resp, "raw", None), "retries", None)
+    return len(retries.history) if retries is not None else 0
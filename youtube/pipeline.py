@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:52:09 2026
+
+Pipeline to collect the statistics of all videos of a channel. Statistics are
+fetched in batches of 50 ids while the uploads are still being paged: every
+`row_group_size` videos are fetched, converted into typed Arrow arrays and
+appended to a Parquet file in upload order. Memory is bounded by the row group
+size and no DataFrame is built per video.
+
+@author: ikespand
+"""
+
+from datetime import datetime
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Counter in the `statistics` part -> column name
+STAT_COLUMNS = {"viewCount": "views",
+                "likeCount": "liked",
+                "dislikeCount": "disliked",
+                "favoriteCount": "favorite",
+                "commentCount": "comment"}
+
+SCHEMA = pa.schema([("video_id", pa.string()),
+                    ("publish_ts", pa.timestamp("s", tz="UTC")),
+                    ("title", pa.string()),
+                    ("channel_title", pa.string()),
+                    ("thumbnail_hq", pa.string()),
+                    ("thumbnail_location", pa.string())] +
+                   [(name, pa.int64()) for name in STAT_COLUMNS.values()])
+
+# %%
+
+class ChannelStatsPipeline():
+    """Channel-wide video statistics written incrementally to Parquet.
+    """
+    def __init__(self, yt, thumbnail_downloader=None, row_group_size=10000):
+        """
+        Parameters
+        ----------
+        yt : YoutubeApi
+            Client whose `fetcher` does the batched `videos().list` calls.
+        thumbnail_downloader : ThumbnailDownloader, optional
+            If given, the thumbnails are downloaded and their path is stored.
+        row_group_size : int, optional
+            Videos buffered before their statistics are fetched and written.
+            The default is 10000.
+
+        """
+        self.yt = yt
+        self.thumbnail_downloader = thumbnail_downloader
+        self.row_group_size = row_group_size
+
+    def run(self, channel_id, output_fname):
+        """
+        Fetch all videos of the channel with their statistics. The uploads
+        playlist is paged lazily by `run_for_videos`, so the first row groups
+        are written before the last page is requested.
+
+        Parameters
+        ----------
+        channel_id : str
+            Id of the channel.
+        output_fname : str
+            Parquet file to write.
+
+        Returns
+        -------
+        n_rows : int
+            Number of written videos.
+
+        """
+        return self.run_for_videos(self.yt.iter_channel_uploads(channel_id),
+                                   output_fname)
+
+    def run_for_videos(self, videos, output_fname):
+        """
+        Fetch the statistics for `playlistItems` resources, e.g. from
+        `YoutubeApi.iter_channel_uploads` or `YoutubeApi.sync_channel`.
+
+        Parameters
+        ----------
+        videos : iterable
+            `playlistItems` resources with the snippet part.
+        output_fname : str
+            Parquet file to write.
+
+        Returns
+        -------
+        n_rows : int
+            Number of written videos. Videos without statistics (e.g. private
+            ones) are kept in place with null counters.
+
+        """
+        n_rows = 0
+        seen = set()
+        snippets = {}
+        with pq.ParquetWriter(output_fname, SCHEMA) as writer:
+            for video in videos:
+                snippet = video['snippet']
+                vid = snippet['resourceId']['videoId']
+                if vid in seen:
+                    continue
+                seen.add(vid)
+                snippets[vid] = snippet
+                if len(snippets) >= self.row_group_size:
+                    n_rows += self._write_row_group(writer, snippets)
+                    snippets = {}
+            n_rows += self._write_row_group(writer, snippets)
+        return n_rows
+
+    def _write_row_group(self, writer, snippets):
+        """Fetch thumbnails and statistics of the buffered videos and write
+        them as one row group, in the order of `snippets`."""
+        if not snippets:
+            return 0
+        thumbnails = {}
+        if self.thumbnail_downloader is not None:
+            thumbnails, _ = self.thumbnail_downloader.download(list(snippets))
+        statistics = {}
+        for _, items in self.yt.fetcher.iter_batches(list(snippets), part='statistics'):
+            for item in items:
+                statistics[item['id']] = item.get('statistics', {})
+        columns = {name: [] for name in SCHEMA.names}
+        for vid, snippet in snippets.items():
+            self._append_row(columns, vid, snippet, statistics.get(vid, {}), thumbnails)
+        return self._write(writer, columns)
+
+    @staticmethod
+    def _append_row(columns, video_id, snippet, statistics, thumbnails):
+        columns['video_id'].append(video_id)
+        columns['publish_ts'].append(datetime.fromisoformat(snippet['publishedAt']))
+        columns['title'].append(snippet['title'])
+        columns['channel_title'].append(snippet['channelTitle'])
+        columns['thumbnail_hq'].append(snippet['thumbnails'].get('high', {}).get('url'))
+        columns['thumbnail_location'].append(thumbnails.get(video_id))
+        for key, name in STAT_COLUMNS.items():
+            value = statistics.get(key)
+            columns[name].append(int(value) if value is not None else None)
+
+    @staticmethod
+    def _write(writer, columns):
+        n_rows = len(columns['video_id'])
+        if n_rows:
+            arrays = [pa.array(columns[field.name], type=field.type) for field in SCHEMA]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=SCHEMA))
+            for values in columns.values():
+                values.clear()
+        return n_rows
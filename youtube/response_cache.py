@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:02:17 2026
+
+Persistent response cache for the YouTube Data API backed by SQLite. Entries
+are keyed by the endpoint and the normalized query parameters (without the API
+key), expire after a per-endpoint TTL and are evicted least-recently-used once
+the cache grows beyond `max_entries`. Reads don't write: the access times of
+hits are kept in memory and stored with the next write or on `close()`.
+
+@author: ikespand
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+# TTLs in seconds. A key is looked up as "<endpoint>:<part>" first and then as
+# "<endpoint>", so the rarely changing parts can be kept much longer.
+DEFAULT_TTLS = {"videos:snippet": 30*24*3600,
+                "videos:statistics": 6*3600,
+                "channels": 30*24*3600,
+                "search": 24*3600}
+
+# %%
+
+class ResponseCache():
+    """Key-value cache of decoded JSON responses in a SQLite file.
+    """
+    def __init__(self, path="youtube_cache.sqlite", ttls=None,
+                 default_ttl=24*3600, max_entries=100000):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._inserts = 0
+        self._accessed = {}  # key -> last access, not yet stored
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                                 key TEXT PRIMARY KEY,
+                                 value TEXT NOT NULL,
+                                 expires_at REAL NOT NULL,
+                                 last_access REAL NOT NULL)""")
+        self.conn.execute("""CREATE INDEX IF NOT EXISTS responses_last_access
+                                 ON responses (last_access)""")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(endpoint, params):
+        """
+        Build the cache key from the endpoint and the query parameters. The
+        API key is dropped so that keys are portable across keys/projects.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint relative to the API's base url, e.g. "videos".
+        params : dict
+            Query parameters of the request.
+
+        Returns
+        -------
+        str
+            Normalized key.
+
+        """
+        params = {k: str(v) for k, v in params.items()
+                  if k != "key" and v is not None}
+        return endpoint + "?" + json.dumps(params, sort_keys=True)
+
+    def get_ttl(self, endpoint, params):
+        part = params.get("part")
+        if part is not None and "{}:{}".format(endpoint, part) in self.ttls:
+            return self.ttls["{}:{}".format(endpoint, part)]
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def get(self, endpoint, params):
+        """
+        Look up a response.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint relative to the API's base url.
+        params : dict
+            Query parameters of the request.
+
+        Returns
+        -------
+        dict/None
+            Decoded JSON response or None if missing or expired.
+
+        """
+        key = self.make_key(endpoint, params)
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT value, expires_at FROM responses WHERE key = ?",
+                                    (key,)).fetchone()
+            if row is None or row[1] < now:
+                self.misses += 1
+                return None
+            self._accessed[key] = now
+            self.hits += 1
+        return json.loads(row[0])
+
+    def get_many(self, endpoint, params_list):
+        """
+        Look up several responses of an endpoint with one query.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint relative to the API's base url.
+        params_list : list
+            Query parameters of every request.
+
+        Returns
+        -------
+        list
+            Decoded JSON response or None per request, in the same order.
+
+        """
+        keys = [self.make_key(endpoint, params) for params in params_list]
+        now = time.time()
+        found = {}
+        with self._lock:
+            # SQLite allows 999 parameters per statement in older versions
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self.conn.execute(
+                    "SELECT key, value FROM responses WHERE expires_at >= ? AND key IN ({})"
+                    .format(", ".join("?"*len(chunk))), [now] + chunk).fetchall()
+                found.update(rows)
+            for key in found:
+                self._accessed[key] = now
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return [json.loads(found[key]) if key in found else None for key in keys]
+
+    def set(self, endpoint, params, value):
+        """
+        Store a decoded JSON response.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint relative to the API's base url.
+        params : dict
+            Query parameters of the request.
+        value : dict
+            Decoded JSON response.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.set_many(endpoint, [(params, value)])
+        return None
+
+    def set_many(self, endpoint, items):
+        """
+        Store several decoded JSON responses of an endpoint in one transaction.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint relative to the API's base url.
+        items : list
+            (params, value) of every response.
+
+        Returns
+        -------
+        None.
+
+        """
+        now = time.time()
+        rows = [(self.make_key(endpoint, params), json.dumps(value),
+                 now + self.get_ttl(endpoint, params), now) for params, value in items]
+        with self._lock:
+            self.conn.executemany("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", rows)
+            self._store_accesses()
+            # Evicting on every insert is wasteful, the cache may overshoot a bit
+            if self._inserts // 100 != (self._inserts + len(rows)) // 100:
+                self._evict()
+            self._inserts += len(rows)
+            self.conn.commit()
+        return None
+
+    def _store_accesses(self):
+        """Write the buffered access times, in the caller's transaction."""
+        if self._accessed:
+            self.conn.executemany("UPDATE responses SET last_access = ? WHERE key = ?",
+                                  [(t, key) for key, t in self._accessed.items()])
+            self._accessed = {}
+
+    def _evict(self):
+        self.conn.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+        self.conn.execute("""DELETE FROM responses WHERE key IN (
+                                 SELECT key FROM responses
+                                 ORDER BY last_access DESC
+                                 LIMIT -1 OFFSET ?)""", (self.max_entries,))
+
+    @property
+    def stats(self):
+        """Hit/miss counters and the number of stored entries."""
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries}
+
+    def close(self):
+        with self._lock:
+            self._store_accesses()
+            self._evict()
+            self.conn.commit()
+            self.conn.close()
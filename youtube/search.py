@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:49:12 2026
+
+Harvest search results for many keywords. Every keyword is paged through
+concurrently, pages are passed through a bounded queue, deduplicated across
+all queries with a Bloom filter and emitted as DataFrame chunks. Memory stays
+flat regardless of how many results are harvested.
+
+@author: ikespand
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import inspect
+import math
+import queue
+import threading
+from api import CustomYouTubeApi
+
+_DONE = object()
+
+# %%
+
+class BloomFilter():
+    """Fixed-size set membership with a bounded false positive rate. A false
+    positive means that a new video is dropped as a duplicate.
+    """
+    def __init__(self, capacity=1000000, error_rate=1e-4):
+        self.n_bits = int(math.ceil(-capacity * math.log(error_rate) / math.log(2)**2))
+        self.n_hashes = max(1, int(round(self.n_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.n_bits + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i*h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def add(self, key):
+        """Add the key and return True if it was (probably) present before."""
+        present = True
+        for pos in self._positions(key):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                present = False
+                self.bits[byte] |= 1 << bit
+        return present
+
+    def __contains__(self, key):
+        return all(self.bits[pos // 8] & (1 << (pos % 8))
+                   for pos in self._positions(key))
+
+
+class KeywordSearchHarvester():
+    """Concurrent, deduplicated search over a list of keywords.
+    """
+    def __init__(self, custom_api, max_workers=4, max_pages=None, chunk_size=1000,
+                 dedup=None):
+        """
+        Parameters
+        ----------
+        custom_api : CustomYouTubeApi
+            Client to search with, give it a `TokenBucket` to bound the quota.
+        max_workers : int, optional
+            Keywords paged through concurrently. The default is 4.
+        max_pages : int, optional
+            Maximum pages per keyword. The default is None, i.e. all.
+        chunk_size : int, optional
+            Unique videos per emitted chunk. The default is 1000.
+        dedup : BloomFilter, optional
+            Shared filter, e.g. to deduplicate against earlier harvests.
+
+        """
+        if inspect.isasyncgenfunction(custom_api.iter_search_pages):
+            raise TypeError("KeywordSearchHarvester pages with threads, use the sync "
+                            "CustomYouTubeApi")
+        self.api = custom_api
+        self.max_workers = max_workers
+        self.max_pages = max_pages
+        self.chunk_size = chunk_size
+        self.dedup = dedup if dedup is not None else BloomFilter()
+
+    @staticmethod
+    def _put(pages, item, stop):
+        # Don't block forever if the consumer has gone away
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self, keywords, pages, stop):
+        try:
+            for items in self.api.iter_search_pages(keywords, max_pages=self.max_pages):
+                if not self._put(pages, (keywords, items), stop):
+                    return
+        except Exception as err:
+            print("Search for {} failed with error: {}".format(keywords, err))
+        finally:
+            self._put(pages, _DONE, stop)
+
+    def iter_chunks(self, keyword_list):
+        """
+        Search all keywords and yield the new videos in chunks.
+
+        Parameters
+        ----------
+        keyword_list : list
+            Search queries.
+
+        Yields
+        ------
+        df : pd.DataFrame
+            Up to `chunk_size` videos not seen before, see
+            `CustomYouTubeApi.search_results_to_df`, plus a `keyword` column.
+
+        """
+        keyword_list = list(keyword_list)
+        pages = queue.Queue(maxsize=2*self.max_workers)
+        stop = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            for keywords in keyword_list:
+                pool.submit(self._produce, keywords, pages, stop)
+            n_running = len(keyword_list)
+            items, item_keywords = [], []
+            while n_running:
+                page = pages.get()
+                if page is _DONE:
+                    n_running -= 1
+                    continue
+                keywords, page_items = page
+                for item in page_items:
+                    if not self.dedup.add(item["id"]["videoId"]):
+                        items.append(item)
+                        item_keywords.append(keywords)
+                while len(items) >= self.chunk_size:
+                    yield self._to_df(items[:self.chunk_size], item_keywords[:self.chunk_size])
+                    items = items[self.chunk_size:]
+                    item_keywords = item_keywords[self.chunk_size:]
+            if items:
+                yield self._to_df(items, item_keywords)
+        finally:
+            stop.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def _to_df(items, item_keywords):
+        df = CustomYouTubeApi.search_results_to_df(items)
+        df["keyword"] = item_keywords
+        return df
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:27:46 2026
+
+Local state store for the incremental channel sync. For every channel it keeps
+the uploads playlist and the newest video seen in the last completed sync, so
+the next sync can stop paging as soon as it reaches known items.
+
+@author: ikespand
+"""
+
+import sqlite3
+import threading
+import time
+
+# %%
+
+class ChannelSyncState():
+    """Per-channel sync state in a SQLite file.
+    """
+    def __init__(self, path="youtube_sync_state.sqlite"):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS channels (
+                                 channel_id TEXT PRIMARY KEY,
+                                 uploads_playlist_id TEXT,
+                                 last_video_id TEXT,
+                                 last_published_at TEXT,
+                                 synced_at REAL)""")
+        self.conn.commit()
+
+    def get(self, channel_id):
+        """
+        Get the state of a channel.
+
+        Parameters
+        ----------
+        channel_id : str
+            Id of the channel.
+
+        Returns
+        -------
+        dict/None
+            Keys "uploads_playlist_id", "last_video_id", "last_published_at"
+            and "synced_at", None if the channel is unknown.
+
+        """
+        with self._lock:
+            row = self.conn.execute("""SELECT uploads_playlist_id, last_video_id,
+                                              last_published_at, synced_at
+                                       FROM channels WHERE channel_id = ?""",
+                                    (channel_id,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("uploads_playlist_id", "last_video_id",
+                         "last_published_at", "synced_at"), row))
+
+    def set_playlist(self, channel_id, uploads_playlist_id):
+        with self._lock:
+            self.conn.execute("""INSERT INTO channels (channel_id, uploads_playlist_id)
+                                 VALUES (?, ?)
+                                 ON CONFLICT(channel_id) DO UPDATE
+                                 SET uploads_playlist_id = excluded.uploads_playlist_id""",
+                              (channel_id, uploads_playlist_id))
+            self.conn.commit()
+
+    def set_last_seen(self, channel_id, video_id, published_at):
+        """Record the newest video after a completed sync."""
+        with self._lock:
+            self.conn.execute("""INSERT INTO channels
+                                     (channel_id, last_video_id, last_published_at, synced_at)
+                                 VALUES (?, ?, ?, ?)
+                                 ON CONFLICT(channel_id) DO UPDATE
+                                 SET last_video_id = excluded.last_video_id,
+                                     last_published_at = excluded.last_published_at,
+                                     synced_at = excluded.synced_at""",
+                              (channel_id, video_id, published_at, time.time()))
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,78 @@
+import pytest
+import response_cache
+from response_cache import ResponseCache
+
+
+class Clock():
+    def __init__(self, t=1000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, "time", clock)
+    return clock
+
+
+def params(vid, part="statistics"):
+    return {"part": part, "id": vid, "key": "secret"}
+
+
+def test_roundtrip_ignores_api_key(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "c.sqlite"))
+    cache.set("videos", params("a"), {"items": [1]})
+    assert cache.get("videos", dict(params("a"), key="other")) == {"items": [1]}
+    assert cache.get("videos", params("b")) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+
+def test_ttl_per_endpoint_and_part(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "c.sqlite"))
+    cache.set("videos", params("a"), {"v": "stats"})
+    cache.set("videos", params("a", "snippet"), {"v": "snippet"})
+    clock.t += response_cache.DEFAULT_TTLS["videos:statistics"] + 1
+    assert cache.get("videos", params("a")) is None
+    assert cache.get("videos", params("a", "snippet")) == {"v": "snippet"}
+    cache.close()
+
+
+def test_lru_eviction_keeps_recently_read(tmp_path, clock):
+    fname = str(tmp_path / "c.sqlite")
+    cache = ResponseCache(fname, max_entries=2)
+    for vid in "abc":
+        clock.t += 1
+        cache.set("videos", params(vid), {"id": vid})
+    clock.t += 1
+    assert cache.get("videos", params("a")) == {"id": "a"}
+    # The access time of the hit is only stored with the next write/close
+    cache.close()
+    cache = ResponseCache(fname, max_entries=2)
+    assert cache.stats["entries"] == 2
+    assert cache.get("videos", params("a")) == {"id": "a"}
+    assert cache.get("videos", params("b")) is None
+    assert cache.get("videos", params("c")) == {"id": "c"}
+    cache.close()
+
+
+def test_eviction_while_writing(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "c.sqlite"), max_entries=50)
+    cache.set_many("videos", [(params(str(i)), {"i": i}) for i in range(120)])
+    assert cache.stats["entries"] == 50
+    cache.close()
+
+
+def test_get_many_and_set_many(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "c.sqlite"))
+    cache.set_many("videos", [(params(str(i)), {"i": i}) for i in range(0, 1200, 2)])
+    found = cache.get_many("videos", [params(str(i)) for i in range(1200)])
+    # In request order, across the chunks of the IN query
+    assert found == [{"i": i} if i % 2 == 0 else None for i in range(1200)]
+    assert (cache.hits, cache.misses) == (600, 600)
+    clock.t += response_cache.DEFAULT_TTLS["videos:statistics"] + 1
+    assert cache.get_many("videos", [params("0"), params("2")]) == [None, None]
+    cache.close()
@@ -0,0 +1,94 @@
+from api import YoutubeApi
+from sync_state import ChannelSyncState
+
+
+class Request():
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class FakeYoutube():
+    """Uploads playlist of one channel, newest first, in pages of 2."""
+    def __init__(self, videos):
+        self.videos = videos
+        self.calls = {"channels": 0, "playlistItems": 0}
+
+    def channels(self):
+        return self
+
+    def playlistItems(self):
+        return self
+
+    def list(self, part, id=None, playlistId=None, maxResults=None, pageToken=None):
+        if id is not None:
+            self.calls["channels"] += 1
+            return Request({"items": [{"contentDetails": {
+                "relatedPlaylists": {"uploads": "UU" + id}}}]})
+        self.calls["playlistItems"] += 1
+        start = int(pageToken or 0)
+        res = {"items": [{"snippet": {"resourceId": {"videoId": vid},
+                                      "publishedAt": published}}
+                         for vid, published in self.videos[start:start + 2]]}
+        if start + 2 < len(self.videos):
+            res["nextPageToken"] = str(start + 2)
+        return Request(res)
+
+
+def make_api(videos):
+    api = YoutubeApi("key")
+    api._local.youtube = FakeYoutube(videos)
+    return api
+
+
+def ids(videos):
+    return [v["snippet"]["resourceId"]["videoId"] for v in videos]
+
+
+def test_resume_after_completed_and_interrupted_syncs(tmp_path):
+    state = ChannelSyncState(str(tmp_path / "state.sqlite"))
+    videos = [("v3", "2026-01-03"), ("v2", "2026-01-02"), ("v1", "2026-01-01")]
+    api = make_api(videos)
+    assert ids(api.sync_channel("C", state)) == ["v3", "v2", "v1"]
+    assert state.get("C")["last_video_id"] == "v3"
+
+    videos[:0] = [("v5", "2026-01-05"), ("v4", "2026-01-04")]
+    # Interrupted: the state isn't advanced
+    sync = api.sync_channel("C", state)
+    assert ids([next(sync)]) == ["v5"]
+    sync.close()
+    assert state.get("C")["last_video_id"] == "v3"
+
+    fake = api.youtube
+    fake.calls["playlistItems"] = 0
+    assert ids(api.sync_channel("C", state)) == ["v5", "v4"]
+    assert state.get("C")["last_video_id"] == "v5"
+    # Stopped at the known video on the second page, the playlist id is kept
+    assert fake.calls == {"channels": 1, "playlistItems": 2}
+    state.close()
+
+
+def test_resume_when_last_video_was_deleted(tmp_path):
+    fname = str(tmp_path / "state.sqlite")
+    state = ChannelSyncState(fname)
+    state.set_playlist("C", "UUC")
+    state.set_last_seen("C", "gone", "2026-01-02")
+    state.close()
+    state = ChannelSyncState(fname)
+    api = make_api([("v3", "2026-01-03"), ("v1", "2026-01-01")])
+    assert ids(api.sync_channel("C", state)) == ["v3"]
+    assert api.youtube.calls["channels"] == 0
+    assert state.get("C")["last_video_id"] == "v3"
+    state.close()
+
+
+def test_no_new_videos_keeps_state(tmp_path):
+    state = ChannelSyncState(str(tmp_path / "state.sqlite"))
+    state.set_last_seen("C", "v1", "2026-01-01")
+    synced_at = state.get("C")["synced_at"]
+    api = make_api([("v1", "2026-01-01")])
+    assert ids(api.sync_channel("C", state)) == []
+    assert state.get("C")["synced_at"] == synced_at
+    state.close()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:10:24 2026
+
+Bulk download of video thumbnails. Downloads run in parallel over a pooled
+session and stream straight to disk. A manifest with the ETag, Last-Modified
+and SHA-256 of every file is kept next to the thumbnails, so re-runs either
+skip known files or revalidate them with conditional GETs. The manifest is
+saved every few seconds during a run, so an interrupted run keeps its state.
+
+@author: ikespand
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import hashlib
+import json
+import os
+import threading
+import time
+from http_session import make_session
+
+THUMBNAIL_URL = r"https://img.youtube.com/vi/{}/{}.jpg"
+# Resolution tier -> file name on img.youtube.com
+RESOLUTIONS = {"default": "default",      # 120x90
+               "mq": "mqdefault",         # 320x180
+               "hq": "hqdefault",         # 480x360
+               "maxres": "maxresdefault"} # 1280x720, not available for all videos
+MANIFEST_FNAME = "manifest.json"
+CHUNK_SIZE = 64*1024
+# Seconds between the saves of the manifest while downloading
+MANIFEST_INTERVAL = 5.0
+
+# %%
+
+class ThumbnailDownloader():
+    """Parallel, streaming and incremental thumbnail downloader.
+    """
+    def __init__(self, output_dir=os.getcwd(), resolution="hq", max_workers=16,
+                 revalidate=False, session=None, metrics=None):
+        """
+        Parameters
+        ----------
+        output_dir : str, optional
+            Folder for the thumbnails and the manifest. The default is os.getcwd().
+        resolution : str, optional
+            One of "default", "mq", "hq" and "maxres". The default is "hq".
+        max_workers : int, optional
+            Concurrent downloads. The default is 16.
+        revalidate : bool, optional
+            If False, files in the manifest are skipped without any request.
+            If True, they are revalidated with a conditional GET. The default
+            is False.
+        session : requests.Session, optional
+            Session to download with, a pooled one is created by default.
+        metrics : ApiMetrics, optional
+            Records the downloads under the "thumbnail" endpoint.
+
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError("resolution must be one of {}".format(list(RESOLUTIONS)))
+        self.output_dir = output_dir
+        self.resolution = resolution
+        self.max_workers = max_workers
+        self.revalidate = revalidate
+        self.session = session or make_session(pool_size=max_workers)
+        self.metrics = metrics
+        self.manifest_fname = os.path.join(output_dir, MANIFEST_FNAME)
+        self._lock = threading.Lock()
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        self.manifest = self.read_manifest()
+
+    def read_manifest(self):
+        if os.path.isfile(self.manifest_fname):
+            with open(self.manifest_fname) as f:
+                return json.load(f)
+        return {}
+
+    def write_manifest(self):
+        tmp_fname = self.manifest_fname + ".tmp"
+        with self._lock:
+            with open(tmp_fname, "w") as f:
+                json.dump(self.manifest, f)
+            os.replace(tmp_fname, self.manifest_fname)
+
+    def thumbnail_path(self, video_id):
+        return os.path.join(self.output_dir,
+                            "{}_{}.jpg".format(video_id, self.resolution))
+
+    def download_one(self, video_id):
+        """
+        Download a single thumbnail unless it is already up-to-date.
+
+        Parameters
+        ----------
+        video_id : str
+            Id of the video.
+
+        Returns
+        -------
+        status : str
+            One of "downloaded", "unchanged", "not_modified", "skipped" and
+            "failed".
+
+        """
+        fname = self.thumbnail_path(video_id)
+        key = os.path.basename(fname)
+        with self._lock:
+            entry = self.manifest.get(key)
+        exists = entry is not None and os.path.isfile(fname)
+        if exists and not self.revalidate:
+            return "skipped"
+
+        headers = {}
+        if exists and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if exists and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        url = THUMBNAIL_URL.format(video_id, RESOLUTIONS[self.resolution])
+        st = time.perf_counter()
+        with self.session.get(url, headers=headers, stream=True, timeout=30) as resp:
+            if resp.status_code != 200:
+                self._record(st, resp.status_code, 0)
+                return "not_modified" if resp.status_code == 304 else "failed"
+            sha256 = hashlib.sha256()
+            n_bytes = 0
+            tmp_fname = fname + ".part"
+            try:
+                with open(tmp_fname, "wb") as f:
+                    for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                        sha256.update(chunk)
+                        f.write(chunk)
+                        n_bytes += len(chunk)
+                self._record(st, 200, n_bytes)
+                new_entry = {"etag": resp.headers.get("ETag"),
+                             "last_modified": resp.headers.get("Last-Modified"),
+                             "sha256": sha256.hexdigest()}
+                # Same content under new validators, keep the file as it is
+                if exists and entry.get("sha256") == new_entry["sha256"]:
+                    status = "unchanged"
+                else:
+                    os.replace(tmp_fname, fname)
+                    status = "downloaded"
+            finally:
+                # Left over if unchanged or the download broke off
+                if os.path.exists(tmp_fname):
+                    os.remove(tmp_fname)
+        with self._lock:
+            self.manifest[key] = new_entry
+        return status
+
+    def _record(self, st, status, n_bytes):
+        if self.metrics is not None:
+            self.metrics.record("thumbnail", time.perf_counter() - st, status, n_bytes)
+
+    def download(self, video_ids):
+        """
+        Download the thumbnails of all given videos in parallel.
+
+        Parameters
+        ----------
+        video_ids : list
+            Ids of the videos.
+
+        Returns
+        -------
+        paths : dict
+            Video id -> thumbnail path, None if the download failed.
+        counts : dict
+            Number of videos per status, see `download_one`.
+
+        """
+        video_ids = list(dict.fromkeys(video_ids))
+        statuses = []
+        last_write = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for status in pool.map(self._download_safe, video_ids):
+                    statuses.append(status)
+                    if time.monotonic() - last_write > MANIFEST_INTERVAL:
+                        self.write_manifest()
+                        last_write = time.monotonic()
+        finally:
+            # Also on Ctrl+C, the finished downloads are not lost
+            self.write_manifest()
+
+        paths, counts = {}, {}
+        for vid, status in zip(video_ids, statuses):
+            paths[vid] = None if status == "failed" else self.thumbnail_path(vid)
+            counts[status] = counts.get(status, 0) + 1
+        return paths, counts
+
+    def _download_safe(self, video_id):
+        try:
+            return self.download_one(video_id)
+        except Exception as err:
+            print("Thumbnail of {} failed with error: {}".format(video_id, err))
+            return "failed"